@@ -0,0 +1,93 @@
+"""Tables de synthèse du tableau de bord, tenues à jour par les triggers de
+la migration 4 : reconstruction complète et vérification contre les données.
+
+    python src/aggregates.py [chemin.db]             # vérifie
+    python src/aggregates.py --rebuild [chemin.db]   # reconstruit puis vérifie
+"""
+import sqlite3
+import sys
+
+# Durée maximale d'un séjour prise en compte par jour (table Jours)
+MAX_NIGHTS = 3660
+
+SQL_LIVE_CLIENTS = "SELECT COUNT(*) FROM Client"
+
+SQL_LIVE_HOTELS = '''
+    SELECT Id_Hotel, SUM(Note), COUNT(*)
+    FROM Evaluation
+    GROUP BY Id_Hotel
+'''
+
+# Un jour par ligne pour chaque séjour, bornes incluses comme dans la
+# condition "Date_arrivee <= jour AND Date_depart >= jour"
+SQL_LIVE_OCCUPATION = '''
+    SELECT date(r.Date_arrivee, '+' || j.N || ' days') AS Jour,
+           COUNT(*) AS Reservations,
+           SUM((SELECT COUNT(*) FROM Reservation_Chambre rc
+                WHERE rc.Id_Reservation = r.Id_Reservation)) AS Chambres
+    FROM Reservation r
+    JOIN Jours j ON j.N <= julianday(r.Date_depart) - julianday(r.Date_arrivee)
+    GROUP BY Jour
+'''
+
+
+def rebuild(conn):
+    """Recalcule toutes les tables de synthèse depuis les données"""
+    with conn:
+        # Transaction explicite : la connexion peut être en autocommit
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute("DELETE FROM Jours")
+        conn.execute('''
+            WITH RECURSIVE n(N) AS (SELECT 0 UNION ALL SELECT N + 1 FROM n WHERE N < ?)
+            INSERT INTO Jours SELECT N FROM n
+        ''', (MAX_NIGHTS,))
+        conn.execute("DELETE FROM Stat_Compteur")
+        conn.execute("INSERT INTO Stat_Compteur VALUES ('clients', (SELECT COUNT(*) FROM Client))")
+        conn.execute("DELETE FROM Stat_Hotel")
+        conn.execute("INSERT INTO Stat_Hotel " + SQL_LIVE_HOTELS)
+        conn.execute("DELETE FROM Stat_Occupation")
+        conn.execute("INSERT INTO Stat_Occupation " + SQL_LIVE_OCCUPATION)
+
+
+def verify(conn):
+    """Compare les tables de synthèse aux données ; retourne la liste des écarts"""
+    ecarts = []
+
+    stocke = conn.execute("SELECT Valeur FROM Stat_Compteur WHERE Nom = 'clients'").fetchone()
+    reel = conn.execute(SQL_LIVE_CLIENTS).fetchone()[0]
+    if (stocke[0] if stocke else 0) != reel:
+        ecarts.append(f"clients : {stocke[0] if stocke else 0} au lieu de {reel}")
+
+    stocke = {row[0]: tuple(row[1:]) for row in conn.execute(
+        "SELECT Id_Hotel, Somme_notes, Nombre_evaluations FROM Stat_Hotel WHERE Nombre_evaluations <> 0")}
+    reel = {row[0]: tuple(row[1:]) for row in conn.execute(SQL_LIVE_HOTELS)}
+    for hotel in stocke.keys() | reel.keys():
+        if stocke.get(hotel) != reel.get(hotel):
+            ecarts.append(f"hôtel {hotel} : {stocke.get(hotel)} au lieu de {reel.get(hotel)}")
+
+    stocke = {row[0]: tuple(row[1:]) for row in conn.execute(
+        "SELECT Jour, Reservations, Chambres FROM Stat_Occupation WHERE Reservations <> 0 OR Chambres <> 0")}
+    reel = {row[0]: tuple(row[1:]) for row in conn.execute(SQL_LIVE_OCCUPATION)}
+    for jour in sorted(stocke.keys() | reel.keys()):
+        if stocke.get(jour) != reel.get(jour):
+            ecarts.append(f"occupation du {jour} : {stocke.get(jour)} au lieu de {reel.get(jour)}")
+
+    return ecarts
+
+
+if __name__ == "__main__":
+    from migrations import migrate
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    conn = sqlite3.connect(args[0] if args else "data/hotel.db")
+    migrate(conn)
+    if "--rebuild" in sys.argv:
+        rebuild(conn)
+        print("Tables de synthèse reconstruites")
+    ecarts = verify(conn)
+    for ecart in ecarts:
+        print(ecart)
+    print(f"{len(ecarts)} écart(s)")
+    conn.close()
+    sys.exit(1 if ecarts else 0)
@@ -0,0 +1,306 @@
+"""Attribution automatique des chambres d'un hôtel et d'un type, en évitant les
+trous invendables entre deux séjours.
+
+    python src/allocation.py [--db data/hotel.db] [--since 2025-07-01] [--hotel 1] [--type 1] [--apply]
+    python src/allocation.py --simulate [--rooms 60] [--stays 5000] [--days 365] [--seed 0]
+
+Une chambre est occupée du jour d'arrivée au jour de départ compris (même
+règle que l'index des disponibilités et les triggers) : entre deux séjours, un
+trou de SHORT_GAP jours ou moins ne se vend presque plus. Le premier
+ajustement (first_fit) prend la première chambre libre dans l'ordre de la
+liste (étage puis numéro), comme le choix proposé par défaut au guichet ; le
+meilleur ajustement (best_fit) prend celle où le séjour laisse le moins de
+jours orphelins, puis les trous les plus serrés, et garde les chambres vides
+pour les longs séjours. Dans un lot, les séjours sont placés par arrivée.
+
+Préférences d'un séjour : Fumeur (None : indifférent, sinon imposé) et Etage
+(étage souhaité : le plus proche passe avant tout autre critère).
+
+Sans --simulate, les séjours à venir (arrivée après --since, aujourd'hui par
+défaut) de chaque hôtel et type sont réattribués sur le papier et le rapport
+compare l'attribution actuelle aux deux stratégies ; --apply enregistre
+best_fit là où il réduit les jours orphelins. --simulate compare les deux
+stratégies sur un lot de séjours fictifs.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from availability import RoomSchedule, to_ordinal
+
+SHORT_GAP = 2
+
+STRATEGIES = ("first_fit", "best_fit")
+
+SQL_GROUPS = "SELECT DISTINCT Id_Hotel, Id_Type FROM Chambre ORDER BY Id_Hotel, Id_Type"
+
+SQL_GROUP_ROOMS = '''
+    SELECT Numero, Etage, Fumeur FROM Chambre
+    WHERE Id_Hotel = ? AND Id_Type = ?
+    ORDER BY Etage, Numero
+'''
+
+# Séjours des chambres du groupe qui ne sont pas terminés à la date donnée
+SQL_GROUP_STAYS = '''
+    SELECT rc.rowid, rc.Id_Reservation, rc.Numero_chambre, r.Date_arrivee, r.Date_depart
+    FROM Chambre ch
+    JOIN Reservation_Chambre rc ON rc.Numero_chambre = ch.Numero
+    JOIN Reservation r ON r.Id_Reservation = rc.Id_Reservation
+    WHERE ch.Id_Hotel = ? AND ch.Id_Type = ? AND r.Date_depart >= ?
+'''
+
+
+def _orphans(jours):
+    return jours if 0 < jours <= SHORT_GAP else 0
+
+
+def _accepts(chambre, fumeur):
+    return fumeur is None or bool(chambre["Fumeur"]) == bool(fumeur)
+
+
+def room_key(strategy, chambre, ecarts, etage=None):
+    """Clé de tri des chambres libres pour un séjour : la plus petite est choisie"""
+    distance = 0 if etage is None else abs(chambre["Etage"] - int(etage))
+    if strategy == "first_fit":
+        return distance, chambre["Etage"], chambre["Numero"]
+    # Le plus petit écart d'abord : une chambre sans séjour après (math.inf)
+    # reste départagée par le trou laissé avant
+    avant, apres = ecarts
+    return (distance, _orphans(avant) + _orphans(apres), min(avant, apres), max(avant, apres),
+            chambre["Etage"], chambre["Numero"])
+
+
+def allocate(chambres, plannings, sejours, strategy="best_fit"):
+    """Place des séjours ({Date_arrivee, Date_depart[, Fumeur][, Etage]}) dans des chambres
+    ({Numero, Etage, Fumeur}) dont `plannings` ({Numero: RoomSchedule}) reçoit les séjours placés.
+
+    Retourne le Numero attribué à chaque séjour, dans l'ordre de `sejours`
+    (None pour un séjour qui ne tient dans aucune chambre).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"stratégie inconnue : {strategy}")
+    intervalles = [(to_ordinal(sejour["Date_arrivee"]), to_ordinal(sejour["Date_depart"])) for sejour in sejours]
+    attribution = [None] * len(sejours)
+    # Par arrivée ; à arrivée égale, les plus longs d'abord
+    for i in sorted(range(len(sejours)), key=lambda i: (intervalles[i][0], -intervalles[i][1])):
+        debut, fin = intervalles[i]
+        fumeur, etage = sejours[i].get("Fumeur"), sejours[i].get("Etage")
+        meilleure = None
+        for chambre in chambres:
+            if not _accepts(chambre, fumeur):
+                continue
+            ecarts = plannings[chambre["Numero"]].gaps(debut, fin)
+            if ecarts is None:
+                continue
+            cle = room_key(strategy, chambre, ecarts, etage)
+            if meilleure is None or cle < meilleure[0]:
+                meilleure = (cle, chambre["Numero"])
+        if meilleure is not None:
+            plannings[meilleure[1]].add(debut, fin)
+            attribution[i] = meilleure[1]
+    return attribution
+
+
+def measure(plannings, date_debut, date_fin):
+    """Séjours, nuits, occupation (jours occupés comme dans le calendrier) et jours
+    orphelins des plannings entre deux dates"""
+    debut, fin = to_ordinal(date_debut), to_ordinal(date_fin)
+    sejours = nuits = occupes = orphelins = 0
+    for planning in plannings.values():
+        precedent = None
+        for arrivee, depart in zip(planning.debuts, planning.fins):
+            if depart < debut or arrivee > fin:
+                continue
+            sejours += 1
+            nuits += depart - arrivee
+            occupes += min(depart, fin) - max(arrivee, debut) + 1
+            if precedent is not None:
+                orphelins += _orphans(arrivee - precedent - 1)
+            precedent = depart
+    jours = (fin - debut + 1) * len(plannings)
+    return {"Sejours": sejours, "Nuits": nuits, "Occupation": round(occupes / jours, 4) if jours > 0 else 0.0,
+            "Jours_orphelins": orphelins}
+
+
+def compare(chambres, plannings, sejours, date_debut, date_fin):
+    """Rapport des deux stratégies sur un même lot, à partir de copies de `plannings` ;
+    retourne (lignes du rapport, {stratégie: attribution})"""
+    rapport, attributions = [], {}
+    for strategy in STRATEGIES:
+        copies = {numero: planning.copy() for numero, planning in plannings.items()}
+        debut = time.perf_counter()
+        attribution = attributions[strategy] = allocate(chambres, copies, sejours, strategy)
+        duree = time.perf_counter() - debut
+        rapport.append({"Attribution": strategy, **measure(copies, date_debut, date_fin),
+                        "Refuses": attribution.count(None), "Duree_ms": round(duree * 1000, 1)})
+    return rapport, attributions
+
+
+def plan_reoptimization(conn, id_hotel, id_type, depuis):
+    """Réattribution au meilleur ajustement des séjours à venir d'un hôtel et d'un type,
+    sans écrire dans la base.
+
+    Les séjours arrivant après `depuis` sont déplaçables et gardent la
+    contrainte Fumeur de leur chambre ; les autres restent en place. La liaison
+    de plus grand rowid reste aussi : supprimée puis réinsérée, elle reprendrait
+    ce rowid, que l'index des disponibilités considère déjà lu (voir archive.py).
+    Les déplacements ne sont proposés que si tous les séjours sont replacés et
+    que les jours orphelins diminuent.
+    """
+    depuis = to_ordinal(depuis)
+    chambres = [{"Numero": numero, "Etage": etage, "Fumeur": fumeur}
+                for numero, etage, fumeur in conn.execute(SQL_GROUP_ROOMS, (id_hotel, id_type))]
+    fumeurs = {chambre["Numero"]: chambre["Fumeur"] for chambre in chambres}
+    dernier = conn.execute("SELECT MAX(rowid) FROM Reservation_Chambre").fetchone()[0]
+    actuels = {numero: RoomSchedule() for numero in fumeurs}
+    fixes = {numero: RoomSchedule() for numero in fumeurs}
+    mobiles = []
+    for rowid, id_reservation, numero, arrivee, depart in conn.execute(
+            SQL_GROUP_STAYS, (id_hotel, id_type, date.fromordinal(depuis).isoformat())):
+        debut, fin = to_ordinal(arrivee), to_ordinal(depart)
+        actuels[numero].add(debut, fin)
+        if debut > depuis and rowid != dernier:
+            mobiles.append({"Id_Reservation": id_reservation, "Numero": numero, "Date_arrivee": arrivee,
+                            "Date_depart": depart, "Fumeur": fumeurs[numero]})
+        else:
+            fixes[numero].add(debut, fin)
+
+    horizon = max((planning.fins_max[-1] for planning in actuels.values() if planning.fins_max), default=depuis)
+    rapport, attributions = compare(chambres, fixes, mobiles, depuis, horizon)
+    rapport.insert(0, {"Attribution": "actuelle", **measure(actuels, depuis, horizon), "Refuses": 0, "Duree_ms": 0.0})
+    deplacements = []
+    if None not in attributions["best_fit"] and rapport[2]["Jours_orphelins"] < rapport[0]["Jours_orphelins"]:
+        deplacements = [(sejour["Id_Reservation"], sejour["Numero"], numero, sejour["Date_arrivee"], sejour["Date_depart"])
+                        for sejour, numero in zip(mobiles, attributions["best_fit"]) if numero != sejour["Numero"]]
+    return {"Id_Hotel": id_hotel, "Id_Type": id_type, "Chambres": len(chambres), "Mobiles": len(mobiles),
+            "rapport": rapport, "deplacements": deplacements}
+
+
+def apply_moves(conn, deplacements):
+    """Enregistre les déplacements (Id_Reservation, ancienne, nouvelle chambre, arrivée, départ)
+    dans la transaction en cours ; toutes les liaisons déplacées sont supprimées avant
+    les insertions, les triggers anti-chevauchement ne voient pas d'état intermédiaire"""
+    conn.executemany("DELETE FROM Reservation_Chambre WHERE Id_Reservation = ? AND Numero_chambre = ?",
+                     [(id_reservation, ancienne) for id_reservation, ancienne, *_ in deplacements])
+    conn.executemany("INSERT INTO Reservation_Chambre (Id_Reservation, Numero_chambre) VALUES (?, ?)",
+                     [(id_reservation, nouvelle) for id_reservation, _, nouvelle, *_ in deplacements])
+
+
+def _print_report(rapport):
+    for ligne in rapport:
+        print(f"  {ligne['Attribution']:<9} {ligne['Sejours']:>7} séjours  {ligne['Nuits']:>8} nuits  "
+              f"occupation {ligne['Occupation']:6.1%}  {ligne['Jours_orphelins']:>6} jours orphelins  "
+              f"{ligne['Refuses']:>5} refusés  {ligne['Duree_ms']:>8.1f} ms")
+
+
+def simulate(chambres_total, sejours_total, jours, seed):
+    """Lot fictif pour un hôtel de `chambres_total` chambres d'un même type, suivi d'une
+    demande de dernière minute (1 à 3 nuits) placée une à une au premier ajustement :
+    l'occupation finale montre ce que les trous évités permettent encore de vendre"""
+    rng = random.Random(seed)
+    etages = max(1, chambres_total // 10)
+    chambres = [{"Numero": (i % etages + 1) * 100 + i // etages, "Etage": i % etages + 1,
+                 "Fumeur": int(rng.random() < 0.2)} for i in range(chambres_total)]
+    chambres.sort(key=lambda chambre: (chambre["Etage"], chambre["Numero"]))
+    debut = date.today()
+    fin = debut + timedelta(days=jours - 1)
+    sejours, derniere_minute = [], []
+    for _ in range(sejours_total):
+        arrivee = debut + timedelta(days=rng.randrange(jours))
+        tirage = rng.random()
+        sejours.append({
+            "Date_arrivee": arrivee,
+            "Date_depart": arrivee + timedelta(days=rng.choice((1, 1, 2, 2, 3, 3, 4, 5, 7, 10, 14))),
+            "Fumeur": 1 if tirage < 0.15 else 0 if tirage < 0.5 else None,
+            "Etage": rng.randint(1, etages) if rng.random() < 0.25 else None,
+        })
+        arrivee = debut + timedelta(days=rng.randrange(jours))
+        derniere_minute.append({"Date_arrivee": arrivee, "Date_depart": arrivee + timedelta(days=rng.randint(1, 3))})
+
+    rapport = []
+    for strategy in STRATEGIES:
+        plannings = {chambre["Numero"]: RoomSchedule() for chambre in chambres}
+        chrono = time.perf_counter()
+        attribution = allocate(chambres, plannings, sejours, strategy)
+        duree = time.perf_counter() - chrono
+        ligne = {"Attribution": strategy, **measure(plannings, debut, fin),
+                 "Refuses": attribution.count(None), "Duree_ms": round(duree * 1000, 1)}
+        for sejour in derniere_minute:
+            allocate(chambres, plannings, [sejour], "first_fit")
+        ligne["Occupation_finale"] = measure(plannings, debut, fin)["Occupation"]
+        rapport.append(ligne)
+
+    print(f"{sejours_total} séjours pour {chambres_total} chambres sur {jours} jours :")
+    _print_report(rapport)
+    premier, meilleur = rapport
+    print(f"best_fit : {meilleur['Nuits'] - premier['Nuits']:+d} nuits, "
+          f"{meilleur['Jours_orphelins'] - premier['Jours_orphelins']:+d} jours orphelins ; après "
+          f"{len(derniere_minute)} demandes de dernière minute, occupation {premier['Occupation_finale']:.1%} "
+          f"(first_fit) -> {meilleur['Occupation_finale']:.1%} (best_fit), "
+          f"{100 * (meilleur['Occupation_finale'] - premier['Occupation_finale']):+.1f} points")
+
+
+def main():
+    from database import Database, connect
+    from service import BookingService
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"))
+    parser.add_argument("--since", type=date.fromisoformat, default=date.today(),
+                        help="les séjours arrivant après cette date sont déplaçables")
+    parser.add_argument("--hotel", type=int)
+    parser.add_argument("--type", type=int)
+    parser.add_argument("--apply", action="store_true", help="enregistre best_fit quand il réduit les trous")
+    parser.add_argument("--simulate", action="store_true", help="lot fictif, sans base")
+    parser.add_argument("--rooms", type=int, default=60)
+    parser.add_argument("--stays", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate(args.rooms, args.stays, args.days, args.seed)
+        return
+
+    conn = connect(args.db, readonly=True)
+    groupes = [tuple(row) for row in conn.execute(SQL_GROUPS)
+               if (args.hotel is None or row[0] == args.hotel) and (args.type is None or row[1] == args.type)]
+    database = service = None
+    if args.apply:
+        conn.close()
+        database = Database(args.db, writers=1, readers=1)
+        service = BookingService(database)
+
+    debut = time.perf_counter()
+    totaux, mobiles, deplacements = {}, 0, 0
+    for id_hotel, id_type in groupes:
+        if service is not None:
+            plan = service.reoptimize(id_hotel, id_type, args.since)
+        else:
+            plan = plan_reoptimization(conn, id_hotel, id_type, args.since)
+        mobiles += plan["Mobiles"]
+        deplacements += len(plan["deplacements"])
+        for ligne in plan["rapport"]:
+            total = totaux.setdefault(ligne["Attribution"], dict.fromkeys(ligne, 0))
+            for cle, valeur in ligne.items():
+                if cle not in ("Attribution", "Occupation"):
+                    total[cle] += valeur
+            total["Attribution"] = ligne["Attribution"]
+            total["Occupation"] += ligne["Occupation"] / len(groupes)  # moyenne des groupes
+    duree = time.perf_counter() - debut
+
+    print(f"{len(groupes)} groupes hôtel/type, {mobiles} séjours à venir déplaçables "
+          f"(arrivée après le {args.since}) :")
+    _print_report(totaux.values())
+    print(f"{deplacements} séjours {'déplacés' if args.apply else 'à déplacer (--apply pour enregistrer)'} "
+          f"en {duree:.1f} s")
+    if database is not None:
+        database.close()
+    else:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
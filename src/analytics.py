@@ -0,0 +1,255 @@
+"""Indicateurs d'exploitation calculés en mémoire avec NumPy : taux d'occupation,
+prix moyen par nuit vendue (ADR), revenu par chambre disponible (RevPAR) et
+chiffre d'affaires chambres + prestations, par hôtel, type de chambre ou jour.
+
+    python src/analytics.py [chemin.db] [debut] [fin]   # mesure le chargement et le calcul
+
+Les nuits sont comptées de l'arrivée (incluse) au départ (exclu) : un séjour du
+1er au 3 fait 2 nuits, facturées 2 × Tarif. Les prestations sont rattachées au
+jour d'arrivée de leur réservation.
+"""
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from availability import to_ordinal
+from query_cache import QueryCache
+
+# Tables lues : les données sont rechargées quand l'une d'elles change.
+# Séjours et prestations sont lus dans les vues Historique_* (tables chaudes
+# et archive, voir archive.py) ; l'archive ne change qu'en même temps que des
+# suppressions dans les tables chaudes.
+TABLES = ("Hotel", "Type_Chambre", "Chambre", "Reservation", "Reservation_Chambre",
+          "Prestation", "Reservation_Prestation")
+
+# Jour 0 de datetime64[D] (1970-01-01) en numérotation date.toordinal()
+_EPOCH = date(1970, 1, 1).toordinal()
+
+SQL_ROOMS = '''
+    SELECT c.Numero, c.Id_Hotel, c.Id_Type, t.Tarif
+    FROM Chambre c
+    JOIN Type_Chambre t ON t.Id_Type = c.Id_Type
+    ORDER BY c.Numero
+'''
+
+# Une chaîne par colonne (group_concat) plutôt qu'un tuple Python par ligne :
+# les agrégats d'une même requête parcourent les lignes dans le même ordre
+SQL_RESERVATIONS = '''
+    SELECT group_concat(Id_Reservation), group_concat(Date_arrivee), group_concat(Date_depart)
+    FROM Historique_Reservation
+'''
+
+SQL_RESERVATION_ROOMS = '''
+    SELECT group_concat(Id_Reservation), group_concat(Numero_chambre)
+    FROM Historique_Reservation_Chambre
+    WHERE Id_Reservation IS NOT NULL AND Numero_chambre IS NOT NULL
+'''
+
+SQL_RESERVATION_PRESTATIONS = '''
+    SELECT group_concat(Id_Reservation), group_concat(Id_Prestation), group_concat(COALESCE(Quantite, 1))
+    FROM Historique_Reservation_Prestation
+    WHERE Id_Reservation IS NOT NULL AND Id_Prestation IS NOT NULL
+'''
+
+
+def _ints(texte):
+    return np.fromstring(texte, sep=",", dtype=np.int64) if texte else np.zeros(0, dtype=np.int64)
+
+
+def _days(texte):
+    """Dates ISO séparées par des virgules -> ordinaux (date.toordinal())"""
+    if not texte:
+        return np.zeros(0, dtype=np.int64)
+    return np.array(texte.split(","), dtype="datetime64[D]").astype(np.int64) + _EPOCH
+
+
+def _lookup(cles, valeurs):
+    """Positions de `valeurs` dans `cles` (trié) et masque des valeurs trouvées"""
+    if not len(cles):
+        return np.zeros(len(valeurs), dtype=np.int64), np.zeros(len(valeurs), dtype=bool)
+    pos = np.minimum(np.searchsorted(cles, valeurs), len(cles) - 1)
+    return pos, cles[pos] == valeurs
+
+
+def _ratio(numerateur, denominateur):
+    """Division élément par élément, 0 là où le dénominateur est nul"""
+    return np.divide(numerateur, denominateur, out=np.zeros(len(numerateur)), where=denominateur > 0)
+
+
+class AnalyticsData:
+    """Chambres, séjours et prestations chargés une fois en tableaux NumPy"""
+
+    def __init__(self, conn):
+        self.generations = QueryCache.generations(conn, TABLES)
+        hotels = conn.execute("SELECT Id_Hotel, Ville FROM Hotel ORDER BY Id_Hotel").fetchall()
+        self.hotel_ids = np.array([row[0] for row in hotels], dtype=np.int64)
+        self.hotel_villes = [row[1] for row in hotels]
+        types = conn.execute("SELECT Id_Type, Type FROM Type_Chambre ORDER BY Id_Type").fetchall()
+        self.type_ids = np.array([row[0] for row in types], dtype=np.int64)
+        self.type_noms = [row[1] for row in types]
+
+        chambres = np.array(conn.execute(SQL_ROOMS).fetchall(), dtype=np.float64).reshape(-1, 4)
+        self.numeros = chambres[:, 0].astype(np.int64)
+        # Indices (position dans hotel_ids / type_ids) plutôt qu'identifiants
+        self.chambre_hotel = np.searchsorted(self.hotel_ids, chambres[:, 1].astype(np.int64))
+        self.chambre_type = np.searchsorted(self.type_ids, chambres[:, 2].astype(np.int64))
+        self.chambre_tarif = chambres[:, 3]
+
+        ids, arrivees, departs = conn.execute(SQL_RESERVATIONS).fetchone()
+        reservations = _ints(ids)
+        ordre = np.argsort(reservations)
+        reservations = reservations[ordre]
+        arrivees, departs = _days(arrivees)[ordre], _days(departs)[ordre]
+
+        # Jointures Reservation_Chambre -> Reservation et -> Chambre par recherche dichotomique
+        ids, numeros = conn.execute(SQL_RESERVATION_ROOMS).fetchone()
+        pos_reservation, trouvees = _lookup(reservations, _ints(ids))
+        pos_chambre, connues = _lookup(self.numeros, _ints(numeros))
+        retenues = trouvees & connues
+        self.sejour_chambre = pos_chambre[retenues]
+        self.sejour_arrivee = arrivees[pos_reservation[retenues]]
+        self.sejour_depart = departs[pos_reservation[retenues]]
+
+        prestations = np.array(conn.execute(
+            "SELECT Id_Prestation, Id_Hotel, Prix FROM Prestation ORDER BY Id_Prestation"
+        ).fetchall(), dtype=np.float64).reshape(-1, 3)
+        prestation_ids = prestations[:, 0].astype(np.int64)
+        ids, prestas, quantites = conn.execute(SQL_RESERVATION_PRESTATIONS).fetchone()
+        pos_reservation, trouvees = _lookup(reservations, _ints(ids))
+        pos_prestation, connues = _lookup(prestation_ids, _ints(prestas))
+        retenues = trouvees & connues
+        pos_prestation = pos_prestation[retenues]
+        self.prestation_hotel = np.searchsorted(self.hotel_ids, prestations[pos_prestation, 1].astype(np.int64))
+        self.prestation_jour = arrivees[pos_reservation[retenues]]
+        self.prestation_montant = prestations[pos_prestation, 2] * _ints(quantites)[retenues]
+
+    def _nights(self, debut, fin):
+        """Nuits de chaque séjour comprises entre `debut` et `fin` (ordinaux, inclus)"""
+        premiere = np.maximum(self.sejour_arrivee, debut)
+        derniere = np.minimum(self.sejour_depart, fin + 1)
+        return premiere, derniere, np.maximum(derniere - premiere, 0)
+
+    def _rooms_mask(self, id_hotel=None, id_type=None):
+        masque = np.ones(len(self.numeros), dtype=bool)
+        if id_hotel is not None:
+            masque &= self.hotel_ids[self.chambre_hotel] == id_hotel
+        if id_type is not None:
+            masque &= self.type_ids[self.chambre_type] == id_type
+        return masque
+
+    def summary(self, date_debut, date_fin, par="hotel"):
+        """Indicateurs de la période regroupés par "hotel" ou par "type" : dictionnaire de colonnes"""
+        debut, fin = to_ordinal(date_debut), to_ordinal(date_fin)
+        jours = max(fin - debut + 1, 0)
+        if par == "hotel":
+            groupe_chambre, n = self.chambre_hotel, len(self.hotel_ids)
+        else:
+            groupe_chambre, n = self.chambre_type, len(self.type_ids)
+
+        _, _, nuits = self._nights(debut, fin)
+        groupe_sejour = groupe_chambre[self.sejour_chambre]
+        vendues = np.bincount(groupe_sejour, weights=nuits, minlength=n)
+        ca_chambres = np.bincount(groupe_sejour, weights=nuits * self.chambre_tarif[self.sejour_chambre],
+                                  minlength=n)
+        disponibles = np.bincount(groupe_chambre, minlength=n) * jours
+
+        colonnes = {}
+        if par == "hotel":
+            dans_periode = (self.prestation_jour >= debut) & (self.prestation_jour <= fin)
+            ca_prestations = np.bincount(self.prestation_hotel[dans_periode],
+                                         weights=self.prestation_montant[dans_periode], minlength=n)
+            colonnes["Id_Hotel"] = self.hotel_ids
+            colonnes["Ville"] = self.hotel_villes
+        else:
+            colonnes["Id_Type"] = self.type_ids
+            colonnes["Type"] = self.type_noms
+        colonnes.update({
+            "Chambres": np.bincount(groupe_chambre, minlength=n),
+            "Nuits_vendues": vendues.astype(np.int64),
+            "Occupation": _ratio(vendues, disponibles),
+            "ADR": _ratio(ca_chambres, vendues),
+            "RevPAR": _ratio(ca_chambres, disponibles),
+            "CA_chambres": ca_chambres,
+        })
+        if par == "hotel":
+            colonnes["CA_prestations"] = ca_prestations
+            colonnes["CA_total"] = ca_chambres + ca_prestations
+        return colonnes
+
+    def daily(self, date_debut, date_fin, id_hotel=None, id_type=None):
+        """Série journalière (occupation, nuits vendues, CA chambres) sur la période"""
+        debut, fin = to_ordinal(date_debut), to_ordinal(date_fin)
+        jours = max(fin - debut + 1, 0)
+        chambres = self._rooms_mask(id_hotel, id_type)
+        premiere, derniere, nuits = self._nights(debut, fin)
+        retenus = (nuits > 0) & chambres[self.sejour_chambre]
+        premiere, derniere = premiere[retenus] - debut, derniere[retenus] - debut
+        tarif = self.chambre_tarif[self.sejour_chambre[retenus]]
+
+        # Tableau de différences : +1 la première nuit, -1 le lendemain de la dernière
+        occupees = np.cumsum(np.bincount(premiere, minlength=jours + 1)
+                             - np.bincount(derniere, minlength=jours + 1))[:jours]
+        ca = np.cumsum(np.bincount(premiere, weights=tarif, minlength=jours + 1)
+                       - np.bincount(derniere, weights=tarif, minlength=jours + 1))[:jours]
+        total = int(chambres.sum())
+        return {
+            "Jour": [date.fromordinal(debut + i) for i in range(jours)],
+            "Nuits_vendues": occupees,
+            "Occupation": occupees / total if total else np.zeros(jours),
+            "CA_chambres": ca,
+        }
+
+    def totals(self, date_debut, date_fin):
+        """Indicateurs globaux de la période"""
+        colonnes = self.summary(date_debut, date_fin, "hotel")
+        jours = max(to_ordinal(date_fin) - to_ordinal(date_debut) + 1, 0)
+        vendues = colonnes["Nuits_vendues"].sum()
+        disponibles = len(self.numeros) * jours
+        ca_chambres = colonnes["CA_chambres"].sum()
+        return {
+            "Occupation": vendues / disponibles if disponibles else 0.0,
+            "ADR": ca_chambres / vendues if vendues else 0.0,
+            "RevPAR": ca_chambres / disponibles if disponibles else 0.0,
+            "CA_chambres": float(ca_chambres),
+            "CA_prestations": float(colonnes["CA_prestations"].sum()),
+        }
+
+
+class AnalyticsEngine:
+    """Données d'analyse partagées, rechargées quand les tables lues ont changé"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+
+    def data(self, conn):
+        generations = QueryCache.generations(conn, TABLES)
+        with self._lock:
+            if self._data is None or self._data.generations != generations:
+                self._data = AnalyticsData(conn)
+            return self._data
+
+
+if __name__ == "__main__":
+    from database import connect
+    from migrations import migrate
+
+    conn = connect(sys.argv[1] if len(sys.argv) > 1 else "data/hotel.db")
+    migrate(conn)
+    fin = date.fromisoformat(sys.argv[3]) if len(sys.argv) > 3 else date.today()
+    debut = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else fin - timedelta(days=365)
+    t = time.perf_counter()
+    data = AnalyticsData(conn)
+    print(f"Chargement : {len(data.sejour_arrivee)} séjours, {len(data.hotel_ids)} hôtels "
+          f"en {time.perf_counter() - t:.3f} s")
+    t = time.perf_counter()
+    par_hotel = data.summary(debut, fin, "hotel")
+    par_type = data.summary(debut, fin, "type")
+    journalier = data.daily(debut, fin)
+    totaux = data.totals(debut, fin)
+    print(f"Calcul du {debut} au {fin} : {time.perf_counter() - t:.3f} s")
+    for cle, valeur in totaux.items():
+        print(f"{cle}: {valeur:.4f}" if cle == "Occupation" else f"{cle}: {valeur:.2f}")
@@ -0,0 +1,278 @@
+"""Serveur HTTP/JSON du service de réservation (asyncio, bibliothèque standard).
+
+    python src/api.py --port 8080
+    python src/api.py --shards data/shards   # une base par hôtel (sharding.py)
+
+    GET  /disponibilites?arrivee=2025-07-01&depart=2025-07-05[&hotel=1][&type=2]
+    GET  /reservations[?client=Dupont][&depuis=2025-01-01][&jusqu=2025-12-31][&curseur=...][&limit=50]
+    POST /reservations   {"Id_Client": 1, "Date_arrivee": "...", "Date_depart": "...",
+                          "Chambres": [101], "Prestations": {"1": 2}[, "Id_Hotel": 1]}
+    POST /devis          {"Ville": "Lyon", "Date_arrivee": "...", "Date_depart": "...", "Id_Type": 1,
+                          "Chambres": 1, "Prestations": {"Petit déjeuner": 2}}   (quotes.py)
+                         ou {"demandes": [...]} : une liste d'options par demande
+    GET  /sante
+
+Le travail SQLite est exécuté dans un pool de threads ; la boucle asyncio ne
+fait que lire les requêtes et écrire les réponses (connexions keep-alive).
+
+Avec --shards, Id_Hotel est obligatoire quand des numéros de chambre existent
+dans plusieurs hôtels ; les réservations listées portent leur Id_Hotel.
+Les devis, calculés sur l'index des disponibilités d'une base unique, n'y
+sont pas servis.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qsl, urlsplit
+
+from database import Database, connect, ensure_database
+from migrations import migrate
+from quotes import QuoteEngine
+from service import BookingBusy, BookingError, BookingService, RoomUnavailable
+from sharding import ShardRouter
+
+MAX_BODY = 1 << 20
+
+STATUTS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+
+
+def _entier(params, nom):
+    valeur = params.get(nom)
+    if valeur in (None, ""):
+        return None
+    try:
+        return int(valeur)
+    except ValueError:
+        raise HttpError(400, f"paramètre {nom} invalide") from None
+
+
+def _limite(params, defaut=50, maximum=500):
+    """Taille de page : `defaut` sans paramètre, ramenée à `maximum` au-delà"""
+    limite = _entier(params, "limit")
+    if limite is None:
+        return defaut
+    if limite < 1:
+        raise HttpError(400, "paramètre limit invalide (au moins 1)")
+    return min(limite, maximum)
+
+
+def _jour(params, nom, obligatoire=True):
+    valeur = params.get(nom)
+    if not valeur:
+        if not obligatoire:
+            return None
+        raise HttpError(400, "paramètres arrivee et depart obligatoires")
+    try:
+        return date.fromisoformat(valeur[:10])
+    except ValueError:
+        raise HttpError(400, f"paramètre {nom} invalide (AAAA-MM-JJ)") from None
+
+
+def _curseur(params, identifiants):
+    """Curseur [Date_arrivee, identifiant...] rendu par la page précédente ;
+    `identifiants` vaut 1 (Id_Reservation), ou 2 avec --shards (Id_Hotel, Id_Reservation)"""
+    valeur = params.get("curseur")
+    if not valeur:
+        return None
+    try:
+        curseur = json.loads(valeur)
+    except ValueError:
+        curseur = None
+    if (not isinstance(curseur, list) or len(curseur) != 1 + identifiants
+            or not isinstance(curseur[0], str)
+            or not all(isinstance(v, int) and not isinstance(v, bool) for v in curseur[1:])):
+        raise HttpError(400, "paramètre curseur invalide")
+    return tuple(curseur)
+
+
+class BookingApi:
+    """Routage des requêtes vers le service ; chaque méthode s'exécute dans un thread du pool"""
+
+    def __init__(self, service):
+        self.service = service
+        self.quotes = QuoteEngine(service) if hasattr(service, "index") else None
+        # Base répartie : Id_Hotel départage les réservations d'un même jour
+        self.identifiants_curseur = 1 if hasattr(service, "index") else 2
+
+    def handle(self, methode, chemin, params, corps):
+        if chemin == "/sante":
+            return 200, {"statut": "ok"}
+        if chemin == "/disponibilites":
+            if methode != "GET":
+                raise HttpError(405, "méthode non autorisée")
+            chambres = self.service.search_availability(
+                _jour(params, "arrivee"), _jour(params, "depart"), _entier(params, "hotel"), _entier(params, "type"))
+            return 200, {"chambres": chambres}
+        if chemin == "/reservations":
+            if methode == "GET":
+                depuis, jusqu = _jour(params, "depuis", obligatoire=False), _jour(params, "jusqu", obligatoire=False)
+                rows, suivant = self.service.list_reservations(
+                    _curseur(params, self.identifiants_curseur), _limite(params), params.get("client"),
+                    depuis and depuis.isoformat(), jusqu and jusqu.isoformat(), details=True)
+                return 200, {"reservations": rows, "curseur": suivant}
+            if methode == "POST":
+                demande = self._json(corps)
+                try:
+                    id_reservation = self.service.create_reservation(
+                        int(demande["Id_Client"]), demande["Date_arrivee"], demande["Date_depart"],
+                        [int(n) for n in demande.get("Chambres", [])],
+                        {int(k): int(v) for k, v in (demande.get("Prestations") or {}).items()},
+                        None if demande.get("Id_Hotel") is None else int(demande["Id_Hotel"]))
+                except (KeyError, TypeError, ValueError) as exc:
+                    if isinstance(exc, BookingError):
+                        raise
+                    raise HttpError(400, f"demande invalide : {exc}") from None
+                return 201, {"Id_Reservation": id_reservation}
+            raise HttpError(405, "méthode non autorisée")
+        if chemin == "/devis" and self.quotes is not None:
+            if methode != "POST":
+                raise HttpError(405, "méthode non autorisée")
+            demande = self._json(corps)
+            if "demandes" in demande:
+                if not isinstance(demande["demandes"], list):
+                    raise HttpError(400, "liste de demandes attendue")
+                return 200, {"devis": self.quotes.quote_batch(demande["demandes"])}
+            try:
+                return 200, {"options": self.quotes.quote(demande)}
+            except (KeyError, TypeError, ValueError) as exc:
+                if isinstance(exc, BookingError):
+                    raise
+                raise HttpError(400, f"demande invalide : {exc!r}") from None
+        raise HttpError(404, "ressource inconnue")
+
+    @staticmethod
+    def _json(corps):
+        try:
+            demande = json.loads(corps or b"{}")
+        except ValueError:
+            raise HttpError(400, "corps JSON invalide") from None
+        if not isinstance(demande, dict):
+            raise HttpError(400, "objet JSON attendu")
+        return demande
+
+
+class HttpServer:
+    def __init__(self, api, workers=8):
+        self.api = api
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sqlite")
+
+    async def _repondre(self, writer, statut, contenu, keep_alive):
+        corps = json.dumps(contenu, ensure_ascii=False, default=str).encode()
+        entetes = (f"HTTP/1.1 {statut} {STATUTS.get(statut, '')}\r\n"
+                   "Content-Type: application/json; charset=utf-8\r\n"
+                   f"Content-Length: {len(corps)}\r\n"
+                   f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(entetes.encode() + corps)
+        await writer.drain()
+
+    async def client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                ligne = await reader.readline()
+                if not ligne:
+                    break
+                try:
+                    methode, cible, version = ligne.decode("latin-1").split()
+                except ValueError:
+                    await self._repondre(writer, 400, {"erreur": "requête invalide"}, False)
+                    break
+                entetes = {}
+                while True:
+                    entete = await reader.readline()
+                    if entete in (b"\r\n", b"\n", b""):
+                        break
+                    nom, _, valeur = entete.decode("latin-1").partition(":")
+                    entetes[nom.strip().lower()] = valeur.strip()
+                try:
+                    longueur = int(entetes.get("content-length") or 0)
+                except ValueError:
+                    longueur = -1
+                if longueur < 0:
+                    await self._repondre(writer, 400, {"erreur": "Content-Length invalide"}, False)
+                    break
+                if longueur > MAX_BODY:
+                    await self._repondre(writer, 413, {"erreur": "corps trop volumineux"}, False)
+                    break
+                corps = await reader.readexactly(longueur) if longueur else b""
+                keep_alive = (entetes.get("connection", "").lower() != "close"
+                              and version == "HTTP/1.1")
+
+                url = urlsplit(cible)
+                try:
+                    statut, contenu = await loop.run_in_executor(
+                        self.executor, self.api.handle, methode, url.path.rstrip("/") or "/",
+                        dict(parse_qsl(url.query)), corps)
+                except HttpError as exc:
+                    statut, contenu = exc.statut, {"erreur": str(exc)}
+                except RoomUnavailable as exc:
+                    statut, contenu = 409, {"erreur": str(exc)}
+                except BookingBusy as exc:
+                    statut, contenu = 503, {"erreur": str(exc)}
+                except BookingError as exc:
+                    statut, contenu = 400, {"erreur": str(exc)}
+                except Exception as exc:
+                    # Toute requête reçoit une réponse ; le détail reste dans le journal du serveur
+                    traceback.print_exception(exc, file=sys.stderr)
+                    statut, contenu = 500, {"erreur": "erreur interne" if not isinstance(exc, sqlite3.Error)
+                                            else "erreur de la base de données"}
+                await self._repondre(writer, statut, contenu, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port, started=None):
+        server = await asyncio.start_server(self.client, host, port)
+        if started:
+            started(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="threads SQLite")
+    parser.add_argument("--shards", help="dossier de la base répartie par hôtel (au lieu de --db)")
+    args = parser.parse_args()
+
+    if args.shards:
+        service = database = ShardRouter(args.shards)
+    else:
+        ensure_database(args.db)
+        conn = connect(args.db)
+        migrate(conn)
+        conn.close()
+        database = Database(args.db, writers=2, readers=args.workers)
+        service = BookingService(database)
+    server = HttpServer(BookingApi(service), args.workers)
+    print(f"Service de réservation sur http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
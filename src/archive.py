@@ -0,0 +1,204 @@
+"""Archivage des réservations terminées dans une base SQLite séparée.
+
+Les séjours partis depuis plus de `--horizon-days` jours quittent les tables
+Reservation, Reservation_Chambre et Reservation_Prestation pour leurs copies
+dans <base>_archive.db, attachée sous le nom `archive` par database.connect().
+Les vues temporaires Historique_<table> réunissent les deux pour les rapports
+(analytics.py, calendrier) ; le reste de l'application ne lit que les tables
+chaudes.
+
+    python src/archive.py [--db data/hotel.db] [--horizon-days 730] [--chunk 500]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from urllib.parse import quote
+
+DEFAULT_HORIZON_DAYS = 730
+# Réservations déplacées par transaction, et pause entre deux paquets pour
+# laisser passer les réservations du front desk
+ARCHIVE_CHUNK = 500
+ARCHIVE_PAUSE = 0.05
+# Les suppressions sont journalisées pour l'index des disponibilités
+# (Journal_Index) ; un processus qui n'a pas lu le journal depuis plus
+# longtemps que cette durée reconstruit son index
+JOURNAL_RETENTION_DAYS = 1
+
+# Ordre de suppression dans les tables chaudes : les lignes filles d'abord
+ARCHIVED_TABLES = {
+    "Reservation_Chambre": "Id_Reservation, Numero_chambre",
+    "Reservation_Prestation": "Id_Reservation, Id_Prestation, Quantite",
+    "Reservation": "Id_Reservation, Date_arrivee, Date_depart, Id_Client",
+}
+
+# Mêmes colonnes que le schéma initial ; les clés étrangères ne peuvent pas
+# viser une autre base
+ARCHIVE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS archive.Reservation (
+        Id_Reservation INTEGER PRIMARY KEY,
+        Date_arrivee TEXT NOT NULL,
+        Date_depart TEXT NOT NULL,
+        Id_Client INTEGER NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS archive.Reservation_Chambre (
+        Id_Reservation INTEGER,
+        Numero_chambre INTEGER,
+        PRIMARY KEY (Id_Reservation, Numero_chambre)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS archive.Reservation_Prestation (
+        Id_Reservation INTEGER,
+        Id_Prestation INTEGER,
+        Quantite INTEGER DEFAULT 1,
+        PRIMARY KEY (Id_Reservation, Id_Prestation)
+    )''',
+    "CREATE INDEX IF NOT EXISTS archive.idx_reservation_dates ON Reservation(Date_arrivee, Date_depart)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_reservation_client ON Reservation(Id_Client)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_reservation_chambre_numero "
+    "ON Reservation_Chambre(Numero_chambre, Id_Reservation)",
+]
+
+# Une réservation présente dans les deux bases (archivage interrompu entre la
+# copie et la suppression) n'est comptée qu'une fois, depuis les tables chaudes
+_VUE_HISTORIQUE = '''
+    CREATE TEMP VIEW IF NOT EXISTS Historique_{table} AS
+    SELECT {colonnes} FROM main.{table}
+    UNION ALL
+    SELECT {colonnes} FROM archive.{table} a
+    WHERE NOT EXISTS (SELECT 1 FROM main.Reservation m WHERE m.Id_Reservation = a.Id_Reservation)
+'''
+
+# Réservations terminées avant la date donnée, les plus anciennes d'abord
+# (Date_arrivee <= Date_depart : la borne sur l'arrivée permet l'index).
+# Celle qui porte le plus grand rowid de Reservation_Chambre reste : SQLite
+# réattribuerait ce rowid, que l'index des disponibilités considère déjà lu.
+SQL_TO_ARCHIVE = '''
+    SELECT r.Id_Reservation FROM main.Reservation r
+    WHERE r.Date_arrivee < ? AND r.Date_depart < ?
+      AND NOT EXISTS (
+          SELECT 1 FROM main.Reservation_Chambre rc
+          WHERE rc.Id_Reservation = r.Id_Reservation
+            AND rc.rowid = (SELECT MAX(rowid) FROM main.Reservation_Chambre))
+    ORDER BY r.Date_arrivee
+    LIMIT ?
+'''
+
+
+def archive_path(path):
+    racine, extension = os.path.splitext(path)
+    return f"{racine}_archive{extension or '.db'}"
+
+
+def attach(conn, path, readonly=False):
+    """Attache l'archive de la base `path` et crée les vues Historique_<table>.
+
+    En lecture seule, une archive encore inexistante n'est pas créée : les
+    vues ne portent alors que sur les tables chaudes.
+    """
+    chemin = archive_path(path)
+    attachee = not readonly or os.path.exists(chemin)
+    if attachee:
+        conn.execute("ATTACH DATABASE ? AS archive", (f"file:{quote(chemin)}?mode=ro" if readonly else chemin,))
+    if attachee and not readonly:
+        conn.execute("PRAGMA archive.journal_mode = WAL")
+        for instruction in ARCHIVE_SCHEMA:
+            conn.execute(instruction)
+        conn.commit()
+    for table, colonnes in ARCHIVED_TABLES.items():
+        vue = _VUE_HISTORIQUE.format(table=table, colonnes=colonnes)
+        if not attachee:
+            vue = vue[:vue.index("UNION ALL")]
+        conn.execute(vue)
+    return attachee
+
+
+def _copy(conn, ids):
+    marks = ", ".join("?" * len(ids))
+    for table, colonnes in ARCHIVED_TABLES.items():
+        conn.execute(f"DELETE FROM archive.{table} WHERE Id_Reservation IN ({marks})", ids)
+        conn.execute(f'''INSERT INTO archive.{table} ({colonnes})
+                         SELECT {colonnes} FROM main.{table} WHERE Id_Reservation IN ({marks})''', ids)
+
+
+def archive_reservations(conn, avant, chunk=ARCHIVE_CHUNK, pause=ARCHIVE_PAUSE):
+    """Déplace vers l'archive les réservations parties avant `avant` ; retourne leur nombre.
+
+    Chaque paquet est d'abord copié dans une transaction qui n'écrit que dans
+    l'archive (en WAL, un commit sur plusieurs bases n'est pas atomique : une
+    ligne doit être dans l'archive avant de quitter les tables chaudes).
+    Sous BEGIN IMMEDIATE, la copie est ensuite rafraîchie et les lignes
+    supprimées des tables chaudes ; ce verrou ne dure que le temps d'un paquet.
+    Les index des disponibilités retirent ces séjours au fil du journal, sans
+    reconstruction ; le journal est purgé une fois l'archivage terminé.
+    """
+    avant = str(avant)
+    total = 0
+    while True:
+        ids = [row[0] for row in conn.execute(SQL_TO_ARCHIVE, (avant, avant, chunk))]
+        if not ids:
+            purge_journal(conn)
+            return total
+
+        conn.execute("BEGIN")
+        try:
+            _copy(conn, ids)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Une réservation modifiée entre-temps (dates repoussées) reste
+            marks = ", ".join("?" * len(ids))
+            ids = [row[0] for row in conn.execute(
+                f"SELECT Id_Reservation FROM main.Reservation WHERE Id_Reservation IN ({marks}) AND Date_depart < ?",
+                ids + [avant])]
+            if ids:
+                _copy(conn, ids)
+                marks = ", ".join("?" * len(ids))
+                for table in ARCHIVED_TABLES:
+                    conn.execute(f"DELETE FROM main.{table} WHERE Id_Reservation IN ({marks})", ids)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        total += len(ids)
+        time.sleep(pause)
+
+
+def purge_journal(conn, jours=JOURNAL_RETENTION_DAYS):
+    """Supprime les lignes de Journal_Index écrites il y a plus de `jours` jours ; retourne leur nombre"""
+    with conn:
+        return conn.execute("DELETE FROM main.Journal_Index WHERE Date_ecriture < datetime('now', ?)",
+                            (f"-{jours} days",)).rowcount
+
+
+def main():
+    from database import connect
+    from migrations import migrate
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"))
+    parser.add_argument("--horizon-days", type=int, default=DEFAULT_HORIZON_DAYS,
+                        help="archive les séjours partis depuis plus de N jours")
+    parser.add_argument("--chunk", type=int, default=ARCHIVE_CHUNK, help="réservations par transaction")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        migrate(conn)
+        avant = date.today() - timedelta(days=args.horizon_days)
+        debut = time.perf_counter()
+        nombre = archive_reservations(conn, avant, args.chunk)
+        restantes = conn.execute("SELECT COUNT(*) FROM main.Reservation").fetchone()[0]
+        archivees = conn.execute("SELECT COUNT(*) FROM archive.Reservation").fetchone()[0]
+        print(f"{nombre} réservations parties avant le {avant} archivées en {time.perf_counter() - debut:.1f} s "
+              f"({restantes} en cours, {archivees} dans {archive_path(args.db)})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
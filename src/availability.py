@@ -0,0 +1,242 @@
+import bisect
+import math
+import threading
+from collections import Counter, defaultdict
+from datetime import date
+
+SQL_STAYS = '''
+    SELECT rc.rowid, rc.Numero_chambre, r.Date_arrivee, r.Date_depart
+    FROM Reservation_Chambre rc
+    JOIN Reservation r ON r.Id_Reservation = rc.Id_Reservation
+    WHERE rc.rowid > ?
+    ORDER BY rc.rowid
+'''
+
+SQL_JOURNAL = '''
+    SELECT Id, Numero_chambre, Date_arrivee, Date_depart, Signe
+    FROM Journal_Index
+    WHERE Id > ?
+    ORDER BY Id
+'''
+
+# Premier Id encore lisible dans le journal : s'il dépasse le successeur du
+# dernier Id appliqué, des lignes ont été purgées avant d'être lues
+SQL_JOURNAL_START = '''
+    SELECT COALESCE((SELECT MIN(Id) FROM Journal_Index),
+                    (SELECT seq + 1 FROM sqlite_sequence WHERE name = 'Journal_Index'), 1)
+'''
+
+
+def to_ordinal(jour):
+    """Convertit une date (objet date ou chaîne ISO) en numéro de jour ; un numéro est rendu tel quel"""
+    if isinstance(jour, int):
+        return jour
+    if isinstance(jour, str):
+        jour = date.fromisoformat(jour[:10])
+    return jour.toordinal()
+
+
+class RoomSchedule:
+    """Séjours d'une chambre, triés par date d'arrivée.
+
+    `fins_max[i]` contient la plus grande date de départ parmi les i+1 premiers
+    séjours : un chevauchement se teste donc avec une seule recherche dichotomique.
+    """
+
+    __slots__ = ("debuts", "fins", "fins_max")
+
+    def __init__(self):
+        self.debuts = []
+        self.fins = []
+        self.fins_max = []
+
+    @classmethod
+    def from_stays(cls, sejours):
+        """Planning construit en une passe depuis des couples (début, fin) dans un ordre quelconque"""
+        planning = cls()
+        courant = -math.inf
+        for debut, fin in sorted(sejours):
+            courant = max(courant, fin)
+            planning.debuts.append(debut)
+            planning.fins.append(fin)
+            planning.fins_max.append(courant)
+        return planning
+
+    def stays(self):
+        return list(zip(self.debuts, self.fins))
+
+    def add(self, debut, fin):
+        pos = bisect.bisect_right(self.debuts, debut)
+        self.debuts.insert(pos, debut)
+        self.fins.insert(pos, fin)
+        self.fins_max.insert(pos, 0)
+        courant = self.fins_max[pos - 1] if pos else fin
+        for i in range(pos, len(self.fins)):
+            courant = max(courant, self.fins[i])
+            self.fins_max[i] = courant
+
+    def is_free(self, debut, fin):
+        # Même règle que la requête SQL d'origine :
+        # occupée si Date_arrivee <= fin ET Date_depart >= debut
+        pos = bisect.bisect_right(self.debuts, fin)
+        return pos == 0 or self.fins_max[pos - 1] < debut
+
+    def gaps(self, debut, fin):
+        """Jours libres laissés avant et après le séjour (math.inf sans voisin), ou None si la
+        chambre est prise ; les séjours d'une chambre ne se chevauchant pas, les voisins
+        sont ceux qui l'entourent dans l'ordre des arrivées"""
+        if not self.is_free(debut, fin):
+            return None
+        pos = bisect.bisect_left(self.debuts, debut)
+        avant = debut - self.fins_max[pos - 1] - 1 if pos else math.inf
+        apres = self.debuts[pos] - fin - 1 if pos < len(self.debuts) else math.inf
+        return avant, apres
+
+    def copy(self):
+        planning = RoomSchedule()
+        planning.debuts, planning.fins, planning.fins_max = list(self.debuts), list(self.fins), list(self.fins_max)
+        return planning
+
+
+class AvailabilityIndex:
+    """Index en mémoire des disponibilités, construit une fois depuis
+    Reservation/Reservation_Chambre puis mis à jour de façon incrémentale."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._synchro = threading.Lock()
+        self._chambres = {}      # Numero -> (Id_Hotel, Id_Type, Etage)
+        self._groupes = {}       # (Id_Hotel, Id_Type) -> [Numero, ...] triés
+        self._plannings = {}     # Numero -> RoomSchedule
+        self._dernier_rowid = 0  # dernier rowid de Reservation_Chambre indexé
+        self._dernier_journal = None  # dernier Id de Journal_Index appliqué, None avant la construction
+
+    @classmethod
+    def build(cls, conn):
+        index = cls()
+        index.load_rooms(conn)
+        index.sync(conn)
+        return index
+
+    def load_rooms(self, conn):
+        """(Re)charge la liste des chambres"""
+        rows = conn.execute(
+            "SELECT Numero, Id_Hotel, Id_Type, Etage FROM Chambre"
+        ).fetchall()
+        with self._lock:
+            self._chambres = {}
+            self._groupes = {}
+            for numero, id_hotel, id_type, etage in rows:
+                self._add_room(numero, id_hotel, id_type, etage)
+
+    def _add_room(self, numero, id_hotel, id_type, etage):
+        self._chambres[numero] = (id_hotel, id_type, etage)
+        bisect.insort(self._groupes.setdefault((id_hotel, id_type), []), numero)
+        self._plannings.setdefault(numero, RoomSchedule())
+
+    def sync(self, conn):
+        """Intègre les écritures faites depuis le dernier appel, quelle que soit la session.
+
+        Le rowid de Reservation_Chambre croît à chaque insertion : seules les
+        nouvelles liaisons sont lues. Suppressions et changements de chambre ou
+        de dates (archivage, réattribution) sont lus dans Journal_Index, tenu à
+        jour par trigger. Seules les chambres touchées sont recalculées ; l'index
+        n'est relu en entier qu'à la construction ou si des lignes du journal
+        ont été purgées avant d'être appliquées.
+        """
+        with self._synchro:
+            # Liaisons et journal lus dans le même instantané de la base
+            lecture = not conn.in_transaction
+            if lecture:
+                conn.execute("BEGIN")
+            try:
+                debut_journal = conn.execute(SQL_JOURNAL_START).fetchone()[0]
+                if self._dernier_journal is None or debut_journal > self._dernier_journal + 1:
+                    return self._rebuild(conn)
+                liaisons = conn.execute(SQL_STAYS, (self._dernier_rowid,)).fetchall()
+                journal = conn.execute(SQL_JOURNAL, (self._dernier_journal,)).fetchall()
+            finally:
+                if lecture:
+                    conn.commit()
+            if not liaisons and not journal:
+                return 0
+            ajouts, retraits = defaultdict(list), defaultdict(Counter)
+            for _, numero, arrivee, depart in liaisons:
+                ajouts[numero].append((to_ordinal(arrivee), to_ordinal(depart)))
+            for _, numero, arrivee, depart, signe in journal:
+                sejour = (to_ordinal(arrivee), to_ordinal(depart))
+                if signe > 0:
+                    ajouts[numero].append(sejour)
+                else:
+                    retraits[numero][sejour] += 1
+            # Plannings des chambres touchées recalculés à part, puis remplacés d'un bloc
+            plannings = {}
+            for numero in ajouts.keys() | retraits.keys():
+                actuel = self._plannings.get(numero)
+                sejours = (actuel.stays() if actuel else []) + ajouts.get(numero, [])
+                if numero in retraits:
+                    # Une liaison ajoutée puis supprimée entre deux passages n'a
+                    # jamais été lue : son retrait ne trouve rien à enlever
+                    restants = retraits[numero]
+                    conserves = []
+                    for sejour in sejours:
+                        if restants[sejour] > 0:
+                            restants[sejour] -= 1
+                        else:
+                            conserves.append(sejour)
+                    sejours = conserves
+                plannings[numero] = RoomSchedule.from_stays(sejours)
+            with self._lock:
+                self._plannings.update(plannings)
+                if liaisons:
+                    self._dernier_rowid = liaisons[-1][0]
+                if journal:
+                    self._dernier_journal = journal[-1][0]
+        return len(liaisons) + len(journal)
+
+    def _rebuild(self, conn):
+        """Relit tous les séjours, dans l'instantané ouvert par sync ; l'index
+        reste utilisable pendant la lecture"""
+        dernier_journal = conn.execute("SELECT COALESCE(MAX(Id), 0) FROM Journal_Index").fetchone()[0]
+        rows = conn.execute(SQL_STAYS, (0,)).fetchall()
+        sejours = defaultdict(list)
+        for _, numero, arrivee, depart in rows:
+            sejours[numero].append((to_ordinal(arrivee), to_ordinal(depart)))
+        plannings = {numero: RoomSchedule.from_stays(liste) for numero, liste in sejours.items()}
+        with self._lock:
+            for numero in self._chambres:
+                plannings.setdefault(numero, RoomSchedule())
+            self._plannings = plannings
+            self._dernier_rowid = rows[-1][0] if rows else 0
+            self._dernier_journal = dernier_journal
+        return len(rows)
+
+    def schedules(self, numeros):
+        """Copies des plannings des chambres, à modifier sans toucher à l'index"""
+        with self._lock:
+            return {numero: self._plannings.setdefault(numero, RoomSchedule()).copy() for numero in numeros}
+
+    def is_free(self, numero, date_debut, date_fin):
+        debut, fin = to_ordinal(date_debut), to_ordinal(date_fin)
+        with self._lock:
+            planning = self._plannings.get(numero)
+            return planning is None or planning.is_free(debut, fin)
+
+    def free_rooms(self, date_debut, date_fin, id_hotel=None, id_type=None):
+        """Numéros des chambres libres entre les deux dates, triés par étage puis numéro"""
+        debut, fin = to_ordinal(date_debut), to_ordinal(date_fin)
+        with self._lock:
+            if id_hotel is not None and id_type is not None:
+                # Un seul groupe : lu directement (devis, formulaire de réservation)
+                candidats = list(self._groupes.get((id_hotel, id_type), ()))
+            else:
+                candidats = []
+                for (hotel, type_), numeros in self._groupes.items():
+                    if id_hotel is not None and hotel != id_hotel:
+                        continue
+                    if id_type is not None and type_ != id_type:
+                        continue
+                    candidats.extend(numeros)
+            libres = [n for n in candidats if self._plannings[n].is_free(debut, fin)]
+            libres.sort(key=lambda n: (self._chambres[n][2], n))
+        return libres
@@ -0,0 +1,239 @@
+"""Chronomètre les requêtes de chaque page de main() et la création de réservation
+sur des copies de la base complétées par generate_data.py.
+
+    python src/benchmark.py --scales 10,100,1000 --output benchmark.json
+    python src/benchmark.py --scales 100 --compare benchmark.json   # écarts avec une mesure précédente
+
+Le fichier JSON garde, par échelle, le volume des tables et pour chaque
+requête la médiane, le p95 et le minimum en millisecondes.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import generate_data
+import repository
+from availability import AvailabilityIndex
+from database import Database
+from service import BookingService
+
+PAGE_SIZE = 50
+
+TABLES = ["Hotel", "Chambre", "Client", "Reservation", "Reservation_Chambre",
+          "Prestation", "Reservation_Prestation", "Evaluation"]
+
+
+class Context:
+    """Base de l'échelle mesurée et échantillons de paramètres tirés de ses données"""
+
+    def __init__(self, database, service, seed=0):
+        self.database = database
+        self.service = service
+        self.rng = random.Random(seed)
+        with database.connection(readonly=True) as conn:
+            self.hotels = [row[0] for row in conn.execute("SELECT Id_Hotel FROM Hotel")]
+            self.types = [row[0] for row in conn.execute("SELECT Id_Type FROM Type_Chambre")]
+            self.clients = [row[0] for row in conn.execute("SELECT Id_Client FROM Client")]
+            self.prestations = [row[0] for row in conn.execute("SELECT Id_Prestation FROM Prestation")]
+            self.noms = [row[0] for row in conn.execute("SELECT Nom FROM Client LIMIT 100")] or ["Dupont"]
+            self.premiere_page = repository.page_reservations(conn, None, PAGE_SIZE)[0]
+        self.aujourdhui = date.today()
+
+    def sejour(self):
+        arrivee = self.aujourdhui + timedelta(days=self.rng.randint(-30, 150))
+        return arrivee, arrivee + timedelta(days=self.rng.randint(1, 7))
+
+
+def _lecture(fonction):
+    """Mesure `fonction(conn, ctx)` sur une connexion en lecture seule, comme les pages"""
+    def mesure(ctx):
+        with ctx.database.connection(readonly=True) as conn:
+            return fonction(conn, ctx)
+    return mesure
+
+
+def _details(ctx):
+    if ctx.premiere_page:
+        ctx.service.reservation_details(ctx.rng.choice(ctx.premiere_page))
+
+
+def _reservation(ctx):
+    """Réserve une chambre libre (cherchée hors mesure) : chemin de création complet"""
+    for _ in range(100):
+        arrivee, depart = ctx.sejour()
+        libres = ctx.service.index.free_rooms(arrivee, depart)
+        if libres:
+            break
+    else:
+        raise RuntimeError("aucune chambre libre trouvée")
+    debut = time.perf_counter()
+    ctx.service.create_reservation(ctx.rng.choice(ctx.clients), arrivee, depart, [ctx.rng.choice(libres)])
+    return time.perf_counter() - debut
+
+
+# (page du menu, mesure) -> fonction(ctx) ; une fonction qui retourne un
+# nombre fournit elle-même la durée mesurée
+BENCHMARKS = {
+    ("Accueil", "occupation_today"): _lecture(lambda conn, ctx: repository.occupation_today(conn)),
+    ("Accueil", "count_clients"): _lecture(lambda conn, ctx: repository.count_clients(conn)),
+    ("Accueil", "hotel_ratings"): _lecture(lambda conn, ctx: repository.hotel_ratings(conn)),
+    ("Réservations", "premiere_page"): lambda ctx: ctx.service.list_reservations(None, PAGE_SIZE),
+    ("Réservations", "page_suivante"): lambda ctx: ctx.service.list_reservations(
+        (ctx.premiere_page[-1]["Date_arrivee"], ctx.premiere_page[-1]["Id_Reservation"])
+        if ctx.premiere_page else None, PAGE_SIZE),
+    ("Réservations", "filtre_client"): lambda ctx: ctx.service.list_reservations(
+        None, PAGE_SIZE, ctx.rng.choice(ctx.noms)),
+    ("Réservations", "filtre_dates"): lambda ctx: ctx.service.list_reservations(
+        None, PAGE_SIZE, None, *ctx.sejour()),
+    ("Réservations", "details"): _details,
+    ("Clients", "premiere_page"): _lecture(lambda conn, ctx: repository.page_clients(conn, None, PAGE_SIZE)),
+    ("Clients", "recherche"): _lecture(lambda conn, ctx: repository.page_clients(
+        conn, None, PAGE_SIZE, ctx.rng.choice(ctx.noms).split()[-1])),
+    ("Clients", "evaluations_client"): _lecture(lambda conn, ctx: repository.evaluations_by_client(
+        conn, [ctx.rng.choice(ctx.clients)])),
+    ("Chambres Disponibles", "recherche"): lambda ctx: ctx.service.search_availability(*ctx.sejour()),
+    ("Chambres Disponibles", "prestations_hotels"): _lecture(lambda conn, ctx: repository.prestations_by_hotel(
+        conn, ctx.hotels)),
+    ("Chambres Disponibles", "construction_index"): _lecture(lambda conn, ctx: AvailabilityIndex.build(conn)),
+    ("Ajouter Réservation", "listes"): _lecture(lambda conn, ctx: (
+        repository.hotels(conn), repository.room_types(conn))),
+    ("Ajouter Réservation", "recherche_client"): _lecture(lambda conn, ctx: repository.search_clients(
+        conn, ctx.rng.choice(ctx.noms)[:3])),
+    ("Ajouter Réservation", "chambres_libres"): lambda ctx: ctx.service.search_availability(
+        *ctx.sejour(), ctx.rng.choice(ctx.hotels), ctx.rng.choice(ctx.types)),
+    ("Ajouter Réservation", "creation"): _reservation,
+    ("Prestations", "premiere_page"): _lecture(lambda conn, ctx: repository.page_prestations(
+        conn, None, PAGE_SIZE)),
+    ("Prestations", "filtre_hotel"): _lecture(lambda conn, ctx: repository.page_prestations(
+        conn, None, PAGE_SIZE, ctx.rng.choice(ctx.hotels))),
+    ("Prestations", "utilisation"): _lecture(lambda conn, ctx: repository.prestation_usage(
+        conn, [ctx.rng.choice(ctx.prestations)])),
+    ("Évaluations", "premiere_page"): _lecture(lambda conn, ctx: repository.page_evaluations(
+        conn, None, PAGE_SIZE)),
+    ("Évaluations", "filtres"): _lecture(lambda conn, ctx: repository.page_evaluations(
+        conn, None, PAGE_SIZE, ctx.rng.choice(ctx.hotels), 4)),
+    ("Évaluations", "recherche"): _lecture(lambda conn, ctx: repository.page_evaluations(
+        conn, None, PAGE_SIZE, None, None, ctx.rng.choice(generate_data.COMMENTAIRES[:-1]).split()[-1])),
+}
+
+
+def measure(fonction, ctx, repeat):
+    """Durées (secondes) de `repeat` appels après un appel de chauffe"""
+    fonction(ctx)
+    durees = []
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        resultat = fonction(ctx)
+        duree = time.perf_counter() - debut
+        durees.append(resultat if isinstance(resultat, float) else duree)
+    return durees
+
+
+def summarize(durees):
+    durees = sorted(durees)
+    return {
+        "median_ms": round(1000 * statistics.median(durees), 4),
+        "p95_ms": round(1000 * durees[int(0.95 * (len(durees) - 1))], 4),
+        "min_ms": round(1000 * durees[0], 4),
+        "runs": len(durees),
+    }
+
+
+def run_scale(source, scale, repeat, dossier, seed=0):
+    path = os.path.join(dossier, f"hotel_x{scale}.db")
+    shutil.copy(source, path)
+    _, generation = generate_data.fill(path, seed, **generate_data.scale_parameters(scale))
+
+    database = Database(path)
+    try:
+        with database.connection(readonly=True) as conn:
+            lignes = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLES}
+        service = BookingService(database)
+        ctx = Context(database, service, seed)
+        requetes = {}
+        for (page, nom), fonction in BENCHMARKS.items():
+            requetes[f"{page}/{nom}"] = summarize(measure(fonction, ctx, repeat))
+    finally:
+        database.close()
+    return {"lignes": lignes, "generation_s": round(generation, 2), "requetes": requetes}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(ancien, nouveau, seuil=1.25):
+    """Lignes de rapport pour les requêtes dont la médiane a varié de plus de `seuil`"""
+    rapport = []
+    for scale, resultat in nouveau["echelles"].items():
+        precedent = ancien.get("echelles", {}).get(scale)
+        if not precedent:
+            continue
+        for nom, mesure in resultat["requetes"].items():
+            avant = precedent["requetes"].get(nom)
+            if not avant or not avant["median_ms"]:
+                continue
+            ratio = mesure["median_ms"] / avant["median_ms"]
+            if ratio >= seuil or ratio <= 1 / seuil:
+                sens = "RÉGRESSION" if ratio > 1 else "gain"
+                rapport.append(f"x{scale} {nom}: {avant['median_ms']:.3f} -> {mesure['median_ms']:.3f} ms "
+                               f"({ratio:.2f}x, {sens})")
+    return rapport
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"),
+                        help="base source (copiée, jamais modifiée)")
+    parser.add_argument("--scales", default="10,100", help="échelles séparées par des virgules")
+    parser.add_argument("--repeat", type=int, default=20, help="mesures par requête")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="résultats JSON précédents à comparer")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    resultats = {
+        "revision": _git_revision(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeat": args.repeat,
+        "echelles": {},
+    }
+    with tempfile.TemporaryDirectory() as dossier:
+        for scale in (int(s) for s in args.scales.split(",")):
+            resultat = run_scale(args.db, scale, args.repeat, dossier, args.seed)
+            resultats["echelles"][str(scale)] = resultat
+            print(f"x{scale} : {resultat['lignes']['Reservation']} réservations, "
+                  f"générées en {resultat['generation_s']} s")
+            for nom, mesure in resultat["requetes"].items():
+                print(f"  {nom:45} {mesure['median_ms']:9.3f} ms (p95 {mesure['p95_ms']:.3f})")
+
+    with open(args.output, "w", encoding="utf-8") as fichier:
+        json.dump(resultats, fichier, ensure_ascii=False, indent=2)
+    print(f"Résultats enregistrés dans {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fichier:
+            rapport = compare(json.load(fichier), resultats)
+        for ligne in rapport:
+            print(ligne)
+        sys.exit(1 if any("RÉGRESSION" in ligne for ligne in rapport) else 0)
+
+
+if __name__ == "__main__":
+    main()
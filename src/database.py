@@ -0,0 +1,130 @@
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from archive import attach as attach_archive
+from profiling import connection_factory
+
+# Réglages appliqués à chaque connexion : WAL permet aux lecteurs de ne pas
+# attendre l'écrivain, busy_timeout fait patienter au lieu de lever
+# "database is locked", synchronous=NORMAL suffit en WAL.
+BUSY_TIMEOUT_MS = 5000
+# Nombre de requêtes préparées conservées par connexion
+CACHED_STATEMENTS = 256
+# Jeu d'exemple versionné : jamais ouvert directement, les migrations
+# s'appliquent à la copie de travail (data/hotel.db, ignorée par git)
+SAMPLE_PATH = os.path.join("data", "hotel_exemple.db")
+
+
+def ensure_database(path, sample=SAMPLE_PATH):
+    """Crée la base de travail en copiant le jeu d'exemple si elle n'existe pas encore"""
+    if os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    shutil.copyfile(sample, path)
+    return True
+
+
+def connect(path, readonly=False):
+    """Ouvre une connexion configurée (WAL, busy_timeout, clés étrangères, archive attachée)"""
+    if readonly:
+        # Chemin échappé : « ? », « # » ou « % » dans un nom de dossier changeraient l'URI
+        conn = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS, factory=connection_factory())
+        # Les vues temporaires de l'archive sont créées avant query_only
+        attach_archive(conn, path, readonly=True)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS, factory=connection_factory())
+        conn.execute("PRAGMA journal_mode = WAL")
+        attach_archive(conn, path)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.row_factory = sqlite3.Row  # Pour accéder aux colonnes par nom
+    return conn
+
+
+class ConnectionPool:
+    """Pool de connexions réutilisées d'un rerun à l'autre.
+
+    Une connexion n'est utilisée que par un thread à la fois ; elle est
+    créée à la demande jusqu'à `size`, ensuite `acquire` attend qu'une
+    connexion soit rendue.
+    """
+
+    def __init__(self, path, size=4, readonly=False, timeout=30):
+        self.path = path
+        self.size = size
+        self.readonly = readonly
+        self.timeout = timeout
+        self._libres = queue.LifoQueue()
+        self._creees = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._creees < self.size:
+                self._creees += 1
+                creer = True
+            else:
+                creer = False
+        if creer:
+            try:
+                return connect(self.path, self.readonly)
+            except sqlite3.Error:
+                with self._lock:
+                    self._creees -= 1
+                raise
+        return self._libres.get(timeout=self.timeout)
+
+    def release(self, conn):
+        # Une page interrompue ne doit pas laisser de transaction ouverte
+        if conn.in_transaction:
+            conn.rollback()
+        self._libres.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._libres.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class Database:
+    """Connexions en écriture et en lecture seule vers une même base"""
+
+    def __init__(self, path, writers=2, readers=8):
+        self.path = path
+        # La première connexion en écriture passe la base en WAL, ce qui doit
+        # précéder l'ouverture d'une connexion en lecture seule
+        self.writers = ConnectionPool(path, writers)
+        with self.writers.connection():
+            pass
+        self.readers = ConnectionPool(path, readers, readonly=True)
+
+    def connection(self, readonly=False):
+        """Context manager rendant une connexion du pool adapté"""
+        return (self.readers if readonly else self.writers).connection()
+
+    def close(self):
+        self.writers.close()
+        self.readers.close()
@@ -0,0 +1,248 @@
+"""Export en flux des réservations, évaluations et clients, en CSV ou en Parquet.
+
+    python src/export.py reservations [--db data/hotel.db] [--format csv|parquet] [--out fichier] [--chunk 10000]
+    python src/export.py evaluations|clients [...]
+
+Les lignes sont lues par paquets de `--chunk` (fetchmany) et écrites au fil
+de l'eau : la mémoire utilisée ne dépend pas du nombre de lignes. Le format
+Parquet demande pyarrow ; sans lui, seul CSV est proposé.
+
+Les réservations comprennent l'archive (archive.py), avec leurs chambres, le
+montant des nuits (Tarif du type × nuits, comme dans quotes.py) et celui des
+prestations. Réservations, chambres et prestations sont lues dans l'ordre de
+leur clé primaire puis fusionnées en Python : regroupées par SQLite à travers
+les vues Historique_*, elles seraient matérialisées en entier.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet facultatif
+    pyarrow = None
+
+from availability import to_ordinal
+from database import connect
+
+EXPORT_CHUNK = 10000
+
+FORMATS = ("csv", "parquet") if pyarrow is not None else ("csv",)
+
+MIME_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+# Colonnes exportées et leur type Parquet
+COLUMNS = {
+    "reservations": [
+        ("Id_Reservation", "int64"), ("Date_arrivee", "string"), ("Date_depart", "string"),
+        ("Id_Client", "int64"), ("Client", "string"), ("Id_Hotel", "int64"), ("Ville", "string"),
+        ("Chambres", "string"), ("Nuits", "int64"), ("Montant_chambres", "double"),
+        ("Montant_prestations", "double"), ("Total", "double"),
+    ],
+    "evaluations": [
+        ("Id_Evaluation", "int64"), ("Date_evaluation", "string"), ("Note", "int64"),
+        ("Commentaire", "string"), ("Id_Client", "int64"), ("Client", "string"),
+        ("Id_Hotel", "int64"), ("Ville", "string"),
+    ],
+    "clients": [
+        ("Id_Client", "int64"), ("Nom", "string"), ("Adresse", "string"), ("Ville", "string"),
+        ("Code_postal", "int64"), ("Email", "string"), ("Telephone", "string"),
+    ],
+}
+
+SQL_EXPORT_EVALUATIONS = '''
+    SELECT e.Id_Evaluation, e.Date_evaluation, e.Note, e.Commentaire,
+           e.Id_Client, c.Nom, e.Id_Hotel, h.Ville
+    FROM Evaluation e
+    JOIN Client c ON c.Id_Client = e.Id_Client
+    JOIN Hotel h ON h.Id_Hotel = e.Id_Hotel
+    ORDER BY e.Id_Evaluation
+'''
+
+SQL_EXPORT_CLIENTS = '''
+    SELECT Id_Client, Nom, Adresse, Ville, Code_postal, Email, Telephone
+    FROM Client ORDER BY Id_Client
+'''
+
+# Les trois requêtes suivent l'ordre de Id_Reservation (clé primaire ou index
+# de la clé composée) : aucun tri, aucune table temporaire. CROSS JOIN garde
+# la table lue en premier, l'archive n'ayant pas de statistiques (ANALYZE).
+# Une réservation de l'archive encore présente dans les tables chaudes est lue
+# depuis ces dernières, comme dans les vues Historique_*
+SQL_EXPORT_RESERVATIONS = '''
+    SELECT r.Id_Reservation, r.Date_arrivee, r.Date_depart, r.Id_Client, c.Nom
+    FROM {schema}.Reservation r
+    CROSS JOIN main.Client c ON c.Id_Client = r.Id_Client
+    {condition}
+    ORDER BY r.Id_Reservation
+'''
+
+# Hôtel et tarif de chaque chambre sont pris dans ROOM_TARIFFS, lu une fois :
+# la jointure par ligne coûte plus cher que le dictionnaire
+SQL_EXPORT_ROOMS = '''
+    SELECT Id_Reservation, Numero_chambre FROM {schema}.Reservation_Chambre
+    ORDER BY Id_Reservation
+'''
+
+SQL_ROOM_TARIFFS = '''
+    SELECT ch.Numero, ch.Id_Hotel, t.Tarif
+    FROM Chambre ch JOIN Type_Chambre t ON t.Id_Type = ch.Id_Type
+'''
+
+SQL_EXPORT_PRESTATIONS = '''
+    SELECT rp.Id_Reservation, ROUND(SUM(p.Prix * rp.Quantite), 2)
+    FROM {schema}.Reservation_Prestation rp
+    CROSS JOIN main.Prestation p ON p.Id_Prestation = rp.Id_Prestation
+    GROUP BY rp.Id_Reservation
+    ORDER BY rp.Id_Reservation
+'''
+
+_HORS_TABLES_CHAUDES = '''WHERE NOT EXISTS (
+        SELECT 1 FROM main.Reservation m WHERE m.Id_Reservation = r.Id_Reservation)'''
+
+
+def _chunks(conn, sql, chunk):
+    """Paquets de tuples d'une requête, lus avec fetchmany"""
+    cursor = conn.cursor()
+    cursor.row_factory = None  # tuples : ni sqlite3.Row ni dictionnaire par ligne
+    cursor.execute(sql)
+    while True:
+        rows = cursor.fetchmany(chunk)
+        if not rows:
+            return
+        yield rows
+
+
+def _rows(conn, sql, chunk):
+    for rows in _chunks(conn, sql, chunk):
+        yield from rows
+
+
+def _schemas(conn):
+    """Tables chaudes d'abord : l'archivage copie une réservation avant de la
+    supprimer, la lire ensuite dans l'archive ne peut pas en perdre"""
+    attachees = {row[1] for row in conn.execute("PRAGMA database_list")}
+    return ["main"] + (["archive"] if "archive" in attachees else [])
+
+
+def reservation_chunks(conn, chunk=EXPORT_CHUNK):
+    """Paquets de réservations détaillées (colonnes de COLUMNS["reservations"])"""
+    villes = dict(conn.execute("SELECT Id_Hotel, Ville FROM Hotel").fetchall())
+    tarifs = {numero: (id_hotel, tarif) for numero, id_hotel, tarif in conn.execute(SQL_ROOM_TARIFFS)}
+    paquet = []
+    for schema in _schemas(conn):
+        chambres = _rows(conn, SQL_EXPORT_ROOMS.format(schema=schema), chunk)
+        prestations = _rows(conn, SQL_EXPORT_PRESTATIONS.format(schema=schema), chunk)
+        chambre, prestation = next(chambres, None), next(prestations, None)
+        reservations = SQL_EXPORT_RESERVATIONS.format(
+            schema=schema, condition=_HORS_TABLES_CHAUDES if schema != "main" else "")
+        for id_reservation, arrivee, depart, id_client, client in _rows(conn, reservations, chunk):
+            # Fusion : les trois flux sont triés par Id_Reservation
+            while chambre is not None and chambre[0] < id_reservation:
+                chambre = next(chambres, None)
+            numeros, id_hotel, tarif_nuit = [], None, 0
+            while chambre is not None and chambre[0] == id_reservation:
+                id_hotel, tarif = tarifs.get(chambre[1], (id_hotel, 0))
+                tarif_nuit += tarif
+                numeros.append(str(chambre[1]))
+                chambre = next(chambres, None)
+            while prestation is not None and prestation[0] < id_reservation:
+                prestation = next(prestations, None)
+            montant_prestations = prestation[1] if prestation is not None and prestation[0] == id_reservation else 0
+            nuits = to_ordinal(depart) - to_ordinal(arrivee)
+            montant_chambres = round(nuits * tarif_nuit, 2)
+            paquet.append((id_reservation, arrivee, depart, id_client, client, id_hotel, villes.get(id_hotel),
+                           " ".join(numeros), nuits, montant_chambres, montant_prestations,
+                           round(montant_chambres + montant_prestations, 2)))
+            if len(paquet) == chunk:
+                yield paquet
+                paquet = []
+    if paquet:
+        yield paquet
+
+
+def export_chunks(conn, nom, chunk=EXPORT_CHUNK):
+    if nom == "reservations":
+        return reservation_chunks(conn, chunk)
+    if nom == "evaluations":
+        return _chunks(conn, SQL_EXPORT_EVALUATIONS, chunk)
+    if nom == "clients":
+        return _chunks(conn, SQL_EXPORT_CLIENTS, chunk)
+    raise ValueError(f"export inconnu : {nom}")
+
+
+def write_csv(sortie, colonnes, chunks):
+    """Écrit les paquets en CSV (UTF-8, en-tête) dans un fichier binaire ; retourne le nombre de lignes"""
+    texte = io.TextIOWrapper(sortie, encoding="utf-8", newline="")
+    writer = csv.writer(texte)
+    writer.writerow([nom for nom, _ in colonnes])
+    lignes = 0
+    for rows in chunks:
+        writer.writerows(rows)
+        lignes += len(rows)
+    texte.flush()
+    texte.detach()  # le fichier reste à l'appelant
+    return lignes
+
+
+def write_parquet(sortie, colonnes, chunks):
+    """Écrit chaque paquet comme un groupe de lignes Parquet ; retourne le nombre de lignes"""
+    if pyarrow is None:
+        raise RuntimeError("le format Parquet demande pyarrow")
+    schema = pyarrow.schema([(nom, pyarrow.type_for_alias(type_)) for nom, type_ in colonnes])
+    lignes = 0
+    with pyarrow.parquet.ParquetWriter(sortie, schema) as writer:
+        for rows in chunks:
+            writer.write_batch(pyarrow.record_batch(
+                [pyarrow.array(valeurs, type=champ.type) for valeurs, champ in zip(zip(*rows), schema)],
+                schema=schema))
+            lignes += len(rows)
+    return lignes
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet}
+
+
+def write_export(conn, nom, format_, sortie, chunk=EXPORT_CHUNK):
+    """Exporte `nom` dans le fichier binaire `sortie` ; retourne le nombre de lignes.
+
+    Toutes les lectures se font dans une même transaction : l'export est
+    cohérent même si des réservations sont écrites ou archivées pendant ce temps.
+    """
+    if format_ not in FORMATS:
+        raise ValueError(f"format indisponible : {format_}")
+    conn.execute("BEGIN")
+    try:
+        return WRITERS[format_](sortie, COLUMNS[nom], export_chunks(conn, nom, chunk))
+    finally:
+        conn.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("table", choices=sorted(COLUMNS))
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--out", help="fichier de sortie (défaut : data/exports/<table>.<format>)")
+    parser.add_argument("--chunk", type=int, default=EXPORT_CHUNK, help="lignes lues par fetchmany")
+    args = parser.parse_args()
+
+    chemin = args.out or os.path.join("data", "exports", f"{args.table}.{args.format}")
+    os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+    conn = connect(args.db, readonly=True)
+    debut = time.perf_counter()
+    with open(chemin, "wb") as sortie:
+        lignes = write_export(conn, args.table, args.format, sortie, args.chunk)
+    duree = time.perf_counter() - debut
+    conn.close()
+    taille = os.path.getsize(chemin) / 1e6
+    print(f"{lignes} lignes -> {chemin} ({taille:.1f} Mo) en {duree:.1f} s : "
+          f"{lignes / duree:.0f} lignes/s, {taille / duree:.1f} Mo/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
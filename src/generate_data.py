@@ -0,0 +1,223 @@
+"""Génère un jeu de données synthétique à l'échelle voulue.
+
+    python src/generate_data.py --scale 100 --output /tmp/hotel_x100.db   # copie de data/hotel.db
+    python src/generate_data.py --hotels 50 --rooms-per-hotel 40 --clients 20000 --years 3
+
+Sans --output, la base --db est complétée sur place. --scale N multiplie le
+jeu d'exemple de init_db() (2 hôtels de 4 chambres, 5 clients, 3 évaluations) ;
+les options explicites l'emportent sur --scale.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import aggregates
+from database import connect
+from snapshot import copy_database
+from migrations import (AGGREGATE_TRIGGERS, GENERATION_TRIGGERS, OVERLAP_TRIGGERS, SEARCH_INDEXES,
+                        SEARCH_TRIGGERS, migrate)
+
+CHUNK_SIZE = 20000
+
+# Numéro de chambre : hôtel, étage, rang dans l'étage (Numero est unique pour tous les hôtels)
+ROOMS_PER_FLOOR = 20
+
+# Part des nuits occupées et durée maximale d'un séjour
+OCCUPANCY = 0.7
+MAX_STAY = 7
+
+# Réservations générées jusqu'à cette marge après aujourd'hui
+FUTURE_DAYS = 180
+
+VILLES = ["Paris", "Lyon", "Marseille", "Lille", "Nice", "Bordeaux", "Nantes", "Toulouse",
+          "Strasbourg", "Rennes", "Montpellier", "Grenoble", "Dijon", "Annecy", "Biarritz"]
+PRENOMS = ["Jean", "Marie", "Paul", "Lucie", "Emma", "Louis", "Chloé", "Hugo", "Léa", "Nathan",
+           "Camille", "Jules", "Inès", "Arthur", "Manon", "Gabriel", "Sarah", "Adam", "Zoé", "Noah"]
+NOMS = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy",
+        "Moreau", "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "David", "Bertrand", "Roux",
+        "Vincent", "Fournier", "Morel", "Girard", "Andre", "Mercier", "Dupont", "Lambert"]
+RUES = ["Rue de la République", "Avenue Victor Hugo", "Boulevard Gambetta", "Rue Nationale",
+        "Rue des Fleurs", "Place de la Mairie", "Rue du Moulin", "Chemin des Vignes"]
+PRESTATIONS = [("Petit déjeuner", "Buffet petit déjeuner", 15.0), ("Parking", "Place de parking", 10.0),
+               ("SPA", "Accès au spa pendant 1 heure", 40.0), ("Service en chambre", "Restauration en chambre", 25.0),
+               ("Navette", "Navette aéroport", 30.0), ("Blanchisserie", "Lavage et repassage", 18.0)]
+COMMENTAIRES = ["Très bon séjour", "Personnel accueillant", "Chambre spacieuse", "Un peu bruyant",
+                "Petit déjeuner excellent", "Literie à revoir", "Parfait pour un week-end", None]
+
+
+def scale_parameters(scale):
+    """Volumes du jeu d'exemple multipliés par `scale`"""
+    return {"hotels": 2 * scale, "rooms_per_hotel": 4, "clients": 5 * scale, "years": 1,
+            "prestations_per_stay": 2, "evaluations": 3 * scale}
+
+
+def _executemany(conn, sql, lignes):
+    """Insère par paquets de CHUNK_SIZE lignes ; retourne le nombre de lignes"""
+    total = 0
+    paquet = []
+    for ligne in lignes:
+        paquet.append(ligne)
+        if len(paquet) == CHUNK_SIZE:
+            conn.executemany(sql, paquet)
+            total += len(paquet)
+            paquet = []
+    if paquet:
+        conn.executemany(sql, paquet)
+        total += len(paquet)
+    return total
+
+
+def _next_id(conn, table, colonne):
+    return conn.execute(f"SELECT COALESCE(MAX({colonne}), 0) + 1 FROM {table}").fetchone()[0]
+
+
+def generate(conn, hotels, rooms_per_hotel, clients, years, prestations_per_stay, evaluations, seed=0):
+    """Ajoute les lignes générées à la base ; retourne {table: lignes insérées}"""
+    rng = random.Random(seed)
+    compte = {}
+    fin = date.today() + timedelta(days=FUTURE_DAYS)
+    debut = date.today() - timedelta(days=365 * years)
+    types = [row[0] for row in conn.execute("SELECT Id_Type FROM Type_Chambre")]
+
+    premier_hotel = _next_id(conn, "Hotel", "Id_Hotel")
+    hotels_ids = range(premier_hotel, premier_hotel + hotels)
+    compte["Hotel"] = _executemany(conn, "INSERT INTO Hotel VALUES (?, ?, ?, ?)", (
+        (h, rng.choice(VILLES), "France", rng.randint(1000, 95999)) for h in hotels_ids))
+
+    chambres = []
+    for h in hotels_ids:
+        for i in range(rooms_per_hotel):
+            etage, rang = divmod(i, ROOMS_PER_FLOOR)
+            chambres.append((h * 10000 + (etage + 1) * 100 + rang, etage + 1, int(rng.random() < 0.2),
+                             h, rng.choice(types)))
+    compte["Chambre"] = _executemany(conn, "INSERT INTO Chambre VALUES (?, ?, ?, ?, ?)", chambres)
+
+    premiere_prestation = _next_id(conn, "Prestation", "Id_Prestation")
+    prestations = {}
+    lignes = []
+    for h in hotels_ids:
+        offre = rng.sample(PRESTATIONS, rng.randint(2, 4))
+        prestations[h] = list(range(premiere_prestation, premiere_prestation + len(offre)))
+        for id_prestation, (nom, description, prix) in zip(prestations[h], offre):
+            lignes.append((id_prestation, nom, description, prix, h))
+        premiere_prestation += len(offre)
+    compte["Prestation"] = _executemany(conn, "INSERT INTO Prestation VALUES (?, ?, ?, ?, ?)", lignes)
+
+    premier_client = _next_id(conn, "Client", "Id_Client")
+    clients_ids = range(premier_client, premier_client + clients)
+
+    def client(i):
+        prenom, nom = rng.choice(PRENOMS), rng.choice(NOMS)
+        return (i, f"{rng.randint(1, 150)} {rng.choice(RUES)}", rng.choice(VILLES), rng.randint(1000, 95999),
+                f"{prenom.lower()}.{nom.lower()}{i}@exemple.fr", f"06{rng.randint(0, 99999999):08d}",
+                f"{prenom} {nom}")
+
+    compte["Client"] = _executemany(conn, "INSERT INTO Client VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    (client(i) for i in clients_ids))
+
+    # Séjours successifs par chambre, sans chevauchement (bornes incluses)
+    sejours = []
+    ecart_moyen = (1 + MAX_STAY) / 2 * (1 - OCCUPANCY) / OCCUPANCY
+    for numero, _, _, h, _ in chambres:
+        jour = debut + timedelta(days=rng.randint(0, MAX_STAY))
+        while jour < fin:
+            depart = jour + timedelta(days=rng.randint(1, MAX_STAY))
+            sejours.append((jour.isoformat(), depart.isoformat(), numero, h))
+            jour = depart + timedelta(days=1 + int(rng.expovariate(1 / ecart_moyen)))
+    # Identifiants attribués dans l'ordre des arrivées, comme des saisies successives
+    sejours.sort()
+    premiere_reservation = _next_id(conn, "Reservation", "Id_Reservation")
+    sejours = [(premiere_reservation + i,) + sejour for i, sejour in enumerate(sejours)]
+    if not clients_ids:
+        clients_ids = [row[0] for row in conn.execute("SELECT Id_Client FROM Client")]
+
+    compte["Reservation"] = _executemany(conn, "INSERT INTO Reservation VALUES (?, ?, ?, ?)", (
+        (r, arrivee, depart, rng.choice(clients_ids)) for r, arrivee, depart, _, _ in sejours))
+    compte["Reservation_Chambre"] = _executemany(conn, "INSERT INTO Reservation_Chambre VALUES (?, ?)", (
+        (r, numero) for r, _, _, numero, _ in sejours))
+
+    def lignes_prestations():
+        for r, _, _, _, h in sejours:
+            offre = prestations[h]
+            for id_prestation in rng.sample(offre, min(len(offre), rng.randint(0, prestations_per_stay))):
+                yield r, id_prestation, rng.randint(1, 3)
+
+    compte["Reservation_Prestation"] = _executemany(
+        conn, "INSERT INTO Reservation_Prestation VALUES (?, ?, ?)", lignes_prestations())
+
+    hotels_notes = list(hotels_ids) or [row[0] for row in conn.execute("SELECT Id_Hotel FROM Hotel")]
+    premiere_evaluation = _next_id(conn, "Evaluation", "Id_Evaluation")
+    periode = max((date.today() - debut).days, 1)
+    compte["Evaluation"] = _executemany(conn, "INSERT INTO Evaluation VALUES (?, ?, ?, ?, ?, ?)", (
+        (e, rng.choices([1, 2, 3, 4, 5], [1, 2, 4, 6, 5])[0], rng.choice(COMMENTAIRES),
+         (debut + timedelta(days=rng.randrange(periode))).isoformat(),
+         rng.choice(clients_ids), rng.choice(hotels_notes))
+        for e in range(premiere_evaluation, premiere_evaluation + evaluations)))
+    return compte
+
+
+def fill(path, seed=0, **parametres):
+    """Migre la base `path`, la complète puis recalcule synthèses et statistiques du planificateur"""
+    conn = connect(path)
+    conn.isolation_level = None
+    try:
+        migrate(conn)
+        debut = time.perf_counter()
+        # Synthèses, index plein texte et générations du cache recalculés en
+        # une fois plutôt que ligne à ligne par les triggers ; les séjours
+        # générés ne se chevauchent pas par construction
+        triggers = {**AGGREGATE_TRIGGERS, **OVERLAP_TRIGGERS, **GENERATION_TRIGGERS, **SEARCH_TRIGGERS}
+        conn.execute("BEGIN")
+        for nom in triggers:
+            conn.execute(f"DROP TRIGGER IF EXISTS {nom}")
+        compte = generate(conn, seed=seed, **parametres)
+        for instruction in triggers.values():
+            conn.execute(instruction)
+        conn.execute("UPDATE Generation_Table SET Generation = Generation + 1")
+        for table in SEARCH_INDEXES:
+            conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        aggregates.rebuild(conn)
+        conn.execute("ANALYZE")
+        return compte, time.perf_counter() - debut
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"))
+    parser.add_argument("--output", help="copie de --db à compléter (--db reste inchangée)")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--hotels", type=int)
+    parser.add_argument("--rooms-per-hotel", type=int)
+    parser.add_argument("--clients", type=int)
+    parser.add_argument("--years", type=int, help="années d'historique de réservations")
+    parser.add_argument("--prestations-per-stay", type=int, help="prestations au plus par séjour")
+    parser.add_argument("--evaluations", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    parametres = scale_parameters(args.scale)
+    for nom in parametres:
+        if getattr(args, nom) is not None:
+            parametres[nom] = getattr(args, nom)
+    if parametres["rooms_per_hotel"] > 99 * ROOMS_PER_FLOOR:
+        sys.exit(f"{99 * ROOMS_PER_FLOOR} chambres par hôtel au plus")
+
+    path = args.db
+    if args.output:
+        # Copie par l'API de sauvegarde : les écritures encore dans le fichier
+        # -wal et l'archive (<base>_archive.db) font partie de la copie
+        copy_database(args.db, args.output)
+        path = args.output
+    compte, duree = fill(path, args.seed, **parametres)
+    for table, lignes in compte.items():
+        print(f"{table}: {lignes}")
+    print(f"{sum(compte.values())} lignes générées en {duree:.1f} s dans {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""Import en masse de clients, réservations et prestations depuis un fichier CSV ou JSONL.
+
+    python src/import_data.py clients clients.csv
+    python src/import_data.py reservations sejours.jsonl --chunk-size 20000 --rejects rejets.jsonl
+    python src/import_data.py prestations prestations.csv
+    python src/import_data.py reservation_prestations lignes.csv
+
+Les colonnes portent les noms du schéma (Nom, Email, Date_arrivee, Id_Client,
+Numero_chambre...). Pour une réservation sur plusieurs chambres, Numero_chambre
+contient les numéros séparés par des « ; » (ou une liste en JSONL).
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+
+import aggregates
+from database import connect
+from migrations import AGGREGATE_TRIGGERS, GENERATION_TRIGGERS, SEARCH_INDEXES, SEARCH_TRIGGERS, migrate
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class Rejet(ValueError):
+    """Ligne refusée ; le message en donne la raison"""
+
+
+def read_rows(path):
+    """Lit le fichier ligne à ligne : génère (numéro de ligne, dictionnaire)"""
+    with open(path, newline="", encoding="utf-8") as fichier:
+        if path.endswith((".jsonl", ".ndjson", ".json")):
+            for numero, ligne in enumerate(fichier, start=1):
+                if ligne.strip():
+                    try:
+                        yield numero, json.loads(ligne)
+                    except json.JSONDecodeError as exc:
+                        yield numero, exc
+        else:
+            for numero, row in enumerate(csv.DictReader(fichier), start=2):
+                yield numero, row
+
+
+def _texte(row, colonne, obligatoire=True):
+    valeur = row.get(colonne)
+    if valeur is not None:
+        valeur = str(valeur).strip() if not isinstance(valeur, str) else valeur.strip()
+    if not valeur:
+        if obligatoire:
+            raise Rejet(f"{colonne} manquant")
+        return None
+    return valeur
+
+
+def _entier(row, colonne, obligatoire=True):
+    valeur = row.get(colonne)
+    if type(valeur) is int:  # déjà typé en JSONL
+        return valeur
+    valeur = _texte(row, colonne, obligatoire)
+    if valeur is None:
+        return None
+    try:
+        return int(valeur)
+    except ValueError:
+        raise Rejet(f"{colonne} n'est pas un entier : {valeur!r}") from None
+
+
+def _reel(row, colonne):
+    valeur = _texte(row, colonne)
+    try:
+        return float(valeur)
+    except ValueError:
+        raise Rejet(f"{colonne} n'est pas un nombre : {valeur!r}") from None
+
+
+def _date(row, colonne):
+    valeur = _texte(row, colonne)[:10]
+    try:
+        date.fromisoformat(valeur)
+        return valeur
+    except ValueError:
+        raise Rejet(f"{colonne} n'est pas une date AAAA-MM-JJ : {valeur!r}") from None
+
+
+def _liste(row, colonne):
+    valeur = row.get(colonne)
+    if isinstance(valeur, list):
+        return valeur
+    return [v for v in _texte(row, colonne).replace(",", ";").split(";") if v.strip()]
+
+
+class References:
+    """Identifiants existants, chargés une fois pour valider les clés étrangères en mémoire"""
+
+    def __init__(self, conn, kind):
+        def ids(sql):
+            return {row[0] for row in conn.execute(sql)}
+
+        self.clients = ids("SELECT Id_Client FROM Client") if kind in ("clients", "reservations") else set()
+        self.chambres = ids("SELECT Numero FROM Chambre") if kind == "reservations" else set()
+        self.hotels = ids("SELECT Id_Hotel FROM Hotel") if kind == "prestations" else set()
+        self.prestations = ids("SELECT Id_Prestation FROM Prestation") if kind == "reservation_prestations" else set()
+        self.reservations = (ids("SELECT Id_Reservation FROM Reservation")
+                             if kind in ("reservations", "reservation_prestations") else set())
+        self.max_reservation = max(self.reservations, default=0)
+
+    def add_reservation(self, id_reservation):
+        self.reservations.add(id_reservation)
+        self.max_reservation = max(self.max_reservation, id_reservation)
+
+
+# Chaque type d'import : requêtes d'insertion (une par table) et fonction qui
+# transforme une ligne du fichier en une liste de tuples par requête.
+
+def _client(row, refs):
+    id_client = _entier(row, "Id_Client", obligatoire=False)
+    if id_client is not None and id_client in refs.clients:
+        raise Rejet(f"Id_Client {id_client} existe déjà")
+    ligne = (id_client, _texte(row, "Adresse"), _texte(row, "Ville"), _entier(row, "Code_postal"),
+             _texte(row, "Email"), _texte(row, "Telephone"), _texte(row, "Nom"))
+    # Enregistré seulement une fois la ligne entière validée : une réservation ne
+    # peut pas viser un client rejeté
+    if id_client is not None:
+        refs.clients.add(id_client)
+    return ([ligne],)
+
+
+def _reservation(row, refs):
+    id_reservation = _entier(row, "Id_Reservation", obligatoire=False)
+    arrivee, depart = _date(row, "Date_arrivee"), _date(row, "Date_depart")
+    # Mêmes règles que BookingService.create_reservation : au moins une nuit, au moins une chambre
+    if arrivee >= depart:
+        raise Rejet("Date_depart doit être après Date_arrivee")
+    id_client = _entier(row, "Id_Client")
+    if id_client not in refs.clients:
+        raise Rejet(f"client {id_client} inconnu")
+    chambres = []
+    for numero in _liste(row, "Numero_chambre"):
+        try:
+            numero = int(numero)
+        except ValueError:
+            raise Rejet(f"Numero_chambre invalide : {numero!r}") from None
+        if numero not in refs.chambres:
+            raise Rejet(f"chambre {numero} inconnue")
+        chambres.append(numero)
+    if not chambres:
+        raise Rejet("Numero_chambre manquant")
+    if id_reservation is not None and id_reservation in refs.reservations:
+        raise Rejet(f"Id_Reservation {id_reservation} existe déjà")
+    # Sans Id_Reservation fourni, l'identifiant est attribué au moment de
+    # l'écriture ; dans les deux cas, il n'est enregistré qu'une fois inséré
+    return ([(id_reservation, arrivee, depart, id_client)],
+            [(id_reservation, numero) for numero in dict.fromkeys(chambres)])
+
+
+def _prestation(row, refs):
+    id_hotel = _entier(row, "Id_Hotel")
+    if id_hotel not in refs.hotels:
+        raise Rejet(f"hôtel {id_hotel} inconnu")
+    prix = _reel(row, "Prix")
+    if prix < 0:
+        raise Rejet("Prix négatif")
+    return ([(_entier(row, "Id_Prestation", obligatoire=False), _texte(row, "Nom"),
+              _texte(row, "Description", obligatoire=False), prix, id_hotel)],)
+
+
+def _reservation_prestation(row, refs):
+    id_reservation, id_prestation = _entier(row, "Id_Reservation"), _entier(row, "Id_Prestation")
+    if id_reservation not in refs.reservations:
+        raise Rejet(f"réservation {id_reservation} inconnue")
+    if id_prestation not in refs.prestations:
+        raise Rejet(f"prestation {id_prestation} inconnue")
+    quantite = _entier(row, "Quantite", obligatoire=False) or 1
+    if quantite < 1:
+        raise Rejet("Quantite doit être positive")
+    return ([(id_reservation, id_prestation, quantite)],)
+
+
+KINDS = {
+    "clients": (_client, [
+        "INSERT INTO Client (Id_Client, Adresse, Ville, Code_postal, Email, Telephone, Nom) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+    ]),
+    "reservations": (_reservation, [
+        "INSERT INTO Reservation (Id_Reservation, Date_arrivee, Date_depart, Id_Client) VALUES (?, ?, ?, ?)",
+        "INSERT INTO Reservation_Chambre (Id_Reservation, Numero_chambre) VALUES (?, ?)",
+    ]),
+    "prestations": (_prestation, [
+        "INSERT INTO Prestation (Id_Prestation, Nom, Description, Prix, Id_Hotel) VALUES (?, ?, ?, ?, ?)",
+    ]),
+    "reservation_prestations": (_reservation_prestation, [
+        "INSERT INTO Reservation_Prestation (Id_Reservation, Id_Prestation, Quantite) VALUES (?, ?, ?)",
+    ]),
+}
+
+
+class Importer:
+    def __init__(self, conn, kind, chunk_size=DEFAULT_CHUNK_SIZE, rejects=None):
+        self.conn = conn
+        self.kind = kind
+        self.prepare, self.requetes = KINDS[kind]
+        self.chunk_size = chunk_size
+        self.rejects = rejects
+        self.refs = References(conn, kind)
+        self.inseres = 0
+        self.rejetes = 0
+
+    def reject(self, numero, raison, row=None):
+        self.rejetes += 1
+        if self.rejects:
+            self.rejects.write(json.dumps({"ligne": numero, "raison": raison, "donnees": row},
+                                          ensure_ascii=False, default=str) + "\n")
+
+    def run(self, rows):
+        paquet = []
+        for numero, row in rows:
+            if isinstance(row, Exception):
+                self.reject(numero, f"JSON invalide : {row}")
+                continue
+            try:
+                paquet.append((numero, row, self.prepare(row, self.refs)))
+            except Rejet as exc:
+                self.reject(numero, str(exc), row)
+                continue
+            if len(paquet) >= self.chunk_size:
+                self.flush(paquet)
+                paquet = []
+        if paquet:
+            self.flush(paquet)
+
+    def _assign_ids(self, paquet):
+        """Attribue les Id_Reservation manquants à la suite du plus grand existant"""
+        if self.kind != "reservations":
+            return
+        # Relu sous le verrou d'écriture : d'autres sessions ont pu réserver entre deux paquets
+        suivant = self.conn.execute("SELECT COALESCE(MAX(Id_Reservation), 0) FROM Reservation").fetchone()[0]
+        # Au-delà aussi des identifiants fournis par les lignes du paquet
+        fournis = (reservations[0][0] for _, _, (reservations, _) in paquet)
+        suivant = max(suivant, self.refs.max_reservation, *(i for i in fournis if i is not None))
+        for _, _, (reservations, chambres) in paquet:
+            if reservations[0][0] is None:
+                suivant += 1
+                reservations[0] = (suivant,) + reservations[0][1:]
+                chambres[:] = [(suivant, numero) for _, numero in chambres]
+
+    def _inserted(self, tables):
+        """Enregistre une réservation écrite : les lignes suivantes peuvent la viser"""
+        if self.kind == "reservations":
+            self.refs.add_reservation(tables[0][0][0])
+
+    def flush(self, paquet):
+        """Écrit un paquet dans une transaction ; en cas d'erreur, isole les lignes fautives"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._assign_ids(paquet)
+            for i, requete in enumerate(self.requetes):
+                self.conn.executemany(requete, (t for _, _, tables in paquet for t in tables[i]))
+            self.conn.commit()
+            self.inseres += len(paquet)
+            for _, _, tables in paquet:
+                self._inserted(tables)
+            return
+        except sqlite3.IntegrityError:
+            self.conn.rollback()
+
+        # Repli ligne à ligne : chaque ligne dans son propre SAVEPOINT
+        self.conn.execute("BEGIN IMMEDIATE")
+        for numero, row, tables in paquet:
+            self.conn.execute("SAVEPOINT ligne")
+            try:
+                for requete, lignes in zip(self.requetes, tables):
+                    self.conn.executemany(requete, lignes)
+                self.conn.execute("RELEASE ligne")
+                self.inseres += 1
+                self._inserted(tables)
+            except sqlite3.IntegrityError as exc:
+                self.conn.execute("ROLLBACK TO ligne")
+                self.conn.execute("RELEASE ligne")
+                self.reject(numero, str(exc), row)
+        self.conn.commit()
+
+
+def import_file(conn, kind, path, chunk_size=DEFAULT_CHUNK_SIZE, rejects=None, defer_aggregates=False):
+    """Importe un fichier ; retourne (lignes insérées, lignes rejetées, secondes)"""
+    debut = time.perf_counter()
+    # Synthèses, index plein texte et générations du cache mis à jour en une
+    # fois à la fin plutôt que ligne à ligne par les triggers
+    triggers = {**AGGREGATE_TRIGGERS, **GENERATION_TRIGGERS, **SEARCH_TRIGGERS} if defer_aggregates else {}
+    for nom in triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {nom}")
+    try:
+        importer = Importer(conn, kind, chunk_size, rejects)
+        importer.run(read_rows(path))
+    finally:
+        if defer_aggregates:
+            for instruction in triggers.values():
+                conn.execute(instruction)
+            for table in SEARCH_INDEXES:
+                conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+            aggregates.rebuild(conn)
+            conn.execute("UPDATE Generation_Table SET Generation = Generation + 1")
+    return importer.inseres, importer.rejetes, time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("fichier", help="fichier .csv ou .jsonl")
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"))
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="lignes par transaction")
+    parser.add_argument("--rejects", help="fichier JSONL recevant les lignes rejetées et leur raison")
+    parser.add_argument("--defer-aggregates", action="store_true",
+                        help="recalculer synthèses et index plein texte à la fin plutôt que ligne à ligne")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    # Transactions gérées explicitement par paquet
+    conn.isolation_level = None
+    migrate(conn)
+    rejects = open(args.rejects, "w", encoding="utf-8") if args.rejects else None
+    try:
+        inseres, rejetes, duree = import_file(conn, args.kind, args.fichier, args.chunk_size,
+                                              rejects, args.defer_aggregates)
+    finally:
+        if rejects:
+            rejects.close()
+        conn.close()
+    print(f"{inseres} lignes importées, {rejetes} rejetées en {duree:.2f} s "
+          f"({inseres / duree if duree else 0:.0f} lignes/s)")
+    sys.exit(1 if rejetes and not inseres else 0)
+
+
+if __name__ == "__main__":
+    main()
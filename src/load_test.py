@@ -0,0 +1,453 @@
+"""Test de charge : lecteurs concurrents et un écrivain sur une copie de la base.
+
+    python src/load_test.py --readers 8 --duration 10
+    python src/load_test.py --mode rollback   # ancien comportement, pour comparer
+    python src/load_test.py --mode api --readers 16   # requêtes/s du serveur HTTP
+    python src/load_test.py --mode stress --readers 8 # écrivains concurrents, contrôle des doublons
+    python src/load_test.py --mode reports --readers 4 # écritures pendant les rapports, base / instantané
+    python src/load_test.py --mode shards --readers 8  # base unique / une base par hôtel (sharding.py)
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+import repository
+from analytics import AnalyticsData
+from api import BookingApi, HttpServer
+from database import Database
+from migrations import migrate
+from service import BookingBusy, BookingService, RoomUnavailable
+from sharding import ShardRouter, split
+from snapshot import SnapshotStore
+
+
+def legacy_connect(path):
+    """Connexion telle que l'ouvrait create_connection() avant le pool : journal par défaut"""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def read_pages(conn):
+    repository.count_clients(conn)
+    repository.occupation_today(conn)
+    repository.hotel_ratings(conn)
+    # Premières pages, comme les pages Réservations et Clients
+    repository.page_reservations(conn)
+    repository.page_clients(conn)
+
+
+def write_booking(conn, clients, chambres):
+    debut = random.randint(0, 3000)
+    arrivee = time.strftime("%Y-%m-%d", time.gmtime(86400 * (18000 + debut)))
+    depart = time.strftime("%Y-%m-%d", time.gmtime(86400 * (18000 + debut + random.randint(1, 7))))
+    repository.insert_reservation(conn, arrivee, depart, random.choice(clients),
+                                  [random.choice(chambres)], {})
+    conn.commit()
+
+
+def run(path, mode, readers, duration):
+    arret = threading.Event()
+    lectures = [0] * readers
+    latences = []
+    erreurs = []
+    database = Database(path, writers=1, readers=readers) if mode == "wal" else None
+
+    with (database.connection() if database else closing(legacy_connect(path))) as conn:
+        clients = [row[0] for row in conn.execute("SELECT Id_Client FROM Client")]
+        chambres = [row[0] for row in conn.execute("SELECT Numero FROM Chambre")]
+
+    def lecteur(i):
+        while not arret.is_set():
+            try:
+                if database:
+                    with database.connection(readonly=True) as conn:
+                        read_pages(conn)
+                else:
+                    with closing(legacy_connect(path)) as conn:
+                        read_pages(conn)
+                lectures[i] += 1
+            except sqlite3.OperationalError as exc:
+                erreurs.append(str(exc))
+
+    def ecrivain():
+        while not arret.is_set():
+            debut = time.perf_counter()
+            try:
+                if database:
+                    with database.connection() as conn:
+                        write_booking(conn, clients, chambres)
+                else:
+                    with closing(legacy_connect(path)) as conn:
+                        write_booking(conn, clients, chambres)
+                latences.append(time.perf_counter() - debut)
+            except sqlite3.IntegrityError:
+                # Chambre déjà prise : refusée par le trigger anti-chevauchement
+                pass
+            except sqlite3.OperationalError as exc:
+                erreurs.append(str(exc))
+
+    threads = [threading.Thread(target=lecteur, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=ecrivain))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    arret.set()
+    for thread in threads:
+        thread.join()
+    if database:
+        database.close()
+
+    latences.sort()
+    return {
+        "mode": mode,
+        "lecteurs": readers,
+        "lectures_par_s": sum(lectures) / duration,
+        "ecritures_par_s": len(latences) / duration,
+        "latence_ecriture_p50_ms": 1000 * statistics.median(latences) if latences else None,
+        "latence_ecriture_p95_ms": 1000 * latences[int(0.95 * (len(latences) - 1))] if latences else None,
+        "erreurs": len(erreurs),
+    }
+
+
+def run_api(path, clients_http, duration):
+    """Serveur api.py sur un port libre, `clients_http` clients keep-alive :
+    trois recherches de disponibilité pour une création et une liste"""
+    database = Database(path, writers=2, readers=8)
+    server = HttpServer(BookingApi(BookingService(database)), workers=8)
+    loop = asyncio.new_event_loop()
+    pret = threading.Event()
+    port = []
+
+    def demarre(numero):
+        port.append(numero)
+        pret.set()
+
+    boucle = threading.Thread(target=loop.run_forever)
+    boucle.start()
+    ecoute = asyncio.run_coroutine_threadsafe(server.serve("127.0.0.1", 0, demarre), loop)
+    pret.wait()
+
+    with database.connection(readonly=True) as conn:
+        clients = [row[0] for row in conn.execute("SELECT Id_Client FROM Client")]
+        chambres = [row[0] for row in conn.execute("SELECT Numero FROM Chambre")]
+
+    arret = threading.Event()
+    latences = []
+    statuts = {}
+
+    def client_http():
+        http_conn = http.client.HTTPConnection("127.0.0.1", port[0])
+        n = 0
+        while not arret.is_set():
+            debut = random.randint(0, 3000)
+            arrivee = time.strftime("%Y-%m-%d", time.gmtime(86400 * (18000 + debut)))
+            depart = time.strftime("%Y-%m-%d", time.gmtime(86400 * (18000 + debut + random.randint(1, 7))))
+            if n % 5 == 3:
+                corps = json.dumps({"Id_Client": random.choice(clients), "Date_arrivee": arrivee,
+                                    "Date_depart": depart, "Chambres": [random.choice(chambres)]})
+                requete = ("POST", "/reservations", corps, {"Content-Type": "application/json"})
+            elif n % 5 == 4:
+                requete = ("GET", "/reservations?limit=20", None, {})
+            else:
+                requete = ("GET", f"/disponibilites?arrivee={arrivee}&depart={depart}", None, {})
+            n += 1
+            t = time.perf_counter()
+            http_conn.request(*requete)
+            reponse = http_conn.getresponse()
+            reponse.read()
+            latences.append(time.perf_counter() - t)
+            statuts[reponse.status] = statuts.get(reponse.status, 0) + 1
+        http_conn.close()
+
+    threads = [threading.Thread(target=client_http) for _ in range(clients_http)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    arret.set()
+    for thread in threads:
+        thread.join()
+    async def arreter():
+        # Les clients ont fermé leurs connexions : on attend la fin des
+        # gestionnaires (EOF) et on n'annule que l'écoute
+        ecoute.cancel()
+        taches = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        await asyncio.wait(taches, timeout=5)
+
+    asyncio.run_coroutine_threadsafe(arreter(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    boucle.join()
+    loop.close()
+    server.executor.shutdown()
+    database.close()
+
+    latences.sort()
+    return {
+        "mode": "api",
+        "clients": clients_http,
+        "requetes_par_s": len(latences) / duration,
+        "latence_p50_ms": 1000 * statistics.median(latences) if latences else None,
+        "latence_p95_ms": 1000 * latences[int(0.95 * (len(latences) - 1))] if latences else None,
+        "statuts": dict(sorted(statuts.items())),
+    }
+
+
+# Paires de liaisons Reservation_Chambre d'une même chambre dont les séjours se chevauchent
+SQL_DOUBLE_BOOKINGS = '''
+    SELECT COUNT(*)
+    FROM Reservation_Chambre a
+    JOIN Reservation ra ON ra.Id_Reservation = a.Id_Reservation
+    JOIN Reservation_Chambre b ON b.Numero_chambre = a.Numero_chambre AND b.Id_Reservation > a.Id_Reservation
+    JOIN Reservation rb ON rb.Id_Reservation = b.Id_Reservation
+    WHERE ra.Date_arrivee <= rb.Date_depart AND ra.Date_depart >= rb.Date_arrivee
+'''
+
+
+# Séjours du test de contention : deux ans à partir de 2030, hors données existantes
+STRESS_START = 21915
+STRESS_DAYS = 730
+
+
+def run_stress(path, writers, duration, guichets=2):
+    """`writers` threads réservent des groupes de 1 à 3 chambres sur la même
+    période via `guichets` services distincts (chacun son pool et son index,
+    comme des processus séparés)"""
+    bases = [Database(path, writers=writers, readers=2) for _ in range(guichets)]
+    services = [BookingService(database) for database in bases]
+    with bases[0].connection(readonly=True) as conn:
+        clients = [row[0] for row in conn.execute("SELECT Id_Client FROM Client")]
+        hotels = [row[0] for row in conn.execute("SELECT Id_Hotel FROM Hotel")]
+
+    arret = threading.Event()
+    compteurs = {"reservations": 0, "chambres": 0, "conflits": 0, "occupe": 0, "complet": 0}
+    verrou = threading.Lock()
+    latences = []
+
+    def ecrivain(i):
+        service = services[i % guichets]
+        rng = random.Random(i)
+        while not arret.is_set():
+            debut = STRESS_START + rng.randint(0, STRESS_DAYS)
+            arrivee = time.strftime("%Y-%m-%d", time.gmtime(86400 * debut))
+            depart = time.strftime("%Y-%m-%d", time.gmtime(86400 * (debut + rng.randint(1, 4))))
+            # Disponibilités lues hors transaction : peuvent être périmées au moment de réserver
+            libres = service.index.free_rooms(arrivee, depart, rng.choice(hotels))
+            if not libres:
+                cle = "complet"
+            else:
+                chambres = rng.sample(libres, min(len(libres), rng.randint(1, 3)))
+                t = time.perf_counter()
+                try:
+                    service.create_reservation(rng.choice(clients), arrivee, depart, chambres)
+                    latences.append(time.perf_counter() - t)
+                    cle = "reservations"
+                    with verrou:
+                        compteurs["chambres"] += len(chambres)
+                except RoomUnavailable:
+                    cle = "conflits"
+                except BookingBusy:
+                    cle = "occupe"
+            with verrou:
+                compteurs[cle] += 1
+
+    threads = [threading.Thread(target=ecrivain, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    arret.set()
+    for thread in threads:
+        thread.join()
+
+    with bases[0].connection(readonly=True) as conn:
+        doublons = conn.execute(SQL_DOUBLE_BOOKINGS).fetchone()[0]
+    for database in bases:
+        database.close()
+
+    latences.sort()
+    return {
+        "mode": "stress",
+        "ecrivains": writers,
+        "guichets": guichets,
+        "reservations_par_s": compteurs["reservations"] / duration,
+        "chambres_par_s": compteurs["chambres"] / duration,
+        "latence_p50_ms": 1000 * statistics.median(latences) if latences else None,
+        "latence_p95_ms": 1000 * latences[int(0.95 * (len(latences) - 1))] if latences else None,
+        "conflits": compteurs["conflits"],
+        "verrou_indisponible": compteurs["occupe"],
+        "complet": compteurs["complet"],
+        "doubles_reservations": doublons,
+    }
+
+
+def read_reports(conn):
+    """Lectures des pages de rapport : données de la page Analyses et liste complète des réservations"""
+    AnalyticsData(conn)
+    # Lecture complète voulue : c'est la longue lecture (ancienne page
+    # Réservations, exports) dont on mesure l'effet sur l'écrivain
+    repository.list_reservations(conn)
+
+
+def run_reports(path, readers, duration):
+    """Latence d'un écrivain pendant que `readers` threads lisent les rapports,
+    d'abord dans la base elle-même puis dans un instantané (snapshot.py)"""
+    database = Database(path, writers=1, readers=readers)
+    store = SnapshotStore(path, readers=readers)
+    debut = time.perf_counter()
+    store.refresh()
+    resultat = {"mode": "reports", "lecteurs": readers, "duree_instantane_ms": 1000 * (time.perf_counter() - debut)}
+    with database.connection(readonly=True) as conn:
+        clients = [row[0] for row in conn.execute("SELECT Id_Client FROM Client")]
+        chambres = [row[0] for row in conn.execute("SELECT Numero FROM Chambre")]
+
+    sources = {"base": lambda: database.connection(readonly=True), "instantane": store.connection}
+    for nom, connexion in sources.items():
+        arret = threading.Event()
+        rapports = [0] * readers
+        latences = []
+
+        def lecteur(i):
+            while not arret.is_set():
+                with connexion() as conn:
+                    read_reports(conn)
+                rapports[i] += 1
+
+        def ecrivain():
+            while not arret.is_set():
+                debut = time.perf_counter()
+                try:
+                    with database.connection() as conn:
+                        write_booking(conn, clients, chambres)
+                    latences.append(time.perf_counter() - debut)
+                except sqlite3.IntegrityError:
+                    pass
+
+        wal = path + "-wal"
+        taille_wal = os.path.getsize(wal) if os.path.exists(wal) else 0
+        threads = [threading.Thread(target=lecteur, args=(i,)) for i in range(readers)]
+        threads.append(threading.Thread(target=ecrivain))
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        arret.set()
+        for thread in threads:
+            thread.join()
+
+        latences.sort()
+        resultat[f"{nom}_rapports_par_s"] = sum(rapports) / duration
+        resultat[f"{nom}_ecritures_par_s"] = len(latences) / duration
+        for q in (50, 95, 99):
+            resultat[f"{nom}_latence_ecriture_p{q}_ms"] = (
+                1000 * latences[int(q / 100 * (len(latences) - 1))] if latences else None)
+        # Des lecteurs toujours présents empêchent les checkpoints de revenir au début du WAL
+        resultat[f"{nom}_croissance_wal_mo"] = (os.path.getsize(wal) - taille_wal) / 1e6 if os.path.exists(wal) else 0.0
+
+    store.close()
+    database.close()
+    return resultat
+
+
+def run_shards(path, writers, duration, lectures=20):
+    """Réservations/s de `writers` threads et durée des lectures sur toute la
+    chaîne (disponibilités, première page des réservations, tableau de bord),
+    dans la base unique puis répartie par hôtel"""
+    debut = time.perf_counter()
+    split(path, os.path.join(os.path.dirname(path), "shards"))
+    resultat = {"mode": "shards", "ecrivains": writers, "duree_split_s": time.perf_counter() - debut}
+    database = Database(path, writers=writers, readers=writers)
+    with database.connection(readonly=True) as conn:
+        clients = [row[0] for row in conn.execute("SELECT Id_Client FROM Client")]
+        hotels = [row[0] for row in conn.execute("SELECT Id_Hotel FROM Hotel")]
+    resultat["hotels"] = len(hotels)
+
+    def tableau_unique():
+        with database.connection(readonly=True) as conn:
+            return repository.count_clients(conn), repository.occupation_today(conn), repository.hotel_ratings(conn)
+
+    routeur = ShardRouter(os.path.join(os.path.dirname(path), "shards"))
+    cibles = {"unique": (BookingService(database), tableau_unique), "reparti": (routeur, routeur.dashboard)}
+    for nom, (service, tableau) in cibles.items():
+        durees = []
+        for i in range(lectures):
+            jour = time.strftime("%Y-%m-%d", time.gmtime(86400 * (STRESS_START + i)))
+            t = time.perf_counter()
+            service.search_availability(jour, jour)
+            service.list_reservations(None, 50)
+            tableau()
+            durees.append(time.perf_counter() - t)
+        resultat[f"{nom}_lecture_chaine_p50_ms"] = 1000 * statistics.median(durees)
+
+        arret = threading.Event()
+        reservations = [0] * writers
+
+        def ecrivain(i):
+            rng = random.Random(i)
+            while not arret.is_set():
+                jour = STRESS_START + rng.randint(0, STRESS_DAYS)
+                arrivee = time.strftime("%Y-%m-%d", time.gmtime(86400 * jour))
+                depart = time.strftime("%Y-%m-%d", time.gmtime(86400 * (jour + rng.randint(1, 4))))
+                hotel = rng.choice(hotels)
+                libres = service.search_availability(arrivee, depart, hotel)
+                if not libres:
+                    continue
+                try:
+                    service.create_reservation(rng.choice(clients), arrivee, depart,
+                                               [rng.choice(libres)["Numero"]], id_hotel=hotel)
+                    reservations[i] += 1
+                except (RoomUnavailable, BookingBusy):
+                    pass
+
+        threads = [threading.Thread(target=ecrivain, args=(i,)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        arret.set()
+        for thread in threads:
+            thread.join()
+        resultat[f"{nom}_reservations_par_s"] = sum(reservations) / duration
+
+    routeur.close()
+    database.close()
+    return resultat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"),
+                        help="base source (copiée, jamais modifiée)")
+    parser.add_argument("--mode", choices=["wal", "rollback", "api", "stress", "reports", "shards"], default="wal")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        copie = os.path.join(dossier, "hotel.db")
+        shutil.copy(args.db, copie)
+        conn = sqlite3.connect(copie)
+        migrate(conn)
+        conn.close()
+        if args.mode == "api":
+            resultat = run_api(copie, args.readers, args.duration)
+        elif args.mode == "stress":
+            resultat = run_stress(copie, args.readers, args.duration)
+        elif args.mode == "reports":
+            resultat = run_reports(copie, args.readers, args.duration)
+        elif args.mode == "shards":
+            resultat = run_shards(copie, args.readers, args.duration)
+        else:
+            resultat = run(copie, args.mode, args.readers, args.duration)
+    for cle, valeur in resultat.items():
+        print(f"{cle}: {valeur:.1f}" if isinstance(valeur, float) else f"{cle}: {valeur}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,213 +1,194 @@
-import sqlite3
 import streamlit as st
 import os
-from datetime import datetime
+import tempfile
+from datetime import datetime, timedelta
+from functools import partial
+from migrations import migrate
+import repository
+from database import Database, connect, ensure_database
+from service import BookingService, BookingError
+from query_cache import QueryCache
+from analytics import AnalyticsEngine
+from room_calendar import occupancy_grid, heatmap
+from profiling import PROFILER
+from snapshot import SnapshotStore, taken_at
+from quotes import QuoteEngine
+from export import FORMATS as EXPORT_FORMATS, MIME_TYPES, write_export
 
 # Configuration de la page
 st.set_page_config(page_title="Gestion Hôtelière", layout="wide")
 
+DB_PATH = os.path.join('data', 'hotel.db')
+
+# Pages dont la connexion ne sert qu'à lire (leurs écritures passent par le
+# service de réservation) : servies par les connexions en lecture seule
+PAGES_LECTURE = {"Accueil", "Réservations", "Clients", "Chambres Disponibles",
+                 "Ajouter Client", "Ajouter Réservation", "Évaluations", "Analyses", "Calendrier", "Profilage"}
+
+# Pages de rapport : lues dans le dernier instantané (snapshot.py), sans
+# concurrencer les écritures du front desk sur la base. Le Calendrier reste sur
+# la base : il doit montrer les réservations et réattributions qui viennent d'être faites
+PAGES_INSTANTANE = {"Analyses"}
+
 # Connexion à la base SQLite avec création automatique du dossier
 def create_connection():
     """Crée une connexion à la base SQLite et le dossier data si nécessaire"""
-    os.makedirs('data', exist_ok=True)  # Crée le dossier s'il n'existe pas
-    db_path = os.path.join('data', 'hotel.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row  # Pour accéder aux colonnes par nom
-    return conn
+    ensure_database(DB_PATH)  # Copie le jeu d'exemple au premier lancement
+    return connect(DB_PATH)
+
+@st.cache_resource
+def get_database():
+    """Pools de connexions partagés par toutes les sessions du processus"""
+    ensure_database(DB_PATH)
+    return Database(DB_PATH)
 
 # Initialisation de la base de données
 def init_db():
+    """Crée ou met à jour le schéma ; à chaque rerun, seule PRAGMA user_version est lue"""
     conn = create_connection()
-    cursor = conn.cursor()
-
-    # Création des tables
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Hotel (
-        Id_Hotel INTEGER PRIMARY KEY AUTOINCREMENT,
-        Ville TEXT NOT NULL,
-        Pays TEXT NOT NULL,
-        Code_postal INTEGER NOT NULL
-    )''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Type_Chambre (
-        Id_Type INTEGER PRIMARY KEY AUTOINCREMENT,
-        Type TEXT NOT NULL,
-        Tarif REAL NOT NULL
-    )''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Chambre (
-        Numero INTEGER PRIMARY KEY,
-        Etage INTEGER NOT NULL,
-        Fumeur INTEGER NOT NULL,
-        Id_Hotel INTEGER NOT NULL,
-        Id_Type INTEGER NOT NULL,
-        FOREIGN KEY (Id_Hotel) REFERENCES Hotel(Id_Hotel),
-        FOREIGN KEY (Id_Type) REFERENCES Type_Chambre(Id_Type)
-    )''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Client (
-        Id_Client INTEGER PRIMARY KEY AUTOINCREMENT,
-        Adresse TEXT NOT NULL,
-        Ville TEXT NOT NULL,
-        Code_postal INTEGER NOT NULL,
-        Email TEXT NOT NULL,
-        Telephone TEXT NOT NULL,
-        Nom TEXT NOT NULL
-    )''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Reservation (
-        Id_Reservation INTEGER PRIMARY KEY AUTOINCREMENT,
-        Date_arrivee TEXT NOT NULL,
-        Date_depart TEXT NOT NULL,
-        Id_Client INTEGER NOT NULL,
-        FOREIGN KEY (Id_Client) REFERENCES Client(Id_Client)
-    )''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Reservation_Chambre (
-        Id_Reservation INTEGER,
-        Numero_chambre INTEGER,
-        PRIMARY KEY (Id_Reservation, Numero_chambre),
-        FOREIGN KEY (Id_Reservation) REFERENCES Reservation(Id_Reservation),
-        FOREIGN KEY (Numero_chambre) REFERENCES Chambre(Numero)
-    )''')
-
-    # Nouvelle table pour les prestations/services
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Prestation (
-        Id_Prestation INTEGER PRIMARY KEY AUTOINCREMENT,
-        Nom TEXT NOT NULL,
-        Description TEXT,
-        Prix REAL NOT NULL,
-        Id_Hotel INTEGER NOT NULL,
-        FOREIGN KEY (Id_Hotel) REFERENCES Hotel(Id_Hotel)
-    )''')
-
-    # Table pour lier les prestations aux réservations
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Reservation_Prestation (
-        Id_Reservation INTEGER,
-        Id_Prestation INTEGER,
-        Quantite INTEGER DEFAULT 1,
-        PRIMARY KEY (Id_Reservation, Id_Prestation),
-        FOREIGN KEY (Id_Reservation) REFERENCES Reservation(Id_Reservation),
-        FOREIGN KEY (Id_Prestation) REFERENCES Prestation(Id_Prestation)
-    )''')
-
-    # Table pour les évaluations
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Evaluation (
-        Id_Evaluation INTEGER PRIMARY KEY AUTOINCREMENT,
-        Note INTEGER NOT NULL CHECK (Note BETWEEN 1 AND 5),
-        Commentaire TEXT,
-        Date_evaluation TEXT DEFAULT CURRENT_DATE,
-        Id_Client INTEGER NOT NULL,
-        Id_Hotel INTEGER NOT NULL,
-        FOREIGN KEY (Id_Client) REFERENCES Client(Id_Client),
-        FOREIGN KEY (Id_Hotel) REFERENCES Hotel(Id_Hotel)
-    )''')
-
-    # Insertion des données de base si les tables sont vides
-    if not cursor.execute("SELECT COUNT(*) FROM Hotel").fetchone()[0]:
-        # Insertion des données d'exemple
-        cursor.executemany('INSERT INTO Hotel VALUES (?, ?, ?, ?)', [
-            (1, 'Paris', 'France', 75001),
-            (2, 'Lyon', 'France', 69002)
-        ])
-
-        cursor.executemany('INSERT INTO Type_Chambre VALUES (?, ?, ?)', [
-            (1, 'Simple', 80),
-            (2, 'Double', 120)
-        ])
-
-        cursor.executemany('INSERT INTO Chambre VALUES (?, ?, ?, ?, ?)', [
-            (101, 1, 0, 1, 1),
-            (201, 2, 0, 1, 1),
-            (202, 2, 0, 1, 1),
-            (305, 3, 0, 2, 1),
-            (307, 3, 1, 1, 2),
-            (410, 4, 0, 2, 2),
-            (502, 5, 1, 1, 2),
-            (104, 1, 1, 2, 2)
-        ])
-
-        cursor.executemany('INSERT INTO Client VALUES (?, ?, ?, ?, ?, ?, ?)', [
-            (1, '12 Rue de Paris', 'Paris', 75001, 'jean.dupont@email.fr', '0612345678', 'Jean Dupont'),
-            (2, '5 Avenue Victor Hugo', 'Lyon', 69002, 'marie.leroy@email.fr', '0623456789', 'Marie Leroy'),
-            (3, '8 Boulevard Saint-Michel', 'Marseille', 13005, 'paul.moreau@email.fr', '0634567890', 'Paul Moreau'),
-            (4, '27 Rue Nationale', 'Lille', 59800, 'lucie.martin@email.fr', '0645678901', 'Lucie Martin'),
-            (5, '3 Rue des Fleurs', 'Nice', 6000, 'emma.giraud@email.fr', '0656789012', 'Emma Giraud')
-        ])
-
-        # Ajout de prestations/services
-        cursor.executemany('INSERT INTO Prestation VALUES (?, ?, ?, ?, ?)', [
-            (1, 'Petit déjeuner', 'Buffet petit déjeuner complet', 15.0, 1),
-            (2, 'Parking', 'Place de parking sécurisée', 10.0, 1),
-            (3, 'SPA', 'Accès au spa pendant 1 heure', 40.0, 1),
-            (4, 'Petit déjeuner', 'Petit déjeuner continental', 12.0, 2),
-            (5, 'Service en chambre', 'Service de restauration en chambre', 25.0, 2)
-        ])
-
-        # Ajout d'évaluations
-        cursor.executemany('INSERT INTO Evaluation VALUES (?, ?, ?, ?, ?, ?)', [
-            (1, 4, 'Très bon séjour, personnel accueillant', '2023-01-15', 1, 1),
-            (2, 5, 'Excellent service, chambre spacieuse', '2023-02-20', 2, 1),
-            (3, 3, 'Correct mais un peu bruyant', '2023-03-10', 3, 2)
-        ])
-
-    conn.commit()
+    migrate(conn)
     conn.close()
 
+@st.cache_resource
+def get_service():
+    """Service de réservation (et son index des disponibilités) partagé par toutes les sessions"""
+    return BookingService(get_database())
+
+@st.cache_resource
+def get_cache():
+    """Résultats des lectures partagés par toutes les sessions, invalidés à chaque écriture"""
+    return QueryCache()
+
+@st.cache_resource
+def get_snapshots():
+    """Instantané des pages de rapport, renouvelé en arrière-plan toutes les 5 minutes"""
+    store = SnapshotStore(DB_PATH)
+    store.start()
+    return store
+
+@st.cache_resource
+def get_quotes():
+    """Devis sur les tarifs en cache et l'index des disponibilités du service"""
+    return QuoteEngine(get_service())
+
+@st.cache_resource
+def get_analytics():
+    """Tableaux NumPy de la page Analyses, rechargés quand les tables lues ont changé"""
+    return AnalyticsEngine()
+
 def rows_to_dict_list(rows):
     """Convertit une liste de sqlite3.Row en liste de dictionnaires classiques (pour éviter erreurs pickling dans Streamlit)"""
     return [dict(row) for row in rows]
 
+PAGE_SIZE = 50
+
+def client_picker(conn, cache, key):
+    """Saisie semi-automatique d'un client (index plein texte) ; retourne le client choisi ou None.
+
+    À placer hors d'un st.form : chaque frappe doit relancer la recherche.
+    """
+    recherche = st.text_input("Rechercher un client (nom, email, téléphone, ville)", key=f"{key}_recherche")
+    clients = rows_to_dict_list(cache.call(conn, repository.search_clients, recherche))
+    if not clients:
+        st.warning("Aucun client trouvé" if recherche else "Veuillez d'abord ajouter des clients.")
+        return None
+    return st.selectbox("Client*", clients, key=f"{key}_client",
+                        format_func=lambda client: f"{client['Nom']} — {client['Email']} ({client['Ville']})")
+
+def export_file(nom, format_):
+    """Écrit l'export complet dans un fichier temporaire, par paquets, et le rend ouvert au début"""
+    fichier = tempfile.TemporaryFile()
+    with get_database().connection(readonly=True) as conn:
+        write_export(conn, nom, format_, fichier)
+    fichier.seek(0)
+    return fichier
+
+def export_buttons(nom):
+    """Boutons de téléchargement de toute la table ; l'export n'est calculé qu'au clic"""
+    for colonne, format_ in zip(st.columns([1] * len(EXPORT_FORMATS) + [4]), EXPORT_FORMATS):
+        with colonne:
+            st.download_button(f"Exporter ({format_.upper()})", partial(export_file, nom, format_),
+                               file_name=f"{nom}.{format_}", mime=MIME_TYPES[format_],
+                               key=f"export_{nom}_{format_}", on_click="ignore")
+
+def reoptimize_stays(id_hotel, id_type, apply):
+    """Rappel des boutons de la page Calendrier, exécuté avant le rendu de la page :
+    le calendrier, lu sur la base, montre déjà les déplacements"""
+    try:
+        resultat = get_service().reoptimize(id_hotel, id_type, apply=apply)
+    except BookingError as exc:
+        resultat = str(exc)
+    st.session_state["calendrier_reoptimisation"] = (apply, resultat)
+
+def paginate(key, filtres, fetch_page):
+    """Affiche la navigation d'une liste paginée par clé et retourne les lignes de la page courante.
+
+    La pile des curseurs déjà visités est gardée en session ; elle repart de
+    zéro quand les filtres changent.
+    """
+    etat = st.session_state.setdefault(key, {"filtres": None, "curseurs": [None]})
+    if etat["filtres"] != filtres:
+        etat["filtres"] = filtres
+        etat["curseurs"] = [None]
+    rows, suivant = fetch_page(etat["curseurs"][-1])
+
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        st.button("◀ Précédent", key=f"{key}_precedent", disabled=len(etat["curseurs"]) == 1,
+                  on_click=etat["curseurs"].pop)
+    with col2:
+        st.button("Suivant ▶", key=f"{key}_suivant", disabled=suivant is None,
+                  on_click=etat["curseurs"].append, args=(suivant,))
+    with col3:
+        st.caption(f"Page {len(etat['curseurs'])}")
+    return rows
+
 # Fonction principale
 def main():
     st.title("Bienvenue chez notre Hôtel")
 
     menu = ["Accueil", "Réservations", "Clients",
             "Chambres Disponibles", "Ajouter Client",
-            "Ajouter Réservation", "Prestations", "Évaluations"]
+            "Ajouter Réservation", "Prestations", "Évaluations", "Analyses", "Calendrier", "Profilage"]
     choice = st.sidebar.selectbox("Menu", menu)
 
-    conn = create_connection()
-
+    if choice in PAGES_INSTANTANE:
+        connexion = get_snapshots().connection()
+    else:
+        connexion = get_database().connection(readonly=choice in PAGES_LECTURE)
+    # Durée de rendu et requêtes rangées sous la page choisie (si HOTEL_PROFILING=1)
+    with PROFILER.page(choice), connexion as conn:
+        render_page(choice, conn)
+
+    if choice in PAGES_INSTANTANE:
+        instantanes = get_snapshots()
+        st.sidebar.caption(f"Données de l'instantané du {taken_at(instantanes.snapshot_path):%d/%m/%Y %H:%M:%S} "
+                           f"(il y a {int(instantanes.age() // 60)} min)")
+        st.sidebar.button("Actualiser l'instantané", on_click=instantanes.refresh)
+
+    stats = get_cache().stats()
+    st.sidebar.caption(f"Cache : {stats['hits']} succès / {stats['misses']} échecs "
+                       f"({stats['entries']} entrées, {stats['bytes'] // 1024} Ko)")
+
+def render_page(choice, conn):
+    cache = get_cache()
     if choice == "Accueil":
         st.subheader("Tableau de Bord")
         col1, col2, col3 = st.columns(3)
+        reservations_actives, chambres_occupees = cache.call(conn, repository.occupation_today)
 
         with col1:
-            st.metric("Clients", conn.execute("SELECT COUNT(*) FROM Client").fetchone()[0])
+            st.metric("Clients", cache.call(conn, repository.count_clients))
 
         with col2:
-            st.metric("Réservations Actives", conn.execute("""
-                SELECT COUNT(*) FROM Reservation 
-                WHERE Date_arrivee <= date('now') 
-                AND Date_depart >= date('now')
-            """).fetchone()[0])
+            st.metric("Réservations Actives", reservations_actives)
 
         with col3:
-            st.metric("Chambres Occupées", conn.execute("""
-                SELECT COUNT(DISTINCT Numero_chambre) 
-                FROM Reservation_Chambre rc
-                JOIN Reservation r ON rc.Id_Reservation = r.Id_Reservation
-                WHERE r.Date_arrivee <= date('now') 
-                AND r.Date_depart >= date('now')
-            """).fetchone()[0])
+            st.metric("Chambres Occupées", chambres_occupees)
 
         # Afficher la note moyenne des hôtels
         st.subheader("Évaluations des hôtels")
-        evaluations = conn.execute('''
-            SELECT h.Ville, AVG(e.Note) as Note_moyenne, COUNT(e.Id_Evaluation) as Nombre_evaluations
-            FROM Hotel h
-            LEFT JOIN Evaluation e ON h.Id_Hotel = e.Id_Hotel
-            GROUP BY h.Id_Hotel
-        ''').fetchall()
+        evaluations = cache.call(conn, repository.hotel_ratings)
 
         for eval in evaluations:
             if eval['Note_moyenne']:
@@ -217,74 +198,83 @@ def main():
 
     elif choice == "Réservations":
         st.subheader("Liste des Réservations")
-        reservations = conn.execute('''
-        SELECT r.Id_Reservation, c.Nom AS Client, h.Ville, 
-               r.Date_arrivee, r.Date_depart, ch.Numero AS Chambre,
-               SUM(p.Prix * rp.Quantite) as Total_prestations
-        FROM Reservation r
-        JOIN Client c ON r.Id_Client = c.Id_Client
-        JOIN Reservation_Chambre rc ON r.Id_Reservation = rc.Id_Reservation
-        JOIN Chambre ch ON rc.Numero_chambre = ch.Numero
-        JOIN Hotel h ON ch.Id_Hotel = h.Id_Hotel
-        LEFT JOIN Reservation_Prestation rp ON r.Id_Reservation = rp.Id_Reservation
-        LEFT JOIN Prestation p ON rp.Id_Prestation = p.Id_Prestation
-        GROUP BY r.Id_Reservation
-        ORDER BY r.Date_arrivee DESC
-        ''').fetchall()
+        export_buttons("reservations")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            filtre_client = st.text_input("Client", key="filtre_reservations_client")
+        with col2:
+            filtre_debut = st.date_input("Arrivée à partir du", None, key="filtre_reservations_debut")
+        with col3:
+            filtre_fin = st.date_input("Arrivée jusqu'au", None, key="filtre_reservations_fin")
+
+        reservations = paginate(
+            "page_reservations", (filtre_client, filtre_debut, filtre_fin),
+            lambda curseur: get_service().list_reservations(
+                curseur, PAGE_SIZE, filtre_client, filtre_debut, filtre_fin))
 
         if not reservations:
             st.warning("Aucune réservation trouvée")
         else:
-            st.success(f"{len(reservations)} réservations trouvées")
-            for res in reservations:
-                with st.expander(f"Réservation #{res['Id_Reservation']} - {res['Client']}"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.write(f"**Hôtel:** {res['Ville']}")
-                        st.write(f"**Chambre:** {res['Chambre']}")
-                    with col2:
-                        st.write(f"**Arrivée:** {res['Date_arrivee']}")
-                        st.write(f"**Départ:** {res['Date_depart']}")
-                    
-                    # Afficher les prestations associées
-                    prestations = conn.execute('''
-                        SELECT p.Nom, p.Prix, rp.Quantite
-                        FROM Reservation_Prestation rp
-                        JOIN Prestation p ON rp.Id_Prestation = p.Id_Prestation
-                        WHERE rp.Id_Reservation = ?
-                    ''', (res['Id_Reservation'],)).fetchall()
-                    
-                    if prestations:
-                        st.write("**Prestations:**")
-                        for presta in prestations:
-                            st.write(f"- {presta['Nom']} ({presta['Prix']}€ x {presta['Quantite']})")
-                        st.write(f"**Total prestations:** {res['Total_prestations'] or 0:.2f}€")
+            st.dataframe([{
+                "Réservation": res['Id_Reservation'],
+                "Client": res['Client'],
+                "Arrivée": res['Date_arrivee'],
+                "Départ": res['Date_depart'],
+            } for res in reservations], hide_index=True)
+
+            # Détail chargé uniquement pour la réservation choisie
+            choix = st.selectbox(
+                "Détails de la réservation", [None] + rows_to_dict_list(reservations),
+                format_func=lambda res: "—" if res is None else f"Réservation #{res['Id_Reservation']} - {res['Client']}")
+            if choix:
+                res = get_service().reservation_details(choix)
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.write(f"**Hôtel:** {res['Ville']}")
+                    st.write(f"**Chambre:** {', '.join(str(n) for n in res['Chambres'])}")
+                with col2:
+                    st.write(f"**Arrivée:** {res['Date_arrivee']}")
+                    st.write(f"**Départ:** {res['Date_depart']}")
+
+                # Afficher les prestations associées
+                if res['Prestations']:
+                    st.write("**Prestations:**")
+                    for presta in res['Prestations']:
+                        st.write(f"- {presta['Nom']} ({presta['Prix']}€ x {presta['Quantite']})")
+                    st.write(f"**Total prestations:** {res['Total_prestations']:.2f}€")
 
     elif choice == "Clients":
         st.subheader("Liste des Clients")
-        clients = conn.execute("SELECT * FROM Client ORDER BY Nom").fetchall()
-
-        for client in clients:
-            with st.expander(f"{client['Nom']}"):
-                st.write(f"**Adresse:** {client['Adresse']}, {client['Code_postal']} {client['Ville']}")
-                st.write(f"**Email:** {client['Email']}")
-                st.write(f"**Téléphone:** {client['Telephone']}")
-                
-                # Afficher les évaluations du client
-                evaluations = conn.execute('''
-                    SELECT e.Note, e.Commentaire, e.Date_evaluation, h.Ville
-                    FROM Evaluation e
-                    JOIN Hotel h ON e.Id_Hotel = h.Id_Hotel
-                    WHERE e.Id_Client = ?
-                    ORDER BY e.Date_evaluation DESC
-                ''', (client['Id_Client'],)).fetchall()
-                
+        export_buttons("clients")
+        recherche = st.text_input("Rechercher (nom, email, téléphone, ville)", key="filtre_clients")
+        clients = paginate(
+            "page_clients", recherche,
+            lambda curseur: cache.call(conn, repository.page_clients, curseur, PAGE_SIZE, recherche))
+
+        if not clients:
+            st.warning("Aucun client trouvé")
+        else:
+            st.dataframe([{
+                "Nom": client['Nom'],
+                "Adresse": f"{client['Adresse']}, {client['Code_postal']} {client['Ville']}",
+                "Email": client['Email'],
+                "Téléphone": client['Telephone'],
+            } for client in clients], hide_index=True)
+
+            # Évaluations chargées uniquement pour le client choisi
+            choix = st.selectbox(
+                "Évaluations du client", [None] + rows_to_dict_list(clients),
+                format_func=lambda client: "—" if client is None else client['Nom'])
+            if choix:
+                evaluations = cache.call(
+                    conn, repository.evaluations_by_client, [choix['Id_Client']]).get(choix['Id_Client'])
                 if evaluations:
-                    st.write("**Évaluations:**")
                     for eval in evaluations:
                         st.write(f"- {eval['Ville']}: {eval['Note']}/5 le {eval['Date_evaluation']}")
                         if eval['Commentaire']:
                             st.write(f"  *\"{eval['Commentaire']}\"*")
+                else:
+                    st.info("Aucune évaluation pour ce client")
 
     elif choice == "Chambres Disponibles":
         st.subheader("Recherche de chambres disponibles")
@@ -295,22 +285,25 @@ def main():
             date_fin = st.date_input("Date de départ", datetime.now())
 
         if st.button("Rechercher"):
-            chambres_dispo = conn.execute('''
-            SELECT c.Numero, c.Etage, tc.Type, tc.Tarif, h.Ville, c.Fumeur, c.Id_Hotel
-            FROM Chambre c
-            JOIN Type_Chambre tc ON c.Id_Type = tc.Id_Type
-            JOIN Hotel h ON c.Id_Hotel = h.Id_Hotel
-            WHERE c.Numero NOT IN (
-                SELECT rc.Numero_chambre
-                FROM Reservation r
-                JOIN Reservation_Chambre rc ON r.Id_Reservation = rc.Id_Reservation
-                WHERE (r.Date_arrivee <= ? AND r.Date_depart >= ?)
-            )
-            ORDER BY c.Etage, c.Numero
-            ''', (date_fin, date_debut)).fetchall()
+            try:
+                chambres_dispo = get_service().search_availability(date_debut, date_fin)
+            except BookingError as exc:
+                st.error(str(exc))
+                return
+            prestations_hotels = cache.call(
+                conn, repository.prestations_by_hotel, [chambre['Id_Hotel'] for chambre in chambres_dispo])
 
             if chambres_dispo:
                 st.success(f"{len(chambres_dispo)} chambres disponibles")
+                # Un devis compte au moins une nuit
+                options = get_quotes().quote({"Date_arrivee": date_debut, "Date_depart": date_fin},
+                                             limit=10) if date_fin > date_debut else []
+                if options:
+                    st.write("**Meilleurs prix du séjour:**")
+                    st.dataframe([{
+                        "Hôtel": option['Ville'], "Type": option['Type'], "Nuits": option['Nuits'],
+                        "Tarif": option['Tarif'], "Total": option['Total'], "Disponibles": option['Disponibles'],
+                    } for option in options], hide_index=True)
                 for chambre in chambres_dispo:
                     with st.expander(f"Chambre {chambre['Numero']} - Étage {chambre['Etage']} ({chambre['Type']})"):
                         st.write(f"**Hôtel:** {chambre['Ville']}")
@@ -319,10 +312,7 @@ def main():
                         st.write(f"**Fumeur:** {'Oui' if chambre['Fumeur'] else 'Non'}")
                         
                         # Afficher les prestations disponibles pour cet hôtel
-                        prestations = conn.execute('''
-                            SELECT * FROM Prestation 
-                            WHERE Id_Hotel = ?
-                        ''', (chambre['Id_Hotel'],)).fetchall()
+                        prestations = prestations_hotels.get(chambre['Id_Hotel'])
                         
                         if prestations:
                             st.write("**Prestations disponibles:**")
@@ -342,37 +332,30 @@ def main():
             tel = st.text_input("Téléphone*")
 
             if st.form_submit_button("Enregistrer"):
-                if nom and adresse and ville and email and tel:
-                    conn.execute('''
-                    INSERT INTO Client (Nom, Adresse, Ville, Code_postal, Email, Telephone)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (nom, adresse, ville, cp, email, tel))
-                    conn.commit()
+                try:
+                    get_service().add_client(nom, adresse, ville, cp, email, tel)
                     st.success("Client ajouté avec succès!")
-                else:
-                    st.error("Veuillez remplir tous les champs obligatoires (*)")
+                except BookingError as exc:
+                    st.error(str(exc))
 
     elif choice == "Ajouter Réservation":
         st.subheader("Nouvelle réservation")
 
-        clients = conn.execute("SELECT Id_Client, Nom FROM Client ORDER BY Nom").fetchall()
-        clients_list = rows_to_dict_list(clients)
+        client = client_picker(conn, cache, "reservation")
+        if client is None:
+            return
 
-        hotels = conn.execute("SELECT Id_Hotel, Ville FROM Hotel").fetchall()
+        hotels = cache.call(conn, repository.hotels)
         hotels_list = rows_to_dict_list(hotels)
 
-        types_chambre = conn.execute("SELECT Id_Type, Type FROM Type_Chambre").fetchall()
+        types_chambre = cache.call(conn, repository.room_types)
         types_list = rows_to_dict_list(types_chambre)
 
-        if not clients_list:
-            st.warning("Veuillez d'abord ajouter des clients.")
-            return
+        # Hors du formulaire : le choix du mode réaffiche les champs correspondants
+        attribution_auto = st.radio("Attribution des chambres", ["Attribution automatique", "Choix manuel"],
+                                    horizontal=True, key="reservation_attribution") == "Attribution automatique"
 
         with st.form("form_reservation", clear_on_submit=True):
-            client_options = {client['Nom']: client['Id_Client'] for client in clients_list}
-            client_nom = st.selectbox("Client", list(client_options.keys()))
-            client_id = client_options[client_nom]
-
             hotel_options = {hotel['Ville']: hotel['Id_Hotel'] for hotel in hotels_list}
             hotel_ville = st.selectbox("Ville de l'hôtel", list(hotel_options.keys()))
             hotel_id = hotel_options[hotel_ville]
@@ -385,26 +368,33 @@ def main():
             type_id = type_options[type_chambre]
 
             # Récupérer les chambres disponibles selon filtre
-            chambres_dispo = conn.execute('''
-                SELECT Numero FROM Chambre
-                WHERE Id_Hotel = ? AND Id_Type = ? AND Numero NOT IN (
-                    SELECT rc.Numero_chambre FROM Reservation r
-                    JOIN Reservation_Chambre rc ON r.Id_Reservation = rc.Id_Reservation
-                    WHERE (r.Date_arrivee <= ? AND r.Date_depart >= ?)
-                )
-            ''', (hotel_id, type_id, date_depart, date_arrivee)).fetchall()
-
-            chambres_list = [row['Numero'] for row in chambres_dispo]
+            try:
+                chambres_libres = get_service().search_availability(date_arrivee, date_depart, hotel_id, type_id)
+            except BookingError:
+                chambres_libres = []
+            chambres_list = [chambre['Numero'] for chambre in chambres_libres]
 
             if not chambres_list:
                 st.warning("Aucune chambre disponible pour ce choix de dates, ville et type.")
             else:
-                chambre_numero = st.selectbox("Numéro de chambre", chambres_list)
+                if attribution_auto:
+                    # Chambres choisies à l'enregistrement, au meilleur ajustement (allocation.py)
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        nombre = st.number_input("Nombre de chambres", min_value=1,
+                                                 max_value=len(chambres_list), value=1)
+                    with col2:
+                        fumeur = st.selectbox("Fumeur", [None, 0, 1], format_func=lambda f: (
+                            "Indifférent", "Non-fumeur", "Fumeur")[0 if f is None else f + 1])
+                    with col3:
+                        etage = st.selectbox("Étage souhaité", [None] + sorted({c['Etage'] for c in chambres_libres}),
+                                             format_func=lambda e: "Indifférent" if e is None else str(e))
+                    chambres_numeros = []
+                else:
+                    chambres_numeros = st.multiselect("Chambres", chambres_list, default=chambres_list[:1])
                 
                 # Sélection des prestations
-                prestations = conn.execute('''
-                    SELECT * FROM Prestation WHERE Id_Hotel = ?
-                ''', (hotel_id,)).fetchall()
+                prestations = cache.call(conn, repository.prestations_by_hotel, [hotel_id]).get(hotel_id)
                 
                 prestations_selection = {}
                 if prestations:
@@ -420,32 +410,24 @@ def main():
                             prestations_selection[presta['Id_Prestation']] = qty
 
                 if st.form_submit_button("Réserver"):
-                    if date_arrivee >= date_depart:
-                        st.error("La date de départ doit être après la date d'arrivée.")
+                    try:
+                        if attribution_auto:
+                            chambres_numeros = get_service().allocate_rooms(
+                                hotel_id, type_id, date_arrivee, date_depart, nombre, fumeur, etage)
+                        # Devis calculé avant l'écriture, les chambres choisies étant encore libres
+                        devis = get_quotes().quote({
+                            "Id_Hotel": hotel_id, "Id_Type": type_id, "Date_arrivee": date_arrivee,
+                            "Date_depart": date_depart, "Chambres": max(len(chambres_numeros), 1),
+                            "Prestations": prestations_selection}, limit=1)
+                        get_service().create_reservation(
+                            client['Id_Client'], date_arrivee, date_depart, chambres_numeros, prestations_selection)
+                    except BookingError as exc:
+                        st.error(str(exc))
                     else:
-                        # Insertion réservation
-                        cursor = conn.cursor()
-                        cursor.execute('''
-                            INSERT INTO Reservation (Date_arrivee, Date_depart, Id_Client)
-                            VALUES (?, ?, ?)
-                        ''', (date_arrivee.isoformat(), date_depart.isoformat(), client_id))
-                        id_reservation = cursor.lastrowid
-
-                        # Insertion liaison chambre-réservation
-                        cursor.execute('''
-                            INSERT INTO Reservation_Chambre (Id_Reservation, Numero_chambre)
-                            VALUES (?, ?)
-                        ''', (id_reservation, chambre_numero))
-
-                        # Insertion des prestations
-                        for presta_id, qty in prestations_selection.items():
-                            cursor.execute('''
-                                INSERT INTO Reservation_Prestation (Id_Reservation, Id_Prestation, Quantite)
-                                VALUES (?, ?, ?)
-                            ''', (id_reservation, presta_id, qty))
-
-                        conn.commit()
-                        st.success(f"Réservation créée avec succès pour {client_nom} en chambre {chambre_numero} du {date_arrivee} au {date_depart}")
+                        montant = f" — montant du séjour : {devis[0]['Total']}€" if devis else ""
+                        st.success(f"Réservation créée avec succès pour {client['Nom']} en chambre(s) "
+                                   f"{', '.join(map(str, chambres_numeros))} du {date_arrivee} au {date_depart}"
+                                   f"{montant}")
 
     elif choice == "Prestations":
         st.subheader("Gestion des Prestations")
@@ -453,32 +435,37 @@ def main():
         tab1, tab2 = st.tabs(["Liste des Prestations", "Ajouter une Prestation"])
         
         with tab1:
-            prestations = conn.execute('''
-                SELECT p.*, h.Ville 
-                FROM Prestation p
-                JOIN Hotel h ON p.Id_Hotel = h.Id_Hotel
-                ORDER BY h.Ville, p.Nom
-            ''').fetchall()
+            hotels_filtre = {hotel['Ville']: hotel['Id_Hotel'] for hotel in cache.call(conn, repository.hotels)}
+            filtre_hotel = st.selectbox("Hôtel", [None] + list(hotels_filtre.keys()),
+                                        format_func=lambda ville: "Tous" if ville is None else ville,
+                                        key="filtre_prestations_hotel")
+            prestations = paginate(
+                "page_prestations", filtre_hotel,
+                lambda curseur: cache.call(
+                    conn, repository.page_prestations, curseur, PAGE_SIZE, hotels_filtre.get(filtre_hotel)))
             
             if not prestations:
                 st.warning("Aucune prestation disponible")
             else:
-                for presta in prestations:
-                    with st.expander(f"{presta['Nom']} - {presta['Ville']}"):
-                        st.write(f"**Description:** {presta['Description']}")
-                        st.write(f"**Prix:** {presta['Prix']}€")
-                        
-                        # Statistiques d'utilisation
-                        usage = conn.execute('''
-                            SELECT COUNT(*) as Nb_utilisations, SUM(Quantite) as Total_quantite
-                            FROM Reservation_Prestation
-                            WHERE Id_Prestation = ?
-                        ''', (presta['Id_Prestation'],)).fetchone()
-                        st.write(f"**Utilisations:** {usage['Nb_utilisations']} fois ({usage['Total_quantite']} au total)")
+                st.dataframe([{
+                    "Prestation": presta['Nom'],
+                    "Hôtel": presta['Ville'],
+                    "Prix (€)": presta['Prix'],
+                    "Description": presta['Description'],
+                } for presta in prestations], hide_index=True)
+
+                # Statistiques d'utilisation chargées uniquement pour la prestation choisie
+                choix = st.selectbox(
+                    "Utilisation de la prestation", [None] + rows_to_dict_list(prestations),
+                    format_func=lambda presta: "—" if presta is None else f"{presta['Nom']} - {presta['Ville']}")
+                if choix:
+                    nb_utilisations, total_quantite = cache.call(
+                        conn, repository.prestation_usage, [choix['Id_Prestation']]).get(choix['Id_Prestation'], (0, None))
+                    st.write(f"**Utilisations:** {nb_utilisations} fois ({total_quantite} au total)")
         
         with tab2:
             with st.form("nouvelle_prestation"):
-                hotels = conn.execute("SELECT Id_Hotel, Ville FROM Hotel").fetchall()
+                hotels = cache.call(conn, repository.hotels)
                 hotel_options = {hotel['Ville']: hotel['Id_Hotel'] for hotel in hotels}
                 
                 nom = st.text_input("Nom de la prestation*")
@@ -488,10 +475,7 @@ def main():
                 
                 if st.form_submit_button("Ajouter"):
                     if nom and prix:
-                        conn.execute('''
-                            INSERT INTO Prestation (Nom, Description, Prix, Id_Hotel)
-                            VALUES (?, ?, ?, ?)
-                        ''', (nom, description, prix, hotel_options[hotel]))
+                        repository.insert_prestation(conn, nom, description, prix, hotel_options[hotel])
                         conn.commit()
                         st.success("Prestation ajoutée avec succès!")
                     else:
@@ -503,47 +487,159 @@ def main():
         tab1, tab2 = st.tabs(["Liste des Évaluations", "Ajouter une Évaluation"])
         
         with tab1:
-            evaluations = conn.execute('''
-                SELECT e.*, c.Nom as Client, h.Ville
-                FROM Evaluation e
-                JOIN Client c ON e.Id_Client = c.Id_Client
-                JOIN Hotel h ON e.Id_Hotel = h.Id_Hotel
-                ORDER BY e.Date_evaluation DESC
-            ''').fetchall()
+            export_buttons("evaluations")
+            col1, col2 = st.columns(2)
+            with col1:
+                hotels_filtre = {hotel['Ville']: hotel['Id_Hotel'] for hotel in cache.call(conn, repository.hotels)}
+                filtre_hotel = st.selectbox("Hôtel", [None] + list(hotels_filtre.keys()),
+                                            format_func=lambda ville: "Tous" if ville is None else ville,
+                                            key="filtre_evaluations_hotel")
+            with col2:
+                note_min = st.slider("Note minimale", 1, 5, 1, key="filtre_evaluations_note")
+            recherche = st.text_input("Rechercher dans les commentaires", key="filtre_evaluations_texte")
+            evaluations = paginate(
+                "page_evaluations", (filtre_hotel, note_min, recherche),
+                lambda curseur: cache.call(
+                    conn, repository.page_evaluations, curseur, PAGE_SIZE, hotels_filtre.get(filtre_hotel), note_min,
+                    recherche))
             
             if not evaluations:
                 st.warning("Aucune évaluation disponible")
             else:
-                for eval in evaluations:
-                    with st.expander(f"{eval['Client']} - {eval['Ville']} ({eval['Note']}/5)"):
-                        st.write(f"**Date:** {eval['Date_evaluation']}")
-                        st.write(f"**Note:** {eval['Note']}/5")
-                        if eval['Commentaire']:
-                            st.write(f"**Commentaire:** {eval['Commentaire']}")
+                st.dataframe([{
+                    "Date": eval['Date_evaluation'],
+                    "Client": eval['Client'],
+                    "Hôtel": eval['Ville'],
+                    "Note": f"{eval['Note']}/5",
+                    "Commentaire": eval['Commentaire'],
+                } for eval in evaluations], hide_index=True)
         
         with tab2:
+            client = client_picker(conn, cache, "evaluation")
             with st.form("nouvelle_evaluation"):
-                clients = conn.execute("SELECT Id_Client, Nom FROM Client ORDER BY Nom").fetchall()
-                client_options = {client['Nom']: client['Id_Client'] for client in clients}
-                
-                hotels = conn.execute("SELECT Id_Hotel, Ville FROM Hotel").fetchall()
+                hotels = cache.call(conn, repository.hotels)
                 hotel_options = {hotel['Ville']: hotel['Id_Hotel'] for hotel in hotels}
                 
-                client = st.selectbox("Client*", list(client_options.keys()))
                 hotel = st.selectbox("Hôtel*", list(hotel_options.keys()))
                 note = st.slider("Note*", 1, 5, 3)
                 commentaire = st.text_area("Commentaire")
                 
-                if st.form_submit_button("Envoyer"):
-                    conn.execute('''
-                        INSERT INTO Evaluation (Note, Commentaire, Id_Client, Id_Hotel)
-                        VALUES (?, ?, ?, ?)
-                    ''', (note, commentaire, client_options[client], hotel_options[hotel]))
-                    conn.commit()
+                if st.form_submit_button("Envoyer", disabled=client is None):
+                    get_service().add_evaluation(note, commentaire, client['Id_Client'], hotel_options[hotel])
                     st.success("Évaluation enregistrée avec succès!")
 
-    conn.close()
+    elif choice == "Analyses":
+        st.subheader("Occupation et chiffre d'affaires")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            debut = st.date_input("Du", datetime.now().date() - timedelta(days=30), key="analyses_debut")
+        with col2:
+            fin = st.date_input("Au", datetime.now().date(), key="analyses_fin")
+        with col3:
+            regroupement = st.radio("Regrouper par", ["Hôtel", "Type de chambre"], horizontal=True,
+                                    key="analyses_regroupement")
+        if debut > fin:
+            st.error("La date de fin doit être après la date de début.")
+            return
+
+        donnees = get_analytics().data(conn)
+        totaux = donnees.totals(debut, fin)
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("Occupation", f"{totaux['Occupation']:.1%}")
+        col2.metric("ADR", f"{totaux['ADR']:.2f}€")
+        col3.metric("RevPAR", f"{totaux['RevPAR']:.2f}€")
+        col4.metric("CA chambres", f"{totaux['CA_chambres']:,.0f}€".replace(",", " "))
+        col5.metric("CA prestations", f"{totaux['CA_prestations']:,.0f}€".replace(",", " "))
+
+        colonnes = donnees.summary(debut, fin, "hotel" if regroupement == "Hôtel" else "type")
+        colonnes["Occupation"] = (100 * colonnes["Occupation"]).round(1)
+        for nom in ("ADR", "RevPAR", "CA_chambres", "CA_prestations", "CA_total"):
+            if nom in colonnes:
+                colonnes[nom] = colonnes[nom].round(2)
+        st.dataframe(colonnes, hide_index=True)
+
+        journalier = donnees.daily(debut, fin)
+        st.line_chart({"Jour": journalier["Jour"],
+                       "Occupation (%)": (100 * journalier["Occupation"]).round(1)}, x="Jour")
+
+    elif choice == "Calendrier":
+        st.subheader("Calendrier d'occupation des chambres")
+        hotels = cache.call(conn, repository.hotels)
+        hotel_options = {f"{h['Ville']} (n°{h['Id_Hotel']})": h['Id_Hotel'] for h in hotels}
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            hotel = st.selectbox("Hôtel", list(hotel_options.keys()), key="calendrier_hotel")
+        with col2:
+            debut = st.date_input("À partir du", datetime.now().date().replace(day=1), key="calendrier_debut")
+        with col3:
+            jours = st.slider("Nombre de jours", 28, 90, 31, key="calendrier_jours")
+        if hotel is None:
+            st.info("Aucun hôtel enregistré.")
+            return
+
+        fin = debut + timedelta(days=jours - 1)
+        chambres = cache.call(conn, repository.rooms_by_hotel, hotel_options[hotel])
+        sejours = cache.call(conn, repository.stays_by_hotel, hotel_options[hotel], debut, fin)
+        numeros = [c['Numero'] for c in chambres]
+        grille = occupancy_grid(numeros, sejours, debut, jours)
+        if numeros:
+            st.caption(f"{len(numeros)} chambres, occupation moyenne {grille.mean():.1%}")
+            st.altair_chart(heatmap(numeros, grille, debut))
+        else:
+            st.info("Aucune chambre dans cet hôtel.")
+            return
+
+        st.write("**Réattribution des séjours à venir** (meilleur ajustement, allocation.py)")
+        types = cache.call(conn, repository.room_types)
+        type_options = {t['Type']: t['Id_Type'] for t in types}
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            type_chambre = st.selectbox("Type de chambre", list(type_options.keys()), key="calendrier_type")
+        if type_chambre is None:
+            return
+        groupe = (hotel_options[hotel], type_options[type_chambre])
+        with col2:
+            st.button("Comparer", on_click=reoptimize_stays, args=(*groupe, False))
+        with col3:
+            st.button("Réoptimiser les séjours à venir", on_click=reoptimize_stays, args=(*groupe, True))
+        # Résultat du clic, affiché une fois
+        reoptimisation = st.session_state.pop("calendrier_reoptimisation", None)
+        if reoptimisation is None:
+            return
+        appliquer, plan = reoptimisation
+        if isinstance(plan, str):
+            st.error(plan)
+            return
+        st.dataframe(plan["rapport"], hide_index=True)
+        deplacements = len(plan["deplacements"])
+        if not appliquer:
+            st.caption(f"{plan['Mobiles']} séjours à venir, {deplacements} changement(s) de chambre proposé(s)")
+        elif deplacements:
+            st.success(f"{deplacements} séjour(s) changé(s) de chambre ; le calendrier ci-dessus les montre déjà.")
+        else:
+            st.info("Aucun changement : l'attribution actuelle ne laisse pas plus de jours orphelins.")
+
+    elif choice == "Profilage":
+        st.subheader("Profilage des pages et des requêtes")
+        if not PROFILER.enabled:
+            st.info("Profilage désactivé : relancer l'application avec la variable d'environnement "
+                    "HOTEL_PROFILING=1 (seuil des requêtes lentes : HOTEL_SLOW_QUERY_MS).")
+            return
+
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            PROFILER.slow_ms = st.number_input("Seuil des requêtes lentes (ms)", min_value=0.0,
+                                               value=float(PROFILER.slow_ms), step=10.0)
+        with col2:
+            st.caption(f"Requêtes lentes journalisées dans {PROFILER.log_path}")
+            st.button("Réinitialiser les mesures", on_click=PROFILER.reset)
+
+        st.write("**Pages** (rendu complet du script, dont SQL)")
+        st.dataframe(PROFILER.page_stats(), hide_index=True)
+        st.write("**Requêtes par page**")
+        st.dataframe(PROFILER.query_stats(), hide_index=True)
 
 if __name__ == "__main__":
-    init_db()
+    with PROFILER.page("init_db"):
+        init_db()
     main()
\ No newline at end of file
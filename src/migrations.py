@@ -0,0 +1,598 @@
+import re
+import sys
+
+# Chaque migration est une fonction recevant un curseur ; elle n'est exécutée
+# qu'une fois, PRAGMA user_version mémorisant la dernière version appliquée.
+
+
+def _schema_initial(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Hotel (
+        Id_Hotel INTEGER PRIMARY KEY AUTOINCREMENT,
+        Ville TEXT NOT NULL,
+        Pays TEXT NOT NULL,
+        Code_postal INTEGER NOT NULL
+    )''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Type_Chambre (
+        Id_Type INTEGER PRIMARY KEY AUTOINCREMENT,
+        Type TEXT NOT NULL,
+        Tarif REAL NOT NULL
+    )''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Chambre (
+        Numero INTEGER PRIMARY KEY,
+        Etage INTEGER NOT NULL,
+        Fumeur INTEGER NOT NULL,
+        Id_Hotel INTEGER NOT NULL,
+        Id_Type INTEGER NOT NULL,
+        FOREIGN KEY (Id_Hotel) REFERENCES Hotel(Id_Hotel),
+        FOREIGN KEY (Id_Type) REFERENCES Type_Chambre(Id_Type)
+    )''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Client (
+        Id_Client INTEGER PRIMARY KEY AUTOINCREMENT,
+        Adresse TEXT NOT NULL,
+        Ville TEXT NOT NULL,
+        Code_postal INTEGER NOT NULL,
+        Email TEXT NOT NULL,
+        Telephone TEXT NOT NULL,
+        Nom TEXT NOT NULL
+    )''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Reservation (
+        Id_Reservation INTEGER PRIMARY KEY AUTOINCREMENT,
+        Date_arrivee TEXT NOT NULL,
+        Date_depart TEXT NOT NULL,
+        Id_Client INTEGER NOT NULL,
+        FOREIGN KEY (Id_Client) REFERENCES Client(Id_Client)
+    )''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Reservation_Chambre (
+        Id_Reservation INTEGER,
+        Numero_chambre INTEGER,
+        PRIMARY KEY (Id_Reservation, Numero_chambre),
+        FOREIGN KEY (Id_Reservation) REFERENCES Reservation(Id_Reservation),
+        FOREIGN KEY (Numero_chambre) REFERENCES Chambre(Numero)
+    )''')
+
+    # Nouvelle table pour les prestations/services
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Prestation (
+        Id_Prestation INTEGER PRIMARY KEY AUTOINCREMENT,
+        Nom TEXT NOT NULL,
+        Description TEXT,
+        Prix REAL NOT NULL,
+        Id_Hotel INTEGER NOT NULL,
+        FOREIGN KEY (Id_Hotel) REFERENCES Hotel(Id_Hotel)
+    )''')
+
+    # Table pour lier les prestations aux réservations
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Reservation_Prestation (
+        Id_Reservation INTEGER,
+        Id_Prestation INTEGER,
+        Quantite INTEGER DEFAULT 1,
+        PRIMARY KEY (Id_Reservation, Id_Prestation),
+        FOREIGN KEY (Id_Reservation) REFERENCES Reservation(Id_Reservation),
+        FOREIGN KEY (Id_Prestation) REFERENCES Prestation(Id_Prestation)
+    )''')
+
+    # Table pour les évaluations
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Evaluation (
+        Id_Evaluation INTEGER PRIMARY KEY AUTOINCREMENT,
+        Note INTEGER NOT NULL CHECK (Note BETWEEN 1 AND 5),
+        Commentaire TEXT,
+        Date_evaluation TEXT DEFAULT CURRENT_DATE,
+        Id_Client INTEGER NOT NULL,
+        Id_Hotel INTEGER NOT NULL,
+        FOREIGN KEY (Id_Client) REFERENCES Client(Id_Client),
+        FOREIGN KEY (Id_Hotel) REFERENCES Hotel(Id_Hotel)
+    )''')
+
+    # Insertion des données de base si les tables sont vides
+    if not cursor.execute("SELECT COUNT(*) FROM Hotel").fetchone()[0]:
+        # Insertion des données d'exemple
+        cursor.executemany('INSERT INTO Hotel VALUES (?, ?, ?, ?)', [
+            (1, 'Paris', 'France', 75001),
+            (2, 'Lyon', 'France', 69002)
+        ])
+
+        cursor.executemany('INSERT INTO Type_Chambre VALUES (?, ?, ?)', [
+            (1, 'Simple', 80),
+            (2, 'Double', 120)
+        ])
+
+        cursor.executemany('INSERT INTO Chambre VALUES (?, ?, ?, ?, ?)', [
+            (101, 1, 0, 1, 1),
+            (201, 2, 0, 1, 1),
+            (202, 2, 0, 1, 1),
+            (305, 3, 0, 2, 1),
+            (307, 3, 1, 1, 2),
+            (410, 4, 0, 2, 2),
+            (502, 5, 1, 1, 2),
+            (104, 1, 1, 2, 2)
+        ])
+
+        cursor.executemany('INSERT INTO Client VALUES (?, ?, ?, ?, ?, ?, ?)', [
+            (1, '12 Rue de Paris', 'Paris', 75001, 'jean.dupont@email.fr', '0612345678', 'Jean Dupont'),
+            (2, '5 Avenue Victor Hugo', 'Lyon', 69002, 'marie.leroy@email.fr', '0623456789', 'Marie Leroy'),
+            (3, '8 Boulevard Saint-Michel', 'Marseille', 13005, 'paul.moreau@email.fr', '0634567890', 'Paul Moreau'),
+            (4, '27 Rue Nationale', 'Lille', 59800, 'lucie.martin@email.fr', '0645678901', 'Lucie Martin'),
+            (5, '3 Rue des Fleurs', 'Nice', 6000, 'emma.giraud@email.fr', '0656789012', 'Emma Giraud')
+        ])
+
+        # Ajout de prestations/services
+        cursor.executemany('INSERT INTO Prestation VALUES (?, ?, ?, ?, ?)', [
+            (1, 'Petit déjeuner', 'Buffet petit déjeuner complet', 15.0, 1),
+            (2, 'Parking', 'Place de parking sécurisée', 10.0, 1),
+            (3, 'SPA', 'Accès au spa pendant 1 heure', 40.0, 1),
+            (4, 'Petit déjeuner', 'Petit déjeuner continental', 12.0, 2),
+            (5, 'Service en chambre', 'Service de restauration en chambre', 25.0, 2)
+        ])
+
+        # Ajout d'évaluations
+        cursor.executemany('INSERT INTO Evaluation VALUES (?, ?, ?, ?, ?, ?)', [
+            (1, 4, 'Très bon séjour, personnel accueillant', '2023-01-15', 1, 1),
+            (2, 5, 'Excellent service, chambre spacieuse', '2023-02-20', 2, 1),
+            (3, 3, 'Correct mais un peu bruyant', '2023-03-10', 3, 2)
+        ])
+
+
+def _index(cursor):
+    # Un index par critère de recherche, de jointure ou de tri utilisé dans main()
+    for instruction in [
+        "CREATE INDEX IF NOT EXISTS idx_reservation_dates ON Reservation(Date_arrivee, Date_depart)",
+        "CREATE INDEX IF NOT EXISTS idx_reservation_client ON Reservation(Id_Client)",
+        "CREATE INDEX IF NOT EXISTS idx_reservation_chambre_numero ON Reservation_Chambre(Numero_chambre, Id_Reservation)",
+        "CREATE INDEX IF NOT EXISTS idx_reservation_prestation_prestation ON Reservation_Prestation(Id_Prestation, Quantite)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluation_hotel ON Evaluation(Id_Hotel, Note)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluation_client ON Evaluation(Id_Client, Date_evaluation)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluation_date ON Evaluation(Date_evaluation)",
+        "CREATE INDEX IF NOT EXISTS idx_chambre_hotel_type ON Chambre(Id_Hotel, Id_Type)",
+        "CREATE INDEX IF NOT EXISTS idx_chambre_etage ON Chambre(Etage, Numero)",
+        "CREATE INDEX IF NOT EXISTS idx_client_nom ON Client(Nom)",
+        "CREATE INDEX IF NOT EXISTS idx_prestation_hotel ON Prestation(Id_Hotel, Nom)",
+    ]:
+        cursor.execute(instruction)
+
+
+def _index_pagination(cursor):
+    # Index (Date_arrivee, rowid) : parcours dans l'ordre de la pagination par clé
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservation_arrivee ON Reservation(Date_arrivee)")
+
+
+# Ajout (signe = 1) ou retrait (signe = -1) de séjours dans Stat_Occupation,
+# un jour par ligne de Jours entre l'arrivée et le départ inclus
+_OCCUPATION = '''
+        INSERT INTO Stat_Occupation (Jour, Reservations, Chambres)
+        SELECT date(r.Date_arrivee, '+' || j.N || ' days'), {signe} * ({reservations}), {signe} * ({chambres})
+        FROM {source} r, Jours j
+        WHERE {filtre} j.N <= julianday(r.Date_depart) - julianday(r.Date_arrivee)
+        ON CONFLICT (Jour) DO UPDATE SET
+            Reservations = Reservations + excluded.Reservations,
+            Chambres = Chambres + excluded.Chambres;
+'''
+
+
+def _occupation_reservation(ligne, signe):
+    """Séjour OLD/NEW d'un trigger sur Reservation, avec les chambres déjà liées"""
+    return _OCCUPATION.format(
+        signe=signe, reservations="1",
+        chambres=f"SELECT COUNT(*) FROM Reservation_Chambre WHERE Id_Reservation = {ligne}.Id_Reservation",
+        source=f"(SELECT {ligne}.Date_arrivee AS Date_arrivee, {ligne}.Date_depart AS Date_depart)",
+        filtre="")
+
+
+def _occupation_chambre(ligne, signe):
+    """Une chambre OLD/NEW d'un trigger sur Reservation_Chambre, aux dates de sa réservation"""
+    return _OCCUPATION.format(
+        signe=signe, reservations="0", chambres="1", source="Reservation",
+        filtre=f"r.Id_Reservation = {ligne}.Id_Reservation AND")
+
+
+# Triggers qui tiennent à jour les tables de synthèse (voir aggregates.py)
+AGGREGATE_TRIGGERS = {
+    "trg_client_insert": '''CREATE TRIGGER IF NOT EXISTS trg_client_insert AFTER INSERT ON Client BEGIN
+        UPDATE Stat_Compteur SET Valeur = Valeur + 1 WHERE Nom = 'clients';
+    END''',
+    "trg_client_delete": '''CREATE TRIGGER IF NOT EXISTS trg_client_delete AFTER DELETE ON Client BEGIN
+        UPDATE Stat_Compteur SET Valeur = Valeur - 1 WHERE Nom = 'clients';
+    END''',
+    "trg_evaluation_insert": '''CREATE TRIGGER IF NOT EXISTS trg_evaluation_insert AFTER INSERT ON Evaluation BEGIN
+        INSERT INTO Stat_Hotel (Id_Hotel, Somme_notes, Nombre_evaluations)
+        VALUES (NEW.Id_Hotel, NEW.Note, 1)
+        ON CONFLICT (Id_Hotel) DO UPDATE SET
+            Somme_notes = Somme_notes + excluded.Somme_notes,
+            Nombre_evaluations = Nombre_evaluations + 1;
+    END''',
+    "trg_evaluation_delete": '''CREATE TRIGGER IF NOT EXISTS trg_evaluation_delete AFTER DELETE ON Evaluation BEGIN
+        UPDATE Stat_Hotel SET Somme_notes = Somme_notes - OLD.Note,
+                              Nombre_evaluations = Nombre_evaluations - 1
+        WHERE Id_Hotel = OLD.Id_Hotel;
+    END''',
+    "trg_evaluation_update": '''CREATE TRIGGER IF NOT EXISTS trg_evaluation_update AFTER UPDATE OF Note, Id_Hotel ON Evaluation BEGIN
+        UPDATE Stat_Hotel SET Somme_notes = Somme_notes - OLD.Note,
+                              Nombre_evaluations = Nombre_evaluations - 1
+        WHERE Id_Hotel = OLD.Id_Hotel;
+        INSERT INTO Stat_Hotel (Id_Hotel, Somme_notes, Nombre_evaluations)
+        VALUES (NEW.Id_Hotel, NEW.Note, 1)
+        ON CONFLICT (Id_Hotel) DO UPDATE SET
+            Somme_notes = Somme_notes + excluded.Somme_notes,
+            Nombre_evaluations = Nombre_evaluations + 1;
+    END''',
+    # Les chambres déjà liées sont comptées avec la réservation : le résultat
+    # ne dépend pas de l'ordre des insertions/suppressions parent/enfant
+    "trg_reservation_insert": f'''CREATE TRIGGER IF NOT EXISTS trg_reservation_insert AFTER INSERT ON Reservation BEGIN
+        {_occupation_reservation("NEW", 1)}
+    END''',
+    "trg_reservation_delete": f'''CREATE TRIGGER IF NOT EXISTS trg_reservation_delete AFTER DELETE ON Reservation BEGIN
+        {_occupation_reservation("OLD", -1)}
+    END''',
+    "trg_reservation_update": f'''CREATE TRIGGER IF NOT EXISTS trg_reservation_update
+    AFTER UPDATE OF Date_arrivee, Date_depart ON Reservation BEGIN
+        {_occupation_reservation("OLD", -1)}
+        {_occupation_reservation("NEW", 1)}
+    END''',
+    "trg_reservation_chambre_insert": f'''CREATE TRIGGER IF NOT EXISTS trg_reservation_chambre_insert AFTER INSERT ON Reservation_Chambre BEGIN
+        {_occupation_chambre("NEW", 1)}
+    END''',
+    "trg_reservation_chambre_delete": f'''CREATE TRIGGER IF NOT EXISTS trg_reservation_chambre_delete AFTER DELETE ON Reservation_Chambre BEGIN
+        {_occupation_chambre("OLD", -1)}
+    END''',
+}
+
+
+def _statistiques(cursor):
+    # Tables de synthèse du tableau de bord, maintenues par triggers
+    cursor.execute("CREATE TABLE IF NOT EXISTS Jours (N INTEGER PRIMARY KEY)")
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Stat_Compteur (
+        Nom TEXT PRIMARY KEY,
+        Valeur INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Stat_Hotel (
+        Id_Hotel INTEGER PRIMARY KEY,
+        Somme_notes INTEGER NOT NULL DEFAULT 0,
+        Nombre_evaluations INTEGER NOT NULL DEFAULT 0
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Stat_Occupation (
+        Jour TEXT PRIMARY KEY,
+        Reservations INTEGER NOT NULL DEFAULT 0,
+        Chambres INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID''')
+
+    for instruction in AGGREGATE_TRIGGERS.values():
+        cursor.execute(instruction)
+
+    import aggregates
+    aggregates.rebuild(cursor.connection)
+
+
+# Message des triggers anti-chevauchement, reconnu par le service de réservation
+OVERLAP_MESSAGE = "Chambre déjà réservée sur ces dates"
+
+# Même règle que l'index des disponibilités : deux séjours d'une chambre se
+# chevauchent si chacun commence au plus tard le jour où l'autre se termine
+_CHEVAUCHEMENT_CHAMBRE = '''
+        SELECT 1 FROM Reservation_Chambre rc
+        JOIN Reservation r ON r.Id_Reservation = rc.Id_Reservation
+        JOIN Reservation n ON n.Id_Reservation = NEW.Id_Reservation
+        WHERE rc.Numero_chambre = NEW.Numero_chambre AND rc.Id_Reservation <> NEW.Id_Reservation
+          AND r.Date_arrivee <= n.Date_depart AND r.Date_depart >= n.Date_arrivee'''
+
+OVERLAP_TRIGGERS = {
+    "trg_reservation_chambre_chevauchement": f'''CREATE TRIGGER IF NOT EXISTS trg_reservation_chambre_chevauchement
+    BEFORE INSERT ON Reservation_Chambre WHEN EXISTS ({_CHEVAUCHEMENT_CHAMBRE}) BEGIN
+        SELECT RAISE(ABORT, '{OVERLAP_MESSAGE}');
+    END''',
+    "trg_reservation_chambre_chevauchement_update": f'''CREATE TRIGGER IF NOT EXISTS trg_reservation_chambre_chevauchement_update
+    BEFORE UPDATE OF Numero_chambre, Id_Reservation ON Reservation_Chambre WHEN EXISTS ({_CHEVAUCHEMENT_CHAMBRE}) BEGIN
+        SELECT RAISE(ABORT, '{OVERLAP_MESSAGE}');
+    END''',
+    "trg_reservation_chevauchement": f'''CREATE TRIGGER IF NOT EXISTS trg_reservation_chevauchement
+    BEFORE UPDATE OF Date_arrivee, Date_depart ON Reservation WHEN EXISTS (
+        SELECT 1 FROM Reservation_Chambre moi
+        JOIN Reservation_Chambre rc ON rc.Numero_chambre = moi.Numero_chambre
+                                   AND rc.Id_Reservation <> moi.Id_Reservation
+        JOIN Reservation r ON r.Id_Reservation = rc.Id_Reservation
+        WHERE moi.Id_Reservation = NEW.Id_Reservation
+          AND r.Date_arrivee <= NEW.Date_depart AND r.Date_depart >= NEW.Date_arrivee) BEGIN
+        SELECT RAISE(ABORT, '{OVERLAP_MESSAGE}');
+    END''',
+}
+
+
+def _anti_chevauchement(cursor):
+    # Deux réservations ne peuvent plus occuper la même chambre le même jour,
+    # quel que soit le programme qui écrit dans la base
+    for instruction in OVERLAP_TRIGGERS.values():
+        cursor.execute(instruction)
+
+
+# Tables dont chaque écriture incrémente la génération lue par query_cache.py
+VERSIONED_TABLES = ["Hotel", "Type_Chambre", "Chambre", "Client", "Reservation", "Reservation_Chambre",
+                    "Prestation", "Reservation_Prestation", "Evaluation",
+                    "Stat_Compteur", "Stat_Hotel", "Stat_Occupation"]
+
+GENERATION_TRIGGERS = {
+    f"trg_generation_{table.lower()}_{operation.lower()}": f'''CREATE TRIGGER IF NOT EXISTS
+    trg_generation_{table.lower()}_{operation.lower()} AFTER {operation} ON {table} BEGIN
+        UPDATE Generation_Table SET Generation = Generation + 1 WHERE Nom_table = '{table}';
+    END'''
+    for table in VERSIONED_TABLES
+    for operation in ("INSERT", "UPDATE", "DELETE")
+}
+
+
+def _generations(cursor):
+    # Génération d'écriture par table : une entrée de cache n'est valable que
+    # tant que les générations des tables qu'elle lit n'ont pas changé
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Generation_Table (
+        Nom_table TEXT PRIMARY KEY,
+        Generation INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID''')
+    cursor.executemany("INSERT OR IGNORE INTO Generation_Table (Nom_table) VALUES (?)",
+                       [(table,) for table in VERSIONED_TABLES])
+    for instruction in GENERATION_TRIGGERS.values():
+        cursor.execute(instruction)
+
+
+# Génération que lisait AvailabilityIndex.sync avant Journal_Index : toute
+# suppression ou tout changement de chambre ou de dates demandait de reconstruire
+# l'index (triggers retirés par _journal_index)
+INDEX_GENERATION = "Index_disponibilites"
+
+INDEX_TRIGGERS = {
+    f"trg_index_reservation_chambre_{operation.lower()}": f'''CREATE TRIGGER IF NOT EXISTS
+    trg_index_reservation_chambre_{operation.lower()} AFTER {operation} ON Reservation_Chambre BEGIN
+        UPDATE Generation_Table SET Generation = Generation + 1 WHERE Nom_table = '{INDEX_GENERATION}';
+    END'''
+    for operation in ("UPDATE", "DELETE")
+}
+INDEX_TRIGGERS["trg_index_reservation_dates"] = f'''CREATE TRIGGER IF NOT EXISTS
+    trg_index_reservation_dates AFTER UPDATE OF Date_arrivee, Date_depart ON Reservation BEGIN
+        UPDATE Generation_Table SET Generation = Generation + 1 WHERE Nom_table = '{INDEX_GENERATION}';
+    END'''
+
+
+def _generation_index(cursor):
+    cursor.execute("INSERT OR IGNORE INTO Generation_Table (Nom_table) VALUES (?)", (INDEX_GENERATION,))
+    for instruction in INDEX_TRIGGERS.values():
+        cursor.execute(instruction)
+
+
+def _index_evaluations_sans_date(cursor):
+    # Date_evaluation peut être NULL : la pagination trie sur COALESCE(Date_evaluation, ''),
+    # sans quoi la comparaison de la clé écarte ces évaluations après la première page
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_evaluation_date_cle ON Evaluation(COALESCE(Date_evaluation, ''))")
+
+
+
+# Séjours retirés (Signe -1) ou ajoutés (+1) autrement que par l'insertion d'une
+# liaison Reservation_Chambre : suppression, changement de chambre ou de dates.
+# AvailabilityIndex.sync (availability.py) applique les lignes écrites depuis
+# son dernier passage au lieu de reconstruire l'index ; AUTOINCREMENT garantit
+# qu'un Id n'est jamais réattribué après la purge des anciennes lignes.
+def _journal_sejours(chambre, source, arrivee, depart, signe, filtre=""):
+    return f"""INSERT INTO Journal_Index (Numero_chambre, Date_arrivee, Date_depart, Signe)
+        SELECT {chambre}, {arrivee}, {depart}, {signe} FROM {source}{filtre};"""
+
+
+# Comme pour les statistiques, une liaison supprimée avant ou après sa
+# réservation n'est journalisée qu'une fois : par le trigger qui voit encore l'autre ligne
+JOURNAL_TRIGGERS = {
+    "trg_journal_reservation_chambre_delete": f'''CREATE TRIGGER IF NOT EXISTS
+    trg_journal_reservation_chambre_delete AFTER DELETE ON Reservation_Chambre BEGIN
+        {_journal_sejours("OLD.Numero_chambre", "Reservation", "Date_arrivee", "Date_depart", -1,
+                          " WHERE Id_Reservation = OLD.Id_Reservation")}
+    END''',
+    "trg_journal_reservation_chambre_update": f'''CREATE TRIGGER IF NOT EXISTS
+    trg_journal_reservation_chambre_update AFTER UPDATE OF Numero_chambre, Id_Reservation
+    ON Reservation_Chambre BEGIN
+        {_journal_sejours("OLD.Numero_chambre", "Reservation", "Date_arrivee", "Date_depart", -1,
+                          " WHERE Id_Reservation = OLD.Id_Reservation")}
+        {_journal_sejours("NEW.Numero_chambre", "Reservation", "Date_arrivee", "Date_depart", 1,
+                          " WHERE Id_Reservation = NEW.Id_Reservation")}
+    END''',
+    "trg_journal_reservation_delete": f'''CREATE TRIGGER IF NOT EXISTS
+    trg_journal_reservation_delete AFTER DELETE ON Reservation BEGIN
+        {_journal_sejours("Numero_chambre", "Reservation_Chambre", "OLD.Date_arrivee", "OLD.Date_depart", -1,
+                          " WHERE Id_Reservation = OLD.Id_Reservation")}
+    END''',
+    "trg_journal_reservation_dates": f'''CREATE TRIGGER IF NOT EXISTS
+    trg_journal_reservation_dates AFTER UPDATE OF Date_arrivee, Date_depart ON Reservation BEGIN
+        {_journal_sejours("Numero_chambre", "Reservation_Chambre", "OLD.Date_arrivee", "OLD.Date_depart", -1,
+                          " WHERE Id_Reservation = OLD.Id_Reservation")}
+        {_journal_sejours("Numero_chambre", "Reservation_Chambre", "NEW.Date_arrivee", "NEW.Date_depart", 1,
+                          " WHERE Id_Reservation = NEW.Id_Reservation")}
+    END''',
+}
+
+
+def _journal_index(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Journal_Index (
+        Id INTEGER PRIMARY KEY AUTOINCREMENT,
+        Numero_chambre INTEGER NOT NULL,
+        Date_arrivee TEXT NOT NULL,
+        Date_depart TEXT NOT NULL,
+        Signe INTEGER NOT NULL,
+        Date_ecriture TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_journal_index_date ON Journal_Index(Date_ecriture)")
+    for nom in INDEX_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nom}")
+    cursor.execute("DELETE FROM Generation_Table WHERE Nom_table = ?", (INDEX_GENERATION,))
+    for instruction in JOURNAL_TRIGGERS.values():
+        cursor.execute(instruction)
+
+
+# Index plein texte FTS5 à contenu externe : table indexée -> (clé, colonnes)
+SEARCH_INDEXES = {
+    "Client": ("Id_Client", ("Nom", "Email", "Telephone", "Ville")),
+    "Evaluation": ("Id_Evaluation", ("Commentaire",)),
+}
+
+
+def _synchro_recherche(table, cle, colonnes):
+    liste = ", ".join(colonnes)
+    anciennes = ", ".join(f"OLD.{colonne}" for colonne in colonnes)
+    nouvelles = ", ".join(f"NEW.{colonne}" for colonne in colonnes)
+    # Un index à contenu externe retire une ligne par la commande 'delete'
+    # avec les anciennes valeurs
+    retrait = f"INSERT INTO {table}_fts ({table}_fts, rowid, {liste}) VALUES ('delete', OLD.{cle}, {anciennes});"
+    ajout = f"INSERT INTO {table}_fts (rowid, {liste}) VALUES (NEW.{cle}, {nouvelles});"
+    return {
+        f"trg_recherche_{table.lower()}_insert": f'''CREATE TRIGGER IF NOT EXISTS
+    trg_recherche_{table.lower()}_insert AFTER INSERT ON {table} BEGIN
+        {ajout}
+    END''',
+        f"trg_recherche_{table.lower()}_delete": f'''CREATE TRIGGER IF NOT EXISTS
+    trg_recherche_{table.lower()}_delete AFTER DELETE ON {table} BEGIN
+        {retrait}
+    END''',
+        f"trg_recherche_{table.lower()}_update": f'''CREATE TRIGGER IF NOT EXISTS
+    trg_recherche_{table.lower()}_update AFTER UPDATE OF {cle}, {liste} ON {table} BEGIN
+        {retrait}
+        {ajout}
+    END''',
+    }
+
+
+SEARCH_TRIGGERS = {
+    nom: instruction
+    for table, (cle, colonnes) in SEARCH_INDEXES.items()
+    for nom, instruction in _synchro_recherche(table, cle, colonnes).items()
+}
+
+
+def _recherche_texte(cursor):
+    # Accents ignorés ("helene" trouve "Hélène") ; index de préfixes d'un à
+    # trois caractères pour la saisie semi-automatique
+    for table, (cle, colonnes) in SEARCH_INDEXES.items():
+        cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+            {", ".join(colonnes)},
+            content='{table}', content_rowid='{cle}',
+            tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+        )''')
+        cursor.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+    for instruction in SEARCH_TRIGGERS.values():
+        cursor.execute(instruction)
+
+
+MIGRATIONS = [
+    _schema_initial,
+    _index,
+    _index_pagination,
+    _statistiques,
+    _anti_chevauchement,
+    _generations,
+    _recherche_texte,
+    _generation_index,
+    _index_evaluations_sans_date,
+    _journal_index,
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Applique les migrations manquantes ; ne fait qu'une lecture de PRAGMA si la base est à jour"""
+    version = schema_version(conn)
+    if version >= len(MIGRATIONS):
+        return version
+    for numero, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor = conn.cursor()
+        migration(cursor)
+        # PRAGMA n'accepte pas de paramètre lié
+        cursor.execute(f"PRAGMA user_version = {numero}")
+        conn.commit()
+    conn.execute("PRAGMA optimize")
+    return len(MIGRATIONS)
+
+
+# Requêtes émises par main(), vérifiées par check_query_plans()
+def page_queries():
+    """{nom: (sql, paramètres)} pour chaque requête du module repository"""
+    import repository
+    from availability import SQL_JOURNAL, SQL_STAYS
+    queries = {}
+    for nom in dir(repository):
+        if not nom.startswith("SQL_"):
+            continue
+        sql = getattr(repository, nom)
+        if "{marks}" in sql:
+            sql = sql.format(marks="?")
+        elif "{conditions}" in sql:
+            sql = sql.format(conditions="1")
+        queries[nom[4:].lower()] = (sql, (1,) * sql.count("?"))
+    queries["index_disponibilites"] = (SQL_STAYS, (0,))
+    queries["journal_index"] = (SQL_JOURNAL, (0,))
+    # Condition des triggers anti-chevauchement, évaluée à chaque chambre réservée
+    queries["trigger_chevauchement"] = (
+        _CHEVAUCHEMENT_CHAMBRE.replace("NEW.Id_Reservation", "?").replace("NEW.Numero_chambre", "?"),
+        (1, 101, 1))
+    return queries
+
+
+# Tables de référence de quelques lignes : les parcourir entièrement est normal
+SMALL_TABLES = {"Hotel", "Type_Chambre"}
+
+_SCAN = re.compile(r"^SCAN (?:\w+\.)?(\w+)(.*)$")
+# Table virtuelle (FTS5) : une chaîne d'index non vide après "n:" signale une
+# contrainte prise en charge par le module, par exemple MATCH
+_VIRTUAL_INDEX = re.compile(r"VIRTUAL TABLE INDEX \d+:\S")
+_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+
+
+def full_scans(conn, sql, params=()):
+    """Tables parcourues entièrement (sans index) d'après EXPLAIN QUERY PLAN"""
+    # EXPLAIN QUERY PLAN affiche l'alias de la table, pas son nom
+    alias = {}
+    for table, nom in _ALIAS.findall(sql):
+        alias[nom or table] = table
+    tables = []
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+        match = _SCAN.match(row[-1])
+        if not match or "USING" in match.group(2) or _VIRTUAL_INDEX.search(match.group(2)):
+            continue
+        table = alias.get(match.group(1), match.group(1))
+        if table not in SMALL_TABLES:
+            tables.append(table)
+    return tables
+
+
+def check_query_plans(conn, queries=None):
+    """Retourne {nom_requête: [tables parcourues]} pour les requêtes fautives"""
+    problemes = {}
+    for nom, (sql, params) in (queries or page_queries()).items():
+        tables = full_scans(conn, sql, params)
+        if tables:
+            problemes[nom] = tables
+    return problemes
+
+
+if __name__ == "__main__":
+    # python src/migrations.py [chemin.db] : migre puis vérifie les plans d'exécution
+    from database import connect
+    # Connexion de l'application : archive attachée et vues Historique_*
+    conn = connect(sys.argv[1] if len(sys.argv) > 1 else "data/hotel.db")
+    print(f"Version du schéma : {migrate(conn)}")
+    problemes = check_query_plans(conn)
+    for nom, tables in problemes.items():
+        print(f"Parcours complet dans {nom} : {', '.join(tables)}")
+    conn.close()
+    sys.exit(1 if problemes else 0)
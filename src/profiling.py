@@ -0,0 +1,255 @@
+"""Profilage des requêtes SQL et du temps de rendu des pages.
+
+Activé par la variable d'environnement HOTEL_PROFILING=1 : database.connect()
+ouvre alors des connexions ProfiledConnection dont les curseurs mesurent
+chaque requête (texte, forme des paramètres, durée exécution + lecture des
+lignes, nombre de lignes), rangée sous la page en cours du thread. Désactivé,
+connect() garde les connexions sqlite3 ordinaires : aucun coût par requête.
+
+HOTEL_SLOW_QUERY_MS (200 par défaut) et HOTEL_SLOW_QUERY_LOG
+(data/slow_queries.log) règlent le journal des requêtes lentes.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import chain
+
+# Durées conservées par requête et par page pour les percentiles
+SAMPLES = 2000
+DEFAULT_SLOW_MS = 200
+DEFAULT_SLOW_LOG = os.path.join("data", "slow_queries.log")
+
+HORS_PAGE = "(hors page)"
+
+_ESPACES = re.compile(r"\s+")
+# Listes IN (?, ?, ...) de longueur variable : une seule requête par forme
+_LISTE = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def normalize(sql):
+    return _LISTE.sub("?, …", _ESPACES.sub(" ", sql).strip())
+
+
+def parameters_shape(params):
+    """Forme des paramètres sans leurs valeurs (données clients) : "3 positionnels", "2 nommés"..."""
+    if isinstance(params, dict):
+        return f"{len(params)} nommés"
+    return f"{len(params)} positionnels" if params else "aucun"
+
+
+def percentile(triees, q):
+    """Percentile `q` (0-100) par rang le plus proche d'une liste triée non vide"""
+    return triees[min(len(triees) - 1, max(0, round(q / 100 * len(triees)) - 1))]
+
+
+class _Serie:
+    __slots__ = ("durees", "appels", "lignes", "total")
+
+    def __init__(self):
+        self.durees = deque(maxlen=SAMPLES)
+        self.appels = 0
+        self.lignes = 0
+        self.total = 0.0
+
+    def ajouter(self, duree, lignes=0):
+        self.durees.append(duree)
+        self.appels += 1
+        self.lignes += lignes
+        self.total += duree
+
+    def resume(self):
+        triees = sorted(self.durees)
+        return {
+            "Appels": self.appels,
+            "p50 (ms)": round(1000 * percentile(triees, 50), 2),
+            "p95 (ms)": round(1000 * percentile(triees, 95), 2),
+            "p99 (ms)": round(1000 * percentile(triees, 99), 2),
+            "Max (ms)": round(1000 * triees[-1], 2),
+            "Total (s)": round(self.total, 3),
+        }
+
+
+class Profiler:
+    """Mesures partagées par toutes les sessions du processus"""
+
+    def __init__(self, enabled=False, slow_ms=DEFAULT_SLOW_MS, log_path=DEFAULT_SLOW_LOG):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._requetes = defaultdict(_Serie)  # (page, requête) -> durées
+        self._pages = defaultdict(_Serie)     # page -> durées de rendu
+        self._sql_pages = defaultdict(_Serie)  # page -> temps SQL par rendu
+
+    @classmethod
+    def from_environment(cls):
+        return cls(enabled=os.environ.get("HOTEL_PROFILING", "") not in ("", "0"),
+                   slow_ms=float(os.environ.get("HOTEL_SLOW_QUERY_MS", DEFAULT_SLOW_MS)),
+                   log_path=os.environ.get("HOTEL_SLOW_QUERY_LOG", DEFAULT_SLOW_LOG))
+
+    @contextmanager
+    def page(self, nom):
+        """Range les requêtes du bloc sous `nom` et mesure sa durée totale"""
+        if not self.enabled:
+            yield
+            return
+        precedente = getattr(self._local, "page", None)
+        self._local.page, self._local.sql = nom, 0.0
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - debut
+            with self._lock:
+                self._pages[nom].ajouter(duree)
+                self._sql_pages[nom].ajouter(self._local.sql)
+            self._local.page = precedente
+
+    def record(self, sql, params, duree, lignes):
+        page = getattr(self._local, "page", None) or HORS_PAGE
+        requete = normalize(sql)
+        if page != HORS_PAGE:
+            self._local.sql += duree
+        with self._lock:
+            self._requetes[(page, requete)].ajouter(duree, max(lignes, 0))
+        if duree * 1000 >= self.slow_ms and self.log_path:
+            ligne = (f"{datetime.now().isoformat(timespec='seconds')}\t{page}\t{duree * 1000:.1f} ms\t"
+                     f"{max(lignes, 0)} lignes\t{parameters_shape(params)}\t{requete}\n")
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as journal:
+                journal.write(ligne)
+
+    def query_stats(self):
+        """Une ligne par (page, requête), les plus lentes au 95e percentile d'abord"""
+        with self._lock:
+            lignes = [{"Page": page, "Requête": requete, **serie.resume(),
+                       "Lignes/appel": round(serie.lignes / serie.appels, 1)}
+                      for (page, requete), serie in self._requetes.items()]
+        return sorted(lignes, key=lambda ligne: ligne["p95 (ms)"], reverse=True)
+
+    def page_stats(self):
+        """Durée de rendu de chaque page et part passée dans SQLite"""
+        with self._lock:
+            lignes = [{"Page": page, **serie.resume(),
+                       "SQL p50 (ms)": self._sql_pages[page].resume()["p50 (ms)"]}
+                      for page, serie in self._pages.items()]
+        return sorted(lignes, key=lambda ligne: ligne["p95 (ms)"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._requetes.clear()
+            self._pages.clear()
+            self._sql_pages.clear()
+
+
+PROFILER = Profiler.from_environment()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Curseur mesurant chaque requête jusqu'à la lecture de sa dernière ligne.
+
+    SQLite calcule les lignes au fil des fetch : la durée d'une requête
+    cumule son exécution et ses lectures, et elle est enregistrée quand ses
+    lignes sont épuisées, à la requête suivante ou à la fermeture du curseur.
+    """
+
+    _en_cours = None  # [sql, paramètres, durée, lignes]
+
+    def _terminer(self):
+        if self._en_cours is not None:
+            sql, params, duree, lignes = self._en_cours
+            self._en_cours = None
+            PROFILER.record(sql, params, duree, lignes)
+
+    def _mesurer(self, methode, *args):
+        debut = time.perf_counter()
+        try:
+            return methode(*args)
+        finally:
+            if self._en_cours is not None:
+                self._en_cours[2] += time.perf_counter() - debut
+
+    def execute(self, sql, parameters=()):
+        self._terminer()
+        self._en_cours = [sql, parameters, 0.0, 0]
+        self._mesurer(super().execute, sql, parameters)
+        if self.description is None:
+            # Écriture ou DDL : pas de ligne à lire
+            self._en_cours[3] = self.rowcount
+            self._terminer()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._terminer()
+        # Premier jeu de paramètres lu pour sa forme, sans matérialiser un générateur
+        params = iter(seq_of_parameters)
+        premier = next(params, None)
+        self._en_cours = [sql, premier or (), 0.0, 0]
+        self._mesurer(super().executemany, sql, params if premier is None else chain([premier], params))
+        self._en_cours[3] = self.rowcount
+        self._terminer()
+        return self
+
+    def fetchone(self):
+        row = self._mesurer(super().fetchone)
+        if row is None:
+            self._terminer()
+        elif self._en_cours is not None:
+            self._en_cours[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._mesurer(super().fetchmany, self.arraysize if size is None else size)
+        if self._en_cours is not None:
+            self._en_cours[3] += len(rows)
+        if not rows:
+            self._terminer()
+        return rows
+
+    def fetchall(self):
+        rows = self._mesurer(super().fetchall)
+        if self._en_cours is not None:
+            self._en_cours[3] += len(rows)
+        self._terminer()
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._terminer()
+        super().close()
+
+    def __del__(self):
+        # Curseur abandonné sans avoir lu toutes ses lignes (fetchone unique)
+        try:
+            self._terminer()
+        except Exception:
+            pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connexion dont les curseurs, y compris ceux de execute(), sont des ProfiledCursor"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # Connection.execute crée son curseur sans passer par cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """Classe de connexion à passer à sqlite3.connect selon l'activation du profilage"""
+    return ProfiledConnection if PROFILER.enabled else sqlite3.Connection
@@ -0,0 +1,119 @@
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import repository
+
+# Cache des lectures de repository partagé par les sessions Streamlit.
+#
+# Une entrée est rangée sous (fonction, paramètres) avec les générations des
+# tables lues au moment du calcul ; elle n'est servie que si ces générations
+# (table Generation_Table, incrémentée par trigger à chaque écriture) sont
+# inchangées. Une écriture validée est donc visible dès la lecture suivante,
+# quelle que soit la connexion ou le processus qui l'a faite.
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def _jour_utc():
+    # date('now') de SQLite est en UTC
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+# Fonction de repository -> (tables lues, clé complémentaire éventuelle)
+DEPENDENCIES = {
+    repository.count_clients: (("Stat_Compteur",), None),
+    repository.occupation_today: (("Stat_Occupation",), _jour_utc),
+    repository.hotel_ratings: (("Hotel", "Stat_Hotel"), None),
+    repository.hotels: (("Hotel",), None),
+    repository.room_types: (("Type_Chambre",), None),
+    repository.page_clients: (("Client",), None),
+    repository.search_clients: (("Client",), None),
+    repository.evaluations_by_client: (("Evaluation", "Hotel"), None),
+    repository.prestations_by_hotel: (("Prestation",), None),
+    repository.page_prestations: (("Prestation", "Hotel"), None),
+    repository.prestation_usage: (("Reservation_Prestation",), None),
+    repository.page_evaluations: (("Evaluation", "Client", "Hotel"), None),
+    repository.rooms_by_hotel: (("Chambre", "Type_Chambre"), None),
+    repository.stays_by_hotel: (("Chambre", "Reservation", "Reservation_Chambre"), None),
+}
+
+
+def _hashable(valeur):
+    if isinstance(valeur, (list, set)):
+        return tuple(valeur)
+    return valeur
+
+
+def estimate_size(valeur):
+    """Taille approximative en octets d'un résultat (lignes, tuples, dictionnaires)"""
+    taille = sys.getsizeof(valeur)
+    if isinstance(valeur, dict):
+        taille += sum(estimate_size(k) + estimate_size(v) for k, v in valeur.items())
+    elif isinstance(valeur, (list, tuple, sqlite3.Row)):
+        taille += sum(estimate_size(v) for v in valeur)
+    return taille
+
+
+class QueryCache:
+    """Cache LRU borné en mémoire, validé par les générations d'écriture"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entrees = OrderedDict()  # clé -> (générations, résultat, taille)
+        self._octets = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def generations(conn, tables):
+        rows = conn.execute(
+            f"SELECT Nom_table, Generation FROM Generation_Table WHERE Nom_table IN ({', '.join('?' * len(tables))})",
+            tables).fetchall()
+        valeurs = dict(rows)
+        return tuple(valeurs.get(table, 0) for table in tables)
+
+    def call(self, conn, fonction, *args):
+        """Résultat de `fonction(conn, *args)`, depuis le cache si les tables lues n'ont pas changé"""
+        tables, complement = DEPENDENCIES[fonction]
+        cle = (fonction.__name__, tuple(_hashable(arg) for arg in args),
+               complement() if complement else None)
+        # Générations lues avant la requête : un résultat calculé après une
+        # écriture concurrente est au pire plus récent que sa génération
+        generations = self.generations(conn, tables)
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree is not None and entree[0] == generations:
+                self._entrees.move_to_end(cle)
+                self.hits += 1
+                return entree[1]
+            self.misses += 1
+
+        resultat = fonction(conn, *args)
+        taille = estimate_size(resultat)
+        with self._lock:
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne is not None:
+                self._octets -= ancienne[2]
+            if taille <= self.max_bytes:
+                self._entrees[cle] = (generations, resultat, taille)
+                self._octets += taille
+                while self._octets > self.max_bytes:
+                    _, (_, _, liberes) = self._entrees.popitem(last=False)
+                    self._octets -= liberes
+                    self.evictions += 1
+        return resultat
+
+    def clear(self):
+        with self._lock:
+            self._entrees.clear()
+            self._octets = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entrees), "bytes": self._octets}
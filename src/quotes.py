@@ -0,0 +1,237 @@
+"""Devis : prix d'un séjour dans les chambres libres les moins chères.
+
+    python src/quotes.py [--db data/hotel.db] [--requests 20000] [--batch 100]   # devis/s
+
+Une demande est un dictionnaire aux noms de colonnes de la base :
+
+    {"Ville": "Lyon" | "Id_Hotel": 2, "Date_arrivee": "2025-07-01", "Date_depart": "2025-07-04",
+     "Id_Type": 1, "Chambres": 1, "Prestations": {"Petit déjeuner": 2, 5: 1}}
+
+Sans Ville ni Id_Hotel, toute la chaîne est couverte. Les prestations sont
+désignées par leur nom (comparé sans accents ni casse) ou par Id_Prestation ;
+un hôtel qui ne les propose pas toutes n'est pas proposé.
+
+Une option par hôtel et type de chambre ayant assez de chambres libres, de la
+moins chère à la plus chère. Comme dans analytics.py, un séjour du 1er au 4
+fait 3 nuits facturées au Tarif du type ; une prestation coûte Prix ×
+quantité pour le séjour. Tarifs et prestations sont lus une fois puis gardés
+tant que leurs tables ne changent pas ; les disponibilités viennent de
+l'index en mémoire du service de réservation.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from datetime import date, timedelta
+
+from availability import to_ordinal
+from query_cache import QueryCache
+from service import BookingError
+
+# Tables lues : tarifs rechargés (et chambres de l'index) quand l'une d'elles change
+TABLES = ("Hotel", "Type_Chambre", "Chambre", "Prestation")
+
+DEFAULT_LIMIT = 5
+
+SQL_HOTELS = "SELECT Id_Hotel, Ville FROM Hotel ORDER BY Id_Hotel"
+SQL_TYPES = "SELECT Id_Type, Type, Tarif FROM Type_Chambre ORDER BY Tarif, Id_Type"
+SQL_PRESTATIONS = "SELECT Id_Prestation, Nom, Prix, Id_Hotel FROM Prestation ORDER BY Prix, Id_Prestation"
+
+
+def _normalize(texte):
+    """Texte sans accents ni casse, pour comparer villes et noms de prestations"""
+    decompose = unicodedata.normalize("NFKD", str(texte).strip())
+    return "".join(c for c in decompose if not unicodedata.combining(c)).casefold()
+
+
+def _day(valeur):
+    return valeur if isinstance(valeur, date) else date.fromisoformat(str(valeur)[:10])
+
+
+class Tariffs:
+    """Hôtels par ville, tarifs des types de chambre et prix des prestations par hôtel"""
+
+    def __init__(self, conn, generations=None):
+        self.generations = generations
+        self.villes = {}
+        self.par_ville = defaultdict(list)
+        for id_hotel, ville in conn.execute(SQL_HOTELS):
+            self.villes[id_hotel] = ville
+            self.par_ville[_normalize(ville)].append(id_hotel)
+        # Du moins cher au plus cher
+        self.types = {id_type: (nom, tarif) for id_type, nom, tarif in conn.execute(SQL_TYPES)}
+        self.prestations = defaultdict(dict)  # Id_Hotel -> {Id_Prestation: ligne}
+        self.par_nom = defaultdict(dict)      # Id_Hotel -> {nom normalisé: ligne la moins chère}
+        for id_prestation, nom, prix, id_hotel in conn.execute(SQL_PRESTATIONS):
+            ligne = {"Id_Prestation": id_prestation, "Nom": nom, "Prix": prix}
+            self.prestations[id_hotel][id_prestation] = ligne
+            self.par_nom[id_hotel].setdefault(_normalize(nom), ligne)
+
+    def hotels(self, ville=None, id_hotel=None):
+        if id_hotel is not None:
+            if int(id_hotel) not in self.villes:
+                raise BookingError(f"Hôtel {id_hotel} inconnu.")
+            return [int(id_hotel)]
+        if ville:
+            return self.par_ville.get(_normalize(ville), [])
+        return list(self.villes)
+
+    def extras(self, id_hotel, demandees):
+        """Prestations demandées (voir requested_extras) au prix de l'hôtel, ou None
+        s'il ne les propose pas toutes"""
+        lignes = []
+        for par_id, cle, quantite in demandees:
+            ligne = (self.prestations if par_id else self.par_nom)[id_hotel].get(cle)
+            if ligne is None:
+                return None
+            lignes.append({**ligne, "Quantite": quantite})
+        return lignes
+
+
+def requested_extras(prestations):
+    """{nom ou Id_Prestation: quantité} -> [(par identifiant, clé, quantité)], lu une fois par demande"""
+    demandees = []
+    for cle, quantite in (prestations or {}).items():
+        if int(quantite) <= 0:
+            continue
+        if isinstance(cle, int) or str(cle).isdigit():
+            demandees.append((True, int(cle), int(quantite)))
+        else:
+            demandees.append((False, _normalize(cle), int(quantite)))
+    return demandees
+
+
+class QuoteEngine:
+    """Devis calculés sur les tarifs en cache et l'index des disponibilités d'un BookingService"""
+
+    def __init__(self, service):
+        self.service = service
+        self._lock = threading.Lock()
+        self._tarifs = None
+
+    def tariffs(self, conn):
+        generations = QueryCache.generations(conn, TABLES)
+        with self._lock:
+            if self._tarifs is None or self._tarifs.generations != generations:
+                if self._tarifs is not None:
+                    # Chambre ajoutée ou changée d'hôtel/de type
+                    self.service.index.load_rooms(conn)
+                self._tarifs = Tariffs(conn, generations)
+            return self._tarifs
+
+    def quote(self, demande, limit=DEFAULT_LIMIT):
+        """Options les moins chères pour une demande ; lève BookingError si elle est invalide"""
+        with self.service.database.connection(readonly=True) as conn:
+            tarifs = self.tariffs(conn)
+            self.service.index.sync(conn)
+        return self._quote(tarifs, demande, limit)
+
+    def quote_batch(self, demandes, limit=DEFAULT_LIMIT):
+        """Une liste d'options par demande, ou {"erreur": message} pour une demande invalide ;
+        tarifs et disponibilités ne sont relus qu'une fois pour tout le lot"""
+        with self.service.database.connection(readonly=True) as conn:
+            tarifs = self.tariffs(conn)
+            self.service.index.sync(conn)
+        resultats = []
+        for demande in demandes:
+            try:
+                resultats.append(self._quote(tarifs, demande, limit))
+            except (BookingError, KeyError, TypeError, ValueError) as exc:
+                resultats.append({"erreur": str(exc) if isinstance(exc, BookingError) else f"demande invalide : {exc!r}"})
+        return resultats
+
+    def _quote(self, tarifs, demande, limit):
+        arrivee, depart = to_ordinal(_day(demande["Date_arrivee"])), to_ordinal(_day(demande["Date_depart"]))
+        nuits = depart - arrivee
+        if nuits < 1:
+            raise BookingError("La date de départ doit être après la date d'arrivée.")
+        nombre = int(demande.get("Chambres") or 1)
+        if nombre < 1:
+            raise BookingError("Au moins une chambre par devis.")
+        if demande.get("Id_Type") is not None:
+            if int(demande["Id_Type"]) not in tarifs.types:
+                raise BookingError(f"Type de chambre {demande['Id_Type']} inconnu.")
+            types = [int(demande["Id_Type"])]
+        else:
+            types = list(tarifs.types)
+        demandees = requested_extras(demande.get("Prestations"))
+
+        # Le prix ne dépend que de l'hôtel (prestations) et du type (tarif) :
+        # candidats classés par prix, disponibilités vérifiées dans cet ordre
+        # jusqu'à `limit` options
+        candidats = []
+        for id_hotel in tarifs.hotels(demande.get("Ville"), demande.get("Id_Hotel")):
+            extras = tarifs.extras(id_hotel, demandees)
+            if extras is None:
+                continue
+            montant_prestations = sum(ligne["Prix"] * ligne["Quantite"] for ligne in extras)
+            for id_type in types:
+                montant_chambres = nombre * nuits * tarifs.types[id_type][1]
+                candidats.append((montant_chambres + montant_prestations, id_hotel, id_type,
+                                  montant_chambres, montant_prestations, extras))
+        candidats.sort(key=lambda candidat: candidat[:3])
+
+        options = []
+        for total, id_hotel, id_type, montant_chambres, montant_prestations, extras in candidats:
+            # Index des disponibilités : départ inclus, comme pour une réservation
+            libres = self.service.index.free_rooms(arrivee, depart, id_hotel, id_type)
+            if len(libres) < nombre:
+                continue
+            nom, tarif = tarifs.types[id_type]
+            options.append({
+                "Id_Hotel": id_hotel, "Ville": tarifs.villes[id_hotel],
+                "Id_Type": id_type, "Type": nom, "Chambres": libres[:nombre], "Disponibles": len(libres),
+                "Nuits": nuits, "Tarif": tarif, "Montant_chambres": round(montant_chambres, 2),
+                "Prestations": extras, "Montant_prestations": round(montant_prestations, 2),
+                "Total": round(total, 2),
+            })
+            if len(options) == limit:
+                break
+        return options
+
+
+def main():
+    from database import Database
+    from service import BookingService
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"))
+    parser.add_argument("--requests", type=int, default=20000, help="demandes de devis tirées au hasard")
+    parser.add_argument("--batch", type=int, default=100, help="demandes par lot")
+    args = parser.parse_args()
+
+    database = Database(args.db, writers=1, readers=2)
+    engine = QuoteEngine(BookingService(database))
+    with database.connection(readonly=True) as conn:
+        tarifs = engine.tariffs(conn)
+    rng = random.Random(0)
+    villes = sorted({ville for ville in tarifs.villes.values()})
+    noms = sorted({ligne["Nom"] for lignes in tarifs.prestations.values() for ligne in lignes.values()})
+    demandes = []
+    for _ in range(args.requests):
+        arrivee = date.today() + timedelta(days=rng.randint(0, 180))
+        demande = {"Ville": rng.choice(villes), "Date_arrivee": arrivee,
+                   "Date_depart": arrivee + timedelta(days=rng.randint(1, 7))}
+        if noms and rng.random() < 0.5:
+            demande["Prestations"] = {rng.choice(noms): rng.randint(1, 3)}
+        demandes.append(demande)
+
+    debut = time.perf_counter()
+    for demande in demandes[:args.requests // 10]:
+        engine.quote(demande)
+    unitaire = (args.requests // 10) / (time.perf_counter() - debut)
+    debut = time.perf_counter()
+    options = 0
+    for i in range(0, len(demandes), args.batch):
+        options += sum(len(resultat) for resultat in engine.quote_batch(demandes[i:i + args.batch]))
+    par_lot = len(demandes) / (time.perf_counter() - debut)
+    print(f"{len(tarifs.villes)} hôtels, {len(villes)} villes : {unitaire:.0f} devis/s un par un, "
+          f"{par_lot:.0f} devis/s par lots de {args.batch} ({options / len(demandes):.1f} options par devis)")
+    database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+import re
+from collections import defaultdict
+
+# Accès aux données utilisé par main() : chaque relation d'une liste est
+# chargée par des requêtes IN (...) de CHUNK_SIZE identifiants puis regroupée
+# en Python, au lieu d'une requête par ligne affichée.
+
+# SQLite limite le nombre de paramètres liés par requête
+CHUNK_SIZE = 500
+
+
+def _chunks(ids, size=CHUNK_SIZE):
+    ids = list(dict.fromkeys(ids))
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def _marks(n):
+    return ", ".join("?" * n)
+
+
+def _grouped(conn, sql, ids, key):
+    """Exécute `sql` (qui contient {marks}) par paquets d'identifiants et regroupe selon `key`"""
+    groupes = defaultdict(list)
+    for paquet in _chunks(ids):
+        for row in conn.execute(sql.format(marks=_marks(len(paquet))), paquet):
+            groupes[row[key]].append(row)
+    return groupes
+
+
+def _page(conn, sql, conditions, params, cle, limit):
+    """Pagination par clé : retourne (lignes, curseur de la page suivante ou None).
+
+    `cle` liste les colonnes du ORDER BY ; le curseur est leur valeur sur la
+    dernière ligne et sert de borne à la requête suivante, sans OFFSET.
+    """
+    rows = conn.execute(sql.format(conditions=" AND ".join(conditions) or "1"),
+                        list(params) + [limit + 1]).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, tuple(rows[-1][col] for col in cle)
+
+
+def _match_prefix(texte):
+    """Requête FTS5 où chaque mot saisi est un préfixe, ou None si `texte` n'a aucun mot.
+
+    Les mots sont mis entre guillemets : la saisie n'est jamais interprétée
+    comme de la syntaxe FTS5 (OR, NOT, parenthèses...).
+    """
+    mots = re.findall(r"\w+", texte or "")
+    return " ".join(f'"{mot}"*' for mot in mots) or None
+
+
+# --- Tableau de bord ---
+
+# Lectures par clé primaire dans les tables de synthèse (voir aggregates.py)
+SQL_COUNT_CLIENTS = "SELECT Valeur FROM Stat_Compteur WHERE Nom = 'clients'"
+
+SQL_OCCUPATION_TODAY = "SELECT Reservations, Chambres FROM Stat_Occupation WHERE Jour = date('now')"
+
+SQL_HOTEL_RATINGS = '''
+    SELECT h.Ville,
+           CAST(s.Somme_notes AS REAL) / NULLIF(s.Nombre_evaluations, 0) as Note_moyenne,
+           COALESCE(s.Nombre_evaluations, 0) as Nombre_evaluations
+    FROM Hotel h
+    LEFT JOIN Stat_Hotel s ON h.Id_Hotel = s.Id_Hotel
+'''
+
+
+def count_clients(conn):
+    row = conn.execute(SQL_COUNT_CLIENTS).fetchone()
+    return row[0] if row else 0
+
+
+def occupation_today(conn):
+    """(réservations actives, chambres occupées) aujourd'hui"""
+    row = conn.execute(SQL_OCCUPATION_TODAY).fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def hotel_ratings(conn):
+    return conn.execute(SQL_HOTEL_RATINGS).fetchall()
+
+
+# --- Référentiels ---
+
+SQL_HOTELS = "SELECT Id_Hotel, Ville FROM Hotel"
+SQL_ROOM_TYPES = "SELECT Id_Type, Type FROM Type_Chambre"
+
+
+def hotels(conn):
+    return conn.execute(SQL_HOTELS).fetchall()
+
+
+def room_types(conn):
+    return conn.execute(SQL_ROOM_TYPES).fetchall()
+
+
+# --- Réservations ---
+
+SQL_RESERVATIONS = '''
+    SELECT r.Id_Reservation, r.Date_arrivee, r.Date_depart, r.Id_Client, c.Nom AS Client
+    FROM Reservation r
+    JOIN Client c ON r.Id_Client = c.Id_Client
+    ORDER BY r.Date_arrivee DESC, r.Id_Reservation DESC
+'''
+
+SQL_ROOMS_BY_RESERVATION = '''
+    SELECT rc.Id_Reservation, ch.Numero, ch.Etage, h.Id_Hotel, h.Ville
+    FROM Reservation_Chambre rc
+    JOIN Chambre ch ON rc.Numero_chambre = ch.Numero
+    JOIN Hotel h ON ch.Id_Hotel = h.Id_Hotel
+    WHERE rc.Id_Reservation IN ({marks})
+    ORDER BY rc.Id_Reservation, ch.Numero
+'''
+
+SQL_PRESTATIONS_BY_RESERVATION = '''
+    SELECT rp.Id_Reservation, p.Id_Prestation, p.Nom, p.Prix, rp.Quantite
+    FROM Reservation_Prestation rp
+    JOIN Prestation p ON rp.Id_Prestation = p.Id_Prestation
+    WHERE rp.Id_Reservation IN ({marks})
+'''
+
+
+def rooms_by_reservation(conn, reservation_ids):
+    return _grouped(conn, SQL_ROOMS_BY_RESERVATION, reservation_ids, "Id_Reservation")
+
+
+def prestations_by_reservation(conn, reservation_ids):
+    return _grouped(conn, SQL_PRESTATIONS_BY_RESERVATION, reservation_ids, "Id_Reservation")
+
+
+def attach_reservation_details(conn, reservations):
+    """Complète des lignes de Reservation avec leurs chambres, ville et prestations (2 requêtes)"""
+    ids = [res["Id_Reservation"] for res in reservations]
+    chambres = rooms_by_reservation(conn, ids)
+    prestations = prestations_by_reservation(conn, ids)
+    resultat = []
+    for res in reservations:
+        ligne = dict(res)
+        ligne_chambres = chambres.get(res["Id_Reservation"], [])
+        ligne_prestations = prestations.get(res["Id_Reservation"], [])
+        ligne["Chambres"] = [ch["Numero"] for ch in ligne_chambres]
+        ligne["Ville"] = ligne_chambres[0]["Ville"] if ligne_chambres else None
+        ligne["Prestations"] = [dict(p) for p in ligne_prestations]
+        ligne["Total_prestations"] = sum(p["Prix"] * p["Quantite"] for p in ligne_prestations)
+        resultat.append(ligne)
+    return resultat
+
+
+def list_reservations(conn):
+    """Réservations avec chambres et prestations, en 3 requêtes quel que soit leur nombre.
+
+    Charge toute la table : les pages passent par page_reservations ; seule la
+    charge de rapport de load_test.py s'en sert encore, volontairement.
+    """
+    return attach_reservation_details(conn, conn.execute(SQL_RESERVATIONS).fetchall())
+
+
+SQL_PAGE_RESERVATIONS = '''
+    SELECT r.Id_Reservation, r.Date_arrivee, r.Date_depart, r.Id_Client, c.Nom AS Client
+    FROM Reservation r
+    JOIN Client c ON r.Id_Client = c.Id_Client
+    WHERE {conditions}
+    ORDER BY r.Date_arrivee DESC, r.Id_Reservation DESC
+    LIMIT ?
+'''
+
+
+def page_reservations(conn, curseur=None, limit=50, client=None, date_min=None, date_max=None):
+    """Une page de réservations, des plus récentes aux plus anciennes"""
+    conditions, params = [], []
+    if curseur:
+        conditions.append("(r.Date_arrivee, r.Id_Reservation) < (?, ?)")
+        params.extend(curseur)
+    if client:
+        conditions.append("c.Nom LIKE ?")
+        params.append(f"%{client}%")
+    if date_min:
+        conditions.append("r.Date_arrivee >= ?")
+        params.append(str(date_min))
+    if date_max:
+        conditions.append("r.Date_arrivee <= ?")
+        params.append(str(date_max))
+    return _page(conn, SQL_PAGE_RESERVATIONS, conditions, params,
+                 ("Date_arrivee", "Id_Reservation"), limit)
+
+
+def insert_reservation(conn, date_arrivee, date_depart, client_id, chambres, prestations):
+    """Insère une réservation, ses chambres et ses prestations ({Id_Prestation: quantité})"""
+    id_reservation = conn.execute('''
+        INSERT INTO Reservation (Date_arrivee, Date_depart, Id_Client)
+        VALUES (?, ?, ?)
+    ''', (date_arrivee, date_depart, client_id)).lastrowid
+    conn.executemany('''
+        INSERT INTO Reservation_Chambre (Id_Reservation, Numero_chambre)
+        VALUES (?, ?)
+    ''', [(id_reservation, numero) for numero in chambres])
+    conn.executemany('''
+        INSERT INTO Reservation_Prestation (Id_Reservation, Id_Prestation, Quantite)
+        VALUES (?, ?, ?)
+    ''', [(id_reservation, presta_id, qty) for presta_id, qty in prestations.items()])
+    return id_reservation
+
+
+# --- Clients ---
+
+SQL_EVALUATIONS_BY_CLIENT = '''
+    SELECT e.Id_Client, e.Note, e.Commentaire, e.Date_evaluation, h.Ville
+    FROM Evaluation e
+    JOIN Hotel h ON e.Id_Hotel = h.Id_Hotel
+    WHERE e.Id_Client IN ({marks})
+    ORDER BY e.Date_evaluation DESC
+'''
+
+
+SQL_PAGE_CLIENTS = '''
+    SELECT * FROM Client
+    WHERE {conditions}
+    ORDER BY Nom, Id_Client
+    LIMIT ?
+'''
+
+# Saisie semi-automatique : clients les plus récents d'abord. FTS5 parcourt
+# ses résultats dans l'ordre des rowid et s'arrête à LIMIT, alors qu'un tri
+# par pertinence (rank) classerait tous les clients commençant par "a"
+SQL_SEARCH_CLIENTS = '''
+    SELECT c.Id_Client, c.Nom, c.Email, c.Ville
+    FROM Client_fts
+    JOIN Client c ON c.Id_Client = Client_fts.rowid
+    WHERE Client_fts MATCH ?
+    ORDER BY Client_fts.rowid DESC
+    LIMIT ?
+'''
+
+SQL_FIRST_CLIENTS = "SELECT Id_Client, Nom, Email, Ville FROM Client ORDER BY Nom, Id_Client LIMIT ?"
+
+
+def evaluations_by_client(conn, client_ids):
+    return _grouped(conn, SQL_EVALUATIONS_BY_CLIENT, client_ids, "Id_Client")
+
+
+def page_clients(conn, curseur=None, limit=50, recherche=None):
+    """Une page de clients par ordre alphabétique"""
+    conditions, params = [], []
+    if curseur:
+        conditions.append("(Nom, Id_Client) > (?, ?)")
+        params.extend(curseur)
+    requete = _match_prefix(recherche)
+    if requete:
+        conditions.append("Id_Client IN (SELECT rowid FROM Client_fts WHERE Client_fts MATCH ?)")
+        params.append(requete)
+    return _page(conn, SQL_PAGE_CLIENTS, conditions, params, ("Nom", "Id_Client"), limit)
+
+
+def search_clients(conn, texte, limit=20):
+    """Clients dont le nom, l'email, le téléphone ou la ville commencent par les mots saisis"""
+    requete = _match_prefix(texte)
+    if requete is None:
+        return conn.execute(SQL_FIRST_CLIENTS, (limit,)).fetchall()
+    return conn.execute(SQL_SEARCH_CLIENTS, (requete, limit)).fetchall()
+
+
+def insert_client(conn, nom, adresse, ville, cp, email, tel):
+    conn.execute('''
+    INSERT INTO Client (Nom, Adresse, Ville, Code_postal, Email, Telephone)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', (nom, adresse, ville, cp, email, tel))
+
+
+# --- Chambres ---
+
+SQL_ROOMS = '''
+    SELECT c.Numero, c.Etage, tc.Type, tc.Tarif, h.Ville, c.Fumeur, c.Id_Hotel
+    FROM Chambre c
+    JOIN Type_Chambre tc ON c.Id_Type = tc.Id_Type
+    JOIN Hotel h ON c.Id_Hotel = h.Id_Hotel
+    ORDER BY c.Etage, c.Numero
+'''
+
+
+def list_rooms(conn):
+    """Toutes les chambres de la chaîne, sans pagination : table de référence bornée par
+    l'inventaire des hôtels (quelques milliers de lignes), lue une fois par BookingService"""
+    return conn.execute(SQL_ROOMS).fetchall()
+
+
+SQL_ROOMS_BY_HOTEL = '''
+    SELECT c.Numero, c.Etage, tc.Type
+    FROM Chambre c
+    JOIN Type_Chambre tc ON c.Id_Type = tc.Id_Type
+    WHERE c.Id_Hotel = ?
+    ORDER BY c.Etage, c.Numero
+'''
+
+# Séjours d'un hôtel qui touchent la période (bornes incluses)
+# Vues Historique_* : un mois passé reste affiché une fois ses séjours archivés
+SQL_STAYS_BY_HOTEL = '''
+    SELECT rc.Numero_chambre, r.Date_arrivee, r.Date_depart
+    FROM Chambre c
+    JOIN Historique_Reservation_Chambre rc ON rc.Numero_chambre = c.Numero
+    JOIN Historique_Reservation r ON r.Id_Reservation = rc.Id_Reservation
+    WHERE c.Id_Hotel = ? AND r.Date_arrivee <= ? AND r.Date_depart >= ?
+'''
+
+
+def rooms_by_hotel(conn, hotel_id):
+    return conn.execute(SQL_ROOMS_BY_HOTEL, (hotel_id,)).fetchall()
+
+
+def stays_by_hotel(conn, hotel_id, date_debut, date_fin):
+    return conn.execute(SQL_STAYS_BY_HOTEL, (hotel_id, str(date_fin), str(date_debut))).fetchall()
+
+
+# --- Prestations ---
+
+SQL_PRESTATIONS_BY_HOTEL = '''
+    SELECT * FROM Prestation
+    WHERE Id_Hotel IN ({marks})
+'''
+
+SQL_PRESTATION_USAGE = '''
+    SELECT Id_Prestation, COUNT(*) as Nb_utilisations, SUM(Quantite) as Total_quantite
+    FROM Reservation_Prestation
+    WHERE Id_Prestation IN ({marks})
+    GROUP BY Id_Prestation
+'''
+
+
+SQL_PAGE_PRESTATIONS = '''
+    SELECT p.*, h.Ville
+    FROM Prestation p
+    JOIN Hotel h ON p.Id_Hotel = h.Id_Hotel
+    WHERE {conditions}
+    ORDER BY h.Ville, p.Nom, p.Id_Prestation
+    LIMIT ?
+'''
+
+
+def prestations_by_hotel(conn, hotel_ids):
+    return _grouped(conn, SQL_PRESTATIONS_BY_HOTEL, hotel_ids, "Id_Hotel")
+
+
+def prestation_usage(conn, prestation_ids):
+    """{Id_Prestation: (nombre d'utilisations, quantité totale)} ; absent si jamais utilisée"""
+    usage = {}
+    for paquet in _chunks(prestation_ids):
+        for row in conn.execute(SQL_PRESTATION_USAGE.format(marks=_marks(len(paquet))), paquet):
+            usage[row["Id_Prestation"]] = (row["Nb_utilisations"], row["Total_quantite"])
+    return usage
+
+
+def page_prestations(conn, curseur=None, limit=50, hotel_id=None):
+    """Une page de prestations triées par ville puis nom"""
+    conditions, params = [], []
+    if curseur:
+        conditions.append("(h.Ville, p.Nom, p.Id_Prestation) > (?, ?, ?)")
+        params.extend(curseur)
+    if hotel_id:
+        conditions.append("p.Id_Hotel = ?")
+        params.append(hotel_id)
+    return _page(conn, SQL_PAGE_PRESTATIONS, conditions, params,
+                 ("Ville", "Nom", "Id_Prestation"), limit)
+
+
+def insert_prestation(conn, nom, description, prix, hotel_id):
+    conn.execute('''
+        INSERT INTO Prestation (Nom, Description, Prix, Id_Hotel)
+        VALUES (?, ?, ?, ?)
+    ''', (nom, description, prix, hotel_id))
+
+
+# --- Évaluations ---
+
+SQL_PAGE_EVALUATIONS = '''
+    SELECT e.*, c.Nom as Client, h.Ville
+    FROM Evaluation e
+    JOIN Client c ON e.Id_Client = c.Id_Client
+    JOIN Hotel h ON e.Id_Hotel = h.Id_Hotel
+    WHERE {conditions}
+    ORDER BY COALESCE(e.Date_evaluation, '') DESC, e.Id_Evaluation DESC
+    LIMIT ?
+'''
+
+
+def page_evaluations(conn, curseur=None, limit=50, hotel_id=None, note_min=None, recherche=None):
+    """Une page d'évaluations, des plus récentes aux plus anciennes (sans date en dernier)"""
+    conditions, params = [], []
+    if curseur:
+        # Date du curseur None pour une évaluation sans date ; la première
+        # borne, sur l'expression seule, permet la recherche dans l'index
+        date_cle = curseur[0] or ""
+        conditions.append("COALESCE(e.Date_evaluation, '') <= ? AND "
+                          "(COALESCE(e.Date_evaluation, ''), e.Id_Evaluation) < (?, ?)")
+        params.extend((date_cle, date_cle, curseur[1]))
+    if hotel_id:
+        conditions.append("e.Id_Hotel = ?")
+        params.append(hotel_id)
+    if note_min:
+        conditions.append("e.Note >= ?")
+        params.append(note_min)
+    requete = _match_prefix(recherche)
+    if requete:
+        conditions.append("e.Id_Evaluation IN (SELECT rowid FROM Evaluation_fts WHERE Evaluation_fts MATCH ?)")
+        params.append(requete)
+    return _page(conn, SQL_PAGE_EVALUATIONS, conditions, params,
+                 ("Date_evaluation", "Id_Evaluation"), limit)
+
+
+def insert_evaluation(conn, note, commentaire, client_id, hotel_id):
+    conn.execute('''
+        INSERT INTO Evaluation (Note, Commentaire, Id_Client, Id_Hotel)
+        VALUES (?, ?, ?, ?)
+    ''', (note, commentaire, client_id, hotel_id))
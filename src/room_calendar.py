@@ -0,0 +1,77 @@
+"""Calendrier d'occupation d'un hôtel : une ligne par chambre, une colonne par jour.
+
+Comme la recherche de disponibilités, une chambre est occupée le jour J si
+Date_arrivee <= J <= Date_depart. La grille est calculée en une passe sur les
+séjours de la période avec un tableau de différences (+1 le premier jour, -1
+le lendemain du dernier, puis somme cumulée).
+"""
+from datetime import date
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from availability import to_ordinal
+
+
+def occupancy_grid(numeros, sejours, date_debut, jours):
+    """Matrice booléenne (chambres × jours), True si la chambre est occupée.
+
+    `numeros` donne l'ordre des lignes ; `sejours` contient des lignes
+    (Numero_chambre, Date_arrivee, Date_depart).
+    """
+    numeros = np.asarray(numeros, dtype=np.int64)
+    if not len(sejours) or not len(numeros):
+        return np.zeros((len(numeros), jours), dtype=bool)
+    chambres, arrivees, departs = zip(*sejours)
+    chambres = np.array(chambres, dtype=np.int64)
+    debut = to_ordinal(date_debut)
+    arrivees = np.array(arrivees, dtype="datetime64[D]").astype(np.int64) + date(1970, 1, 1).toordinal()
+    departs = np.array(departs, dtype="datetime64[D]").astype(np.int64) + date(1970, 1, 1).toordinal()
+
+    # Ligne de chaque séjour dans l'ordre d'affichage des chambres
+    tri = np.argsort(numeros)
+    pos = np.minimum(np.searchsorted(numeros[tri], chambres), len(numeros) - 1)
+    connus = numeros[tri][pos] == chambres
+    lignes = tri[pos][connus]
+    premiers = np.clip(arrivees[connus] - debut, 0, jours)
+    lendemains = np.clip(departs[connus] - debut + 1, 0, jours)
+
+    differences = np.zeros((len(numeros), jours + 1), dtype=np.int32)
+    np.add.at(differences, (lignes, premiers), 1)
+    np.add.at(differences, (lignes, lendemains), -1)
+    return np.cumsum(differences, axis=1)[:, :jours] > 0
+
+
+def runs(grille):
+    """Plages de jours consécutifs de même état : (ligne, premier jour, lendemain du dernier, occupé)"""
+    n, jours = grille.shape
+    bords = np.ones((n, jours + 1), dtype=bool)
+    bords[:, 1:jours] = grille[:, 1:] != grille[:, :-1]
+    lignes, colonnes = np.nonzero(bords)
+    # Deux bords successifs d'une même ligne délimitent une plage
+    meme_ligne = lignes[1:] == lignes[:-1]
+    lignes, premiers, lendemains = lignes[:-1][meme_ligne], colonnes[:-1][meme_ligne], colonnes[1:][meme_ligne]
+    return lignes, premiers, lendemains, grille[lignes, premiers]
+
+
+def heatmap(chambres, grille, date_debut):
+    """Graphique Altair : une barre par plage libre ou occupée plutôt qu'un rectangle par case"""
+    lignes, premiers, lendemains, occupees = runs(grille)
+    debut = np.datetime64(date.fromordinal(to_ordinal(date_debut)), "D")
+    chambres = np.asarray(chambres).astype(str)
+    plages = pd.DataFrame({
+        "Chambre": chambres[lignes],
+        "Du": debut + premiers,
+        "Au": debut + lendemains,
+        "Jusqu'au": debut + lendemains - 1,
+        "Statut": np.where(occupees, "Occupée", "Libre"),
+    })
+    return alt.Chart(plages).mark_rect().encode(
+        x=alt.X("Du:T", title=None, axis=alt.Axis(format="%d/%m")),
+        x2="Au:T",
+        y=alt.Y("Chambre:N", sort=chambres.tolist(), title="Chambre", axis=alt.Axis(labelOverlap=True)),
+        color=alt.Color("Statut:N", scale=alt.Scale(domain=["Libre", "Occupée"],
+                                                    range=["#c7e9c0", "#de2d26"])),
+        tooltip=["Chambre:N", "Du:T", "Jusqu'au:T", "Statut:N"],
+    ).properties(height=min(max(14 * len(chambres), 120), 2000))
@@ -0,0 +1,206 @@
+import random
+import sqlite3
+import time
+from datetime import date
+
+import allocation
+import repository
+from availability import AvailabilityIndex, to_ordinal
+from migrations import OVERLAP_MESSAGE
+
+# Logique métier de réservation, indépendante de l'interface : utilisée par
+# l'application Streamlit et par le serveur HTTP (api.py).
+
+
+class BookingError(ValueError):
+    """Demande refusée (dates incohérentes, chambre déjà prise, client inconnu...)"""
+
+
+class RoomUnavailable(BookingError):
+    """Une des chambres demandées est déjà réservée sur la période"""
+
+
+class BookingBusy(BookingError):
+    """Verrou d'écriture indisponible malgré les nouvelles tentatives"""
+
+
+# Nouvelles tentatives quand un autre écrivain garde le verrou au-delà de
+# busy_timeout, avec une attente croissante et aléatoire entre deux essais
+BOOKING_RETRIES = 3
+RETRY_DELAY = 0.05
+
+
+def _iso(jour):
+    return jour.isoformat() if isinstance(jour, date) else str(jour)[:10]
+
+
+class BookingService:
+    def __init__(self, database, index=None):
+        self.database = database
+        with database.connection(readonly=True) as conn:
+            self.index = index or AvailabilityIndex.build(conn)
+            # Détails de toutes les chambres, relus seulement pour une chambre inconnue
+            # (voir _room) : la liste complète est voulue, comme pour l'index
+            self._chambres = {row["Numero"]: dict(row) for row in repository.list_rooms(conn)}
+
+    def _room(self, numero):
+        """Détails d'une chambre (Etage, Type, Tarif, Ville, Fumeur, Id_Hotel)"""
+        chambre = self._chambres.get(numero)
+        if chambre is None:
+            with self.database.connection(readonly=True) as conn:
+                self._chambres = {row["Numero"]: dict(row) for row in repository.list_rooms(conn)}
+                self.index.load_rooms(conn)
+            chambre = self._chambres.get(numero)
+        return chambre
+
+    def search_availability(self, date_debut, date_fin, id_hotel=None, id_type=None):
+        """Chambres libres sur la période, triées par étage puis numéro"""
+        if to_ordinal(date_debut) > to_ordinal(date_fin):
+            raise BookingError("La date de départ doit être après la date d'arrivée.")
+        with self.database.connection(readonly=True) as conn:
+            self.index.sync(conn)
+        return [self._room(numero) for numero in
+                self.index.free_rooms(date_debut, date_fin, id_hotel, id_type)]
+
+    def allocate_rooms(self, id_hotel, id_type, date_arrivee, date_depart, nombre=1, fumeur=None, etage=None):
+        """Numéros de `nombre` chambres libres choisies au meilleur ajustement (allocation.py),
+        selon les préférences Fumeur (imposée) et Etage (souhaité)"""
+        if to_ordinal(date_arrivee) >= to_ordinal(date_depart):
+            raise BookingError("La date de départ doit être après la date d'arrivée.")
+        libres = self.search_availability(date_arrivee, date_depart, id_hotel, id_type)
+        sejours = [{"Date_arrivee": date_arrivee, "Date_depart": date_depart, "Fumeur": fumeur, "Etage": etage}] * nombre
+        attribution = allocation.allocate(libres, self.index.schedules(c["Numero"] for c in libres), sejours)
+        if None in attribution:
+            raise RoomUnavailable(f"Seulement {nombre - attribution.count(None)} chambre(s) libre(s) "
+                                  f"correspondant à la demande sur ces dates.")
+        return attribution
+
+    def reoptimize(self, id_hotel, id_type, depuis=None, apply=True):
+        """Réattribue au meilleur ajustement les séjours à venir d'un hôtel et d'un type
+        (allocation.py) ; retourne le plan, enregistré si `apply`"""
+        depuis = depuis or date.today()
+        if not apply:
+            with self.database.connection(readonly=True) as conn:
+                return allocation.plan_reoptimization(conn, id_hotel, id_type, depuis)
+        try:
+            with self.database.connection() as conn:
+                # Plan calculé sous le verrou d'écriture : aucune réservation ne
+                # peut s'intercaler entre la lecture et les déplacements
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    plan = allocation.plan_reoptimization(conn, id_hotel, id_type, depuis)
+                    allocation.apply_moves(conn, plan["deplacements"])
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                # Liaisons supprimées (Journal_Index) puis réinsérées : seules les
+                # chambres déplacées sont recalculées, ici et dans les autres processus
+                if plan["deplacements"]:
+                    self.index.sync(conn)
+        except sqlite3.OperationalError as exc:
+            if "locked" not in str(exc) and "busy" not in str(exc):
+                raise
+            raise BookingBusy("Base de données occupée, veuillez réessayer.") from exc
+        return plan
+
+    def create_reservation(self, client_id, date_arrivee, date_depart, chambres, prestations=None,
+                           id_hotel=None, retries=BOOKING_RETRIES):
+        """Réserve une ou plusieurs chambres d'un même hôtel (`id_hotel` s'il est donné),
+        avec leurs prestations, en une seule transaction ; retourne l'identifiant de la réservation"""
+        if to_ordinal(date_arrivee) >= to_ordinal(date_depart):
+            raise BookingError("La date de départ doit être après la date d'arrivée.")
+        chambres = list(dict.fromkeys(chambres))
+        if not chambres:
+            raise BookingError("Aucune chambre choisie.")
+        hotels = set()
+        for numero in chambres:
+            chambre = self._room(numero)
+            if chambre is None:
+                raise BookingError(f"Chambre {numero} inconnue.")
+            hotels.add(chambre["Id_Hotel"])
+        if len(hotels) > 1:
+            raise BookingError("Les chambres d'une réservation doivent appartenir au même hôtel.")
+        if id_hotel is not None and hotels != {int(id_hotel)}:
+            raise BookingError(f"Les chambres demandées n'appartiennent pas à l'hôtel {id_hotel}.")
+        id_hotel = hotels.pop()
+        prestations = {k: v for k, v in (prestations or {}).items() if v > 0}
+
+        for tentative in range(retries + 1):
+            try:
+                with self.database.connection() as conn:
+                    return self._book(conn, client_id, date_arrivee, date_depart, chambres,
+                                      id_hotel, prestations)
+            except sqlite3.OperationalError as exc:
+                # Verrou d'écriture toujours pris après busy_timeout
+                if "locked" not in str(exc) and "busy" not in str(exc):
+                    raise
+                if tentative == retries:
+                    raise BookingBusy("Base de données occupée, veuillez réessayer.") from exc
+                time.sleep(RETRY_DELAY * 2 ** tentative * random.random())
+
+    def _book(self, conn, client_id, date_arrivee, date_depart, chambres, id_hotel, prestations):
+        # Rattrapage de l'index avant le verrou (construction ou relecture
+        # éventuelle comprises) : sous le verrou ne restent que les quelques
+        # écritures intercalées
+        self.index.sync(conn)
+        # BEGIN IMMEDIATE prend le verrou d'écriture avant toute lecture : entre
+        # la vérification et le COMMIT, aucun autre guichet ne peut réserver
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.index.sync(conn)
+            occupees = [n for n in chambres if not self.index.is_free(n, date_arrivee, date_depart)]
+            if occupees:
+                raise RoomUnavailable(f"Chambre(s) déjà réservée(s) : {', '.join(map(str, occupees))}")
+            if conn.execute("SELECT 1 FROM Client WHERE Id_Client = ?", (client_id,)).fetchone() is None:
+                raise BookingError(f"Client {client_id} inconnu.")
+            if prestations:
+                proposees = {presta["Id_Prestation"] for presta in
+                             repository.prestations_by_hotel(conn, [id_hotel]).get(id_hotel, [])}
+                inconnues = sorted(set(prestations) - proposees)
+                if inconnues:
+                    raise BookingError(f"Prestation(s) non proposée(s) par l'hôtel : "
+                                       f"{', '.join(map(str, inconnues))}")
+            try:
+                id_reservation = repository.insert_reservation(
+                    conn, _iso(date_arrivee), _iso(date_depart), client_id, chambres, prestations)
+            except sqlite3.IntegrityError as exc:
+                # Les triggers de la base refusent le chevauchement même si l'index l'a manqué
+                if OVERLAP_MESSAGE in str(exc):
+                    raise RoomUnavailable(str(exc)) from None
+                raise BookingError(str(exc)) from None
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        self.index.sync(conn)
+        return id_reservation
+
+    def list_reservations(self, curseur=None, limit=50, client=None, date_min=None, date_max=None,
+                          details=False):
+        """Une page de réservations ; `details` ajoute chambres, ville et prestations"""
+        with self.database.connection(readonly=True) as conn:
+            rows, suivant = repository.page_reservations(conn, curseur, limit, client, date_min, date_max)
+            if details:
+                rows = repository.attach_reservation_details(conn, rows)
+            else:
+                rows = [dict(row) for row in rows]
+        return rows, suivant
+
+    def reservation_details(self, reservation):
+        with self.database.connection(readonly=True) as conn:
+            return repository.attach_reservation_details(conn, [reservation])[0]
+
+    def add_client(self, nom, adresse, ville, cp, email, tel):
+        if not (nom and adresse and ville and email and tel):
+            raise BookingError("Veuillez remplir tous les champs obligatoires (*)")
+        with self.database.connection() as conn:
+            repository.insert_client(conn, nom, adresse, ville, cp, email, tel)
+            conn.commit()
+
+    def add_evaluation(self, note, commentaire, client_id, hotel_id):
+        if not 1 <= int(note) <= 5:
+            raise BookingError("La note doit être comprise entre 1 et 5.")
+        with self.database.connection() as conn:
+            repository.insert_evaluation(conn, note, commentaire, client_id, hotel_id)
+            conn.commit()
@@ -0,0 +1,401 @@
+"""Répartition de la base par hôtel (mode optionnel) : un fichier SQLite par
+hôtel et un catalogue partagé.
+
+    python src/sharding.py split [--db data/hotel.db] [--shards data/shards]
+    python src/sharding.py stats [--shards data/shards]
+    python src/api.py --shards data/shards
+
+catalogue.db est la référence des hôtels, des types de chambre et des clients
+(création, recherche plein texte). hotel_<Id_Hotel>.db contient les chambres,
+réservations, prestations et évaluations de l'hôtel : numéros de chambre et
+identifiants de réservation n'y sont uniques que pour cet hôtel, et deux
+hôtels écrivent sans partager de verrou.
+
+Les clés étrangères et les triggers SQLite ne franchissent pas les fichiers :
+chaque hôtel garde une copie de sa ligne Hotel, des types de chambre et des
+clients qui y ont réservé ou laissé un avis, copiés à leur première écriture.
+"""
+import argparse
+import heapq
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import aggregates
+import repository
+from archive import ARCHIVED_TABLES, archive_path
+from database import Database, connect
+from migrations import (AGGREGATE_TRIGGERS, GENERATION_TRIGGERS, OVERLAP_TRIGGERS, SEARCH_INDEXES,
+                        SEARCH_TRIGGERS, migrate)
+from service import BOOKING_RETRIES, BookingError, BookingService
+
+CATALOGUE = "catalogue.db"
+_FICHIER_HOTEL = re.compile(r"^hotel_(\d+)\.db$")
+
+# Threads des requêtes sur toute la chaîne : SQLite libère le GIL pendant
+# l'exécution d'une requête, les bases d'hôtel sont donc lues en parallèle sur
+# plusieurs cœurs ; sur un seul cœur les appels restent dans le thread appelant
+FAN_OUT_WORKERS = min(8, os.cpu_count() or 1)
+# Connexions en lecture par hôtel. Chaque base d'hôtel ouverte garde une
+# dizaine de descripteurs de fichier (base, WAL et archive de chaque
+# connexion) : `ulimit -n` à ajuster au nombre d'hôtels
+SHARD_READERS = 2
+
+# Plus grand identifiant SQLite : borne de curseur "tout ce jour-là"
+_ID_MAX = 2 ** 63 - 1
+
+# Tables de données, les parents d'abord
+_TABLES = ["Hotel", "Type_Chambre", "Client", "Chambre", "Prestation",
+           "Reservation", "Reservation_Chambre", "Reservation_Prestation", "Evaluation"]
+
+# Lignes copiées depuis la base d'origine, attachée sous le nom `source`,
+# table par table dans l'ordre des clés étrangères
+COPIES_CATALOGUE = {
+    "Hotel": "SELECT * FROM source.Hotel",
+    "Type_Chambre": "SELECT * FROM source.Type_Chambre",
+    "Client": "SELECT * FROM source.Client",
+}
+
+_RESERVATIONS_HOTEL = '''
+    SELECT rc.Id_Reservation FROM source.Reservation_Chambre rc
+    JOIN source.Chambre c ON c.Numero = rc.Numero_chambre
+    WHERE c.Id_Hotel = :hotel'''
+
+COPIES_HOTEL = {
+    "Hotel": "SELECT * FROM source.Hotel WHERE Id_Hotel = :hotel",
+    "Type_Chambre": "SELECT * FROM source.Type_Chambre",
+    "Client": f'''SELECT * FROM source.Client WHERE Id_Client IN (
+        SELECT Id_Client FROM source.Reservation WHERE Id_Reservation IN ({_RESERVATIONS_HOTEL})
+        UNION SELECT Id_Client FROM source.Evaluation WHERE Id_Hotel = :hotel)''',
+    "Chambre": "SELECT * FROM source.Chambre WHERE Id_Hotel = :hotel",
+    "Prestation": "SELECT * FROM source.Prestation WHERE Id_Hotel = :hotel",
+    "Reservation": f"SELECT * FROM source.Reservation WHERE Id_Reservation IN ({_RESERVATIONS_HOTEL})",
+    # Ordre des rowid conservé : l'index des disponibilités lit les liaisons dans cet ordre
+    "Reservation_Chambre": '''SELECT rc.* FROM source.Reservation_Chambre rc
+        JOIN main.Chambre c ON c.Numero = rc.Numero_chambre ORDER BY rc.rowid''',
+    "Reservation_Prestation": '''SELECT * FROM source.Reservation_Prestation
+        WHERE Id_Reservation IN (SELECT Id_Reservation FROM main.Reservation)''',
+    "Evaluation": "SELECT * FROM source.Evaluation WHERE Id_Hotel = :hotel",
+}
+
+# Réservations archivées (archive.py) de l'hôtel, depuis l'archive `source_archive`
+COPIES_ARCHIVE = {
+    "Reservation": '''WHERE Id_Reservation IN (SELECT Id_Reservation FROM source_archive.Reservation_Chambre
+        WHERE Numero_chambre IN (SELECT Numero FROM main.Chambre))''',
+    "Reservation_Chambre": "WHERE Numero_chambre IN (SELECT Numero FROM main.Chambre)",
+    "Reservation_Prestation": "WHERE Id_Reservation IN (SELECT Id_Reservation FROM archive.Reservation)",
+}
+
+SQL_CLIENT = "SELECT * FROM Client WHERE Id_Client = ?"
+
+
+def shard_path(directory, id_hotel):
+    return os.path.join(directory, f"hotel_{id_hotel}.db")
+
+
+def list_shards(directory):
+    """{Id_Hotel: chemin} des bases d'hôtel de `directory`"""
+    shards = {}
+    for nom in os.listdir(directory):
+        match = _FICHIER_HOTEL.match(nom)
+        if match:
+            shards[int(match.group(1))] = os.path.join(directory, nom)
+    return dict(sorted(shards.items()))
+
+
+def _cle_reservation(row):
+    """Ordre des réservations de la chaîne, et curseur de pagination"""
+    return row["Date_arrivee"], row["Id_Hotel"], row["Id_Reservation"]
+
+
+def _fill(path, source, copies, hotel=None):
+    """Crée la base `path` (schéma complet, sans le jeu d'exemple) et y copie les lignes de `source`"""
+    conn = connect(path)
+    conn.isolation_level = None
+    try:
+        migrate(conn)
+        conn.execute("ATTACH DATABASE ? AS source", (source,))
+        if hotel is not None and os.path.exists(archive_path(source)):
+            conn.execute("ATTACH DATABASE ? AS source_archive", (archive_path(source),))
+            archivees = True
+        else:
+            archivees = False
+        # Comme generate_data.fill : synthèses, index plein texte et
+        # générations recalculés une fois après la copie
+        triggers = {**AGGREGATE_TRIGGERS, **OVERLAP_TRIGGERS, **GENERATION_TRIGGERS, **SEARCH_TRIGGERS}
+        conn.execute("BEGIN")
+        for nom in triggers:
+            conn.execute(f"DROP TRIGGER IF EXISTS {nom}")
+        # Jeu d'exemple inséré par la première migration
+        for table in reversed(_TABLES):
+            conn.execute(f"DELETE FROM {table}")
+        for table, requete in copies.items():
+            conn.execute(f"INSERT INTO {table} {requete}", {"hotel": hotel})
+        if archivees:
+            for table, filtre in COPIES_ARCHIVE.items():
+                colonnes = ARCHIVED_TABLES[table]
+                conn.execute(f"INSERT INTO archive.{table} ({colonnes}) "
+                             f"SELECT {colonnes} FROM source_archive.{table} {filtre}")
+        for instruction in triggers.values():
+            conn.execute(instruction)
+        conn.execute("UPDATE Generation_Table SET Generation = Generation + 1")
+        for table in SEARCH_INDEXES:
+            conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        aggregates.rebuild(conn)
+        conn.execute("DETACH DATABASE source")
+        if archivees:
+            conn.execute("DETACH DATABASE source_archive")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def split(source, directory, workers=FAN_OUT_WORKERS):
+    """Répartit la base `source` en un catalogue et une base par hôtel ; retourne {Id_Hotel: chemin}"""
+    if os.path.exists(os.path.join(directory, CATALOGUE)):
+        raise FileExistsError(f"{directory} contient déjà une base répartie")
+    os.makedirs(directory, exist_ok=True)
+    conn = connect(source, readonly=True)
+    try:
+        hotels = [row[0] for row in conn.execute("SELECT Id_Hotel FROM Hotel ORDER BY Id_Hotel")]
+    finally:
+        conn.close()
+
+    _fill(os.path.join(directory, CATALOGUE), source, COPIES_CATALOGUE)
+    chemins = {id_hotel: shard_path(directory, id_hotel) for id_hotel in hotels}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda id_hotel: _fill(chemins[id_hotel], source, COPIES_HOTEL, id_hotel), hotels))
+    return chemins
+
+
+class ShardRouter:
+    """Aiguille chaque opération vers la base de son hôtel ; les lectures sur
+    toute la chaîne sont faites en parallèle dans chaque base puis fusionnées.
+
+    Offre les méthodes de BookingService utilisées par api.py. Un
+    identifiant de réservation n'est unique que dans son hôtel : les lignes
+    retournées portent Id_Hotel.
+    """
+
+    def __init__(self, directory, workers=FAN_OUT_WORKERS, readers=SHARD_READERS):
+        self.directory = directory
+        self.workers = workers
+        chemins = list_shards(directory)
+        if not chemins:
+            raise FileNotFoundError(f"Aucune base d'hôtel dans {directory}")
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard")
+        self.catalogue = Database(os.path.join(directory, CATALOGUE), writers=1, readers=readers)
+        # Création des clients, dans le catalogue
+        self.clients = BookingService(self.catalogue)
+        self.shards = dict(zip(chemins, self.executor.map(
+            lambda chemin: Database(chemin, writers=1, readers=readers), chemins.values())))
+        self.services = dict(zip(self.shards, self.executor.map(BookingService, self.shards.values())))
+        self._proprietaires = {}
+        self._load_room_owners()
+
+    def _parallel(self, appel, hotels):
+        hotels = list(hotels)
+        if self.workers == 1:
+            return {id_hotel: appel(id_hotel) for id_hotel in hotels}
+        return dict(zip(hotels, self.executor.map(appel, hotels)))
+
+    def fan_out(self, fonction, *args, hotels=None, readonly=True):
+        """Exécute fonction(conn, *args) dans chaque base d'hôtel en parallèle ; retourne {Id_Hotel: résultat}"""
+        def appel(id_hotel):
+            with self.shard(id_hotel).connection(readonly) as conn:
+                return fonction(conn, *args)
+        return self._parallel(appel, self.shards if hotels is None else hotels)
+
+    def shard(self, id_hotel):
+        try:
+            return self.shards[int(id_hotel)]
+        except (KeyError, TypeError, ValueError):
+            raise BookingError(f"Hôtel {id_hotel} inconnu.") from None
+
+    def _service(self, id_hotel):
+        self.shard(id_hotel)
+        return self.services[int(id_hotel)]
+
+    def _load_room_owners(self):
+        proprietaires = defaultdict(set)
+        numeros = self.fan_out(lambda conn: [row[0] for row in conn.execute("SELECT Numero FROM Chambre")])
+        for id_hotel, chambres in numeros.items():
+            for numero in chambres:
+                proprietaires[numero].add(id_hotel)
+        self._proprietaires = proprietaires
+
+    def _hotel_of(self, chambres):
+        """Seul hôtel possédant toutes les chambres `chambres`"""
+        for essai in range(2):
+            if essai:
+                # Chambre ajoutée depuis le démarrage
+                self._load_room_owners()
+            candidats = set(self.shards)
+            for numero in chambres:
+                candidats &= self._proprietaires.get(numero, set())
+            if len(candidats) == 1:
+                return candidats.pop()
+            if candidats:
+                raise BookingError("Numéros de chambre présents dans plusieurs hôtels : préciser l'hôtel.")
+        raise BookingError("Aucun hôtel ne possède toutes les chambres demandées.")
+
+    def _copy_client(self, id_hotel, client_id):
+        """Copie le client du catalogue dans la base de l'hôtel s'il n'y est pas encore"""
+        database = self.shard(id_hotel)
+        with database.connection(readonly=True) as conn:
+            if conn.execute(SQL_CLIENT, (client_id,)).fetchone() is not None:
+                return
+        with self.catalogue.connection(readonly=True) as conn:
+            client = conn.execute(SQL_CLIENT, (client_id,)).fetchone()
+        if client is None:
+            raise BookingError(f"Client {client_id} inconnu.")
+        with database.connection() as conn:
+            conn.execute(f"INSERT OR IGNORE INTO Client ({', '.join(client.keys())}) "
+                         f"VALUES ({', '.join('?' * len(client))})", tuple(client))
+            conn.commit()
+
+    def search_availability(self, date_debut, date_fin, id_hotel=None, id_type=None):
+        """Chambres libres d'un hôtel ou de toute la chaîne, triées par étage, numéro puis hôtel"""
+        if id_hotel is None:
+            hotels = list(self.shards)
+        else:
+            self.shard(id_hotel)
+            hotels = [int(id_hotel)]
+        libres = self._parallel(
+            lambda h: self.services[h].search_availability(date_debut, date_fin, None, id_type), hotels)
+        return list(heapq.merge(*libres.values(), key=lambda ch: (ch["Etage"], ch["Numero"], ch["Id_Hotel"])))
+
+    def create_reservation(self, client_id, date_arrivee, date_depart, chambres, prestations=None,
+                           id_hotel=None, retries=BOOKING_RETRIES):
+        """Réserve dans la base de l'hôtel `id_hotel` ; sans lui, dans celle du seul
+        hôtel qui possède toutes les chambres demandées. Retourne l'identifiant
+        de la réservation dans cet hôtel."""
+        chambres = list(dict.fromkeys(chambres))
+        if not chambres:
+            raise BookingError("Aucune chambre choisie.")
+        if id_hotel is None:
+            id_hotel = self._hotel_of(chambres)
+        service = self._service(id_hotel)
+        self._copy_client(id_hotel, client_id)
+        return service.create_reservation(client_id, date_arrivee, date_depart, chambres, prestations,
+                                          id_hotel, retries)
+
+    def list_reservations(self, curseur=None, limit=50, client=None, date_min=None, date_max=None,
+                          details=False):
+        """Une page de réservations de toute la chaîne, des plus récentes aux plus anciennes.
+
+        Le curseur (Date_arrivee, Id_Hotel, Id_Reservation) devient dans
+        chaque hôtel une borne de sa propre pagination par clé ; chaque hôtel
+        fournit au plus `limit` lignes, fusionnées dans l'ordre global.
+        """
+        def page(id_hotel):
+            local = None
+            if curseur:
+                jour, hotel, reservation = curseur
+                # Le jour du curseur reste à lire dans les hôtels de numéro inférieur
+                local = (jour, reservation if id_hotel == hotel else _ID_MAX if id_hotel < hotel else 0)
+            rows, suivant = self.services[id_hotel].list_reservations(local, limit, client, date_min, date_max)
+            return [dict(row, Id_Hotel=id_hotel) for row in rows], suivant
+
+        pages = self._parallel(page, self.shards)
+        fusion = list(heapq.merge(*(rows for rows, _ in pages.values()), key=_cle_reservation, reverse=True))
+        rows = fusion[:limit]
+        encore = len(fusion) > limit or any(suivant for _, suivant in pages.values())
+        suivant = _cle_reservation(rows[-1]) if rows and encore else None
+
+        if details:
+            par_hotel = defaultdict(list)
+            for row in rows:
+                par_hotel[row["Id_Hotel"]].append(row)
+
+            def completer(id_hotel):
+                with self.shard(id_hotel).connection(readonly=True) as conn:
+                    return repository.attach_reservation_details(conn, par_hotel[id_hotel])
+
+            completes = {(row["Id_Hotel"], row["Id_Reservation"]): row
+                         for lignes in self._parallel(completer, par_hotel).values() for row in lignes}
+            rows = [completes[(row["Id_Hotel"], row["Id_Reservation"])] for row in rows]
+        return rows, suivant
+
+    def reservation_details(self, reservation):
+        return self._service(reservation["Id_Hotel"]).reservation_details(reservation)
+
+    def dashboard(self):
+        """Compteurs de la page Accueil pour toute la chaîne"""
+        def lire(conn):
+            return repository.occupation_today(conn), [dict(row) for row in repository.hotel_ratings(conn)]
+
+        clients = self.executor.submit(self._count_clients)
+        par_hotel = self.fan_out(lire)
+        return {
+            "Clients": clients.result(),
+            "Reservations_actives": sum(occupation[0] for occupation, _ in par_hotel.values()),
+            "Chambres_occupees": sum(occupation[1] for occupation, _ in par_hotel.values()),
+            "Evaluations": [note for _, notes in par_hotel.values() for note in notes],
+        }
+
+    def _count_clients(self):
+        with self.catalogue.connection(readonly=True) as conn:
+            return repository.count_clients(conn)
+
+    def search_clients(self, texte, limit=20):
+        with self.catalogue.connection(readonly=True) as conn:
+            return [dict(row) for row in repository.search_clients(conn, texte, limit)]
+
+    def add_client(self, nom, adresse, ville, cp, email, tel):
+        self.clients.add_client(nom, adresse, ville, cp, email, tel)
+
+    def add_evaluation(self, note, commentaire, client_id, hotel_id):
+        service = self._service(hotel_id)
+        self._copy_client(hotel_id, client_id)
+        service.add_evaluation(note, commentaire, client_id, hotel_id)
+
+    def close(self):
+        self.executor.shutdown()
+        self.catalogue.close()
+        for database in self.shards.values():
+            database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("commande", choices=["split", "stats"])
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"), help="base à répartir (split)")
+    parser.add_argument("--shards", default=os.path.join("data", "shards"))
+    parser.add_argument("--workers", type=int, default=FAN_OUT_WORKERS, help="threads des requêtes réparties")
+    args = parser.parse_args()
+
+    if args.commande == "split":
+        conn = connect(args.db)
+        migrate(conn)
+        conn.close()
+        debut = time.perf_counter()
+        try:
+            chemins = split(args.db, args.shards, args.workers)
+        except FileExistsError as exc:
+            sys.exit(str(exc))
+        print(f"{len(chemins)} bases d'hôtel et {CATALOGUE} créées dans {args.shards} "
+              f"en {time.perf_counter() - debut:.1f} s")
+        return
+
+    router = ShardRouter(args.shards, args.workers)
+    try:
+        debut = time.perf_counter()
+        tableau = router.dashboard()
+        duree = time.perf_counter() - debut
+        print(f"{len(router.shards)} hôtels, {tableau['Clients']} clients, "
+              f"{tableau['Reservations_actives']} réservations actives, "
+              f"{tableau['Chambres_occupees']} chambres occupées (lu en {1000 * duree:.1f} ms)")
+        comptes = router.fan_out(lambda conn: conn.execute(
+            "SELECT (SELECT COUNT(*) FROM Chambre), (SELECT COUNT(*) FROM Reservation)").fetchone())
+        for id_hotel, (chambres, reservations) in comptes.items():
+            print(f"  hôtel {id_hotel} : {chambres} chambres, {reservations} réservations")
+    finally:
+        router.close()
+
+
+if __name__ == "__main__":
+    main()
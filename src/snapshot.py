@@ -0,0 +1,217 @@
+"""Instantanés en lecture seule de la base, pour les pages de rapport.
+
+Un instantané est une copie cohérente faite avec l'API de sauvegarde de
+SQLite (Connection.backup) par étapes de SNAPSHOT_PAGES pages, rangée dans
+data/snapshots/ avec la copie de son archive (voir archive.py). Les longues
+lectures des rapports s'y font sans tenir d'instantané WAL ouvert sur
+data/hotel.db pendant que le front desk écrit.
+
+    python src/snapshot.py [--db data/hotel.db]    # prend un instantané
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from archive import archive_path
+from database import ConnectionPool, connect
+
+# Pages copiées par étape et pause entre deux étapes
+SNAPSHOT_PAGES = 1024
+SNAPSHOT_PAUSE = 0.005
+# Une écriture d'une autre connexion fait repartir la copie de zéro : après
+# MAX_RESTARTS étapes sans progrès, la copie se fait en une étape (un seul instantané de
+# lecture, qui ne bloque pas les écrivains en WAL)
+MAX_RESTARTS = 3
+# Secondes entre deux instantanés planifiés
+SNAPSHOT_INTERVAL = 300
+# Instantanés conservés
+KEEP = 2
+
+_HORODATAGE = "%Y%m%d-%H%M%S-%f"
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def snapshot_dir(path):
+    return os.path.join(os.path.dirname(path), "snapshots")
+
+
+def _backup(source, destination, schema, pages, pause):
+    etat = {"reste": None, "reprises": 0}
+
+    def progression(status, remaining, total):
+        # Reprise (ou verrou) : pas moins de pages restantes qu'à l'étape précédente
+        if etat["reste"] is not None and remaining >= etat["reste"]:
+            etat["reprises"] += 1
+            if etat["reprises"] > MAX_RESTARTS:
+                raise _TooManyRestarts
+        etat["reste"] = remaining
+
+    try:
+        source.backup(destination, pages=pages, progress=progression, name=schema, sleep=pause)
+    except _TooManyRestarts:
+        source.backup(destination, pages=-1, name=schema)
+
+
+def copy_database(path, cible, pages=SNAPSHOT_PAGES, pause=SNAPSHOT_PAUSE):
+    """Copie cohérente de `path` et de son archive vers `cible` (et son archive),
+    sans la quitter du WAL ni bloquer les écrivains ; retourne `cible`"""
+    source = connect(path, readonly=True)
+    try:
+        schemas = [row[1] for row in source.execute("PRAGMA database_list") if row[1] in ("main", "archive")]
+        # La base principale d'abord : une réservation archivée entre les deux
+        # copies est alors dans les deux (les vues Historique_* dédoublonnent)
+        # plutôt que dans aucune
+        copies = []
+        for schema in schemas:
+            fichier = (cible if schema == "main" else archive_path(cible)) + ".tmp"
+            destination = sqlite3.connect(fichier)
+            try:
+                _backup(source, destination, schema, pages, pause)
+                # Copie autonome : pas de fichier -wal à côté
+                destination.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                destination.close()
+            copies.append(fichier)
+    finally:
+        source.close()
+    # L'archive est renommée avant la base principale, que cherche list_snapshots()
+    for fichier in reversed(copies):
+        os.replace(fichier, fichier[:-len(".tmp")])
+    return cible
+
+
+def take_snapshot(path, directory=None, pages=SNAPSHOT_PAGES, pause=SNAPSHOT_PAUSE):
+    """Copie `path` (et son archive) dans `directory` ; retourne le chemin de l'instantané"""
+    directory = directory or snapshot_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.splitext(os.path.basename(path))[0]
+    cible = os.path.join(directory, f"{base}-{datetime.now().strftime(_HORODATAGE)}.db")
+    # Ouvert ensuite en lecture seule
+    return copy_database(path, cible, pages, pause)
+
+
+def list_snapshots(directory):
+    """Instantanés complets de `directory`, du plus ancien au plus récent"""
+    return sorted(chemin for chemin in glob.glob(os.path.join(directory, "*.db"))
+                  if not chemin.endswith("_archive.db"))
+
+
+def taken_at(chemin):
+    """Date de début de la copie, lue dans le nom de l'instantané"""
+    return datetime.strptime("-".join(os.path.basename(chemin)[:-len(".db")].rsplit("-", 3)[1:]), _HORODATAGE)
+
+
+def prune(directory, keep=KEEP):
+    for chemin in list_snapshots(directory)[:-keep]:
+        for fichier in (chemin, archive_path(chemin)):
+            try:
+                os.remove(fichier)
+            except OSError:
+                # Encore ouvert ailleurs (Windows) : sera retiré au suivant
+                pass
+
+
+class SnapshotStore:
+    """Connexions en lecture vers le dernier instantané, renouvelé par un thread"""
+
+    def __init__(self, path, interval=SNAPSHOT_INTERVAL, readers=4, directory=None):
+        self.path = path
+        self.interval = interval
+        self.readers = readers
+        self.directory = directory or snapshot_dir(path)
+        self.snapshot_path = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._copie = threading.Lock()
+        self._arret = threading.Event()
+        self._thread = None
+        existants = list_snapshots(self.directory) if os.path.isdir(self.directory) else []
+        if existants:
+            self._adopt(existants[-1])
+
+    def _adopt(self, chemin):
+        with self._lock:
+            ancien, self._pool = self._pool, ConnectionPool(chemin, self.readers, readonly=True)
+            self.snapshot_path = chemin
+        if ancien is not None:
+            # Les connexions encore prêtées sont fermées par le ramasse-miettes
+            ancien.close()
+
+    def refresh(self, max_age=None):
+        """Prend un nouvel instantané et y dirige les lectures suivantes.
+
+        Avec `max_age`, l'instantané courant est gardé s'il a moins de
+        `max_age` secondes (par exemple pris par une demande concurrente).
+        """
+        # Une seule copie à la fois ; une demande pendant une copie l'attend
+        with self._copie:
+            age = self.age()
+            if max_age is not None and age is not None and age < max_age:
+                return self.snapshot_path
+            chemin = take_snapshot(self.path, self.directory)
+            self._adopt(chemin)
+            prune(self.directory)
+        return chemin
+
+    def age(self):
+        """Secondes écoulées depuis le début de la copie courante, None sans instantané"""
+        if self.snapshot_path is None:
+            return None
+        return (datetime.now() - taken_at(self.snapshot_path)).total_seconds()
+
+    @contextmanager
+    def connection(self):
+        if self._pool is None:
+            self.refresh(max_age=self.interval)
+        with self._lock:
+            pool = self._pool
+        with pool.connection() as conn:
+            yield conn
+
+    def start(self):
+        """Renouvelle l'instantané toutes les `interval` secondes dans un thread"""
+        def boucle():
+            age = self.age()
+            attente = 0 if age is None else max(0, self.interval - age)
+            while not self._arret.wait(attente):
+                try:
+                    self.refresh()
+                except sqlite3.Error as exc:
+                    print(f"Instantané impossible : {exc}", file=sys.stderr)
+                attente = self.interval
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=boucle, name="snapshot", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join("data", "hotel.db"))
+    parser.add_argument("--pages", type=int, default=SNAPSHOT_PAGES, help="pages copiées par étape")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    chemin = take_snapshot(args.db, pages=args.pages)
+    prune(snapshot_dir(args.db))
+    print(f"Instantané {chemin} pris en {time.perf_counter() - debut:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
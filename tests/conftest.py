@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# Modules à plat dans src/, importés comme par les scripts (import repository)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from database import Database, connect
+from migrations import migrate
+from service import BookingService
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Base migrée, avec les données d'exemple de la première migration"""
+    chemin = str(tmp_path / "hotel.db")
+    conn = connect(chemin)
+    migrate(conn)
+    conn.close()
+    return chemin
+
+
+@pytest.fixture
+def database(db_path):
+    database = Database(db_path, writers=2, readers=4)
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def service(database):
+    return BookingService(database)
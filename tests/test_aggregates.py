@@ -0,0 +1,59 @@
+from datetime import date
+
+import aggregates
+from database import connect
+from test_allocation import SEJOURS
+
+
+def _occupation(conn, jour):
+    row = conn.execute("SELECT Reservations, Chambres FROM Stat_Occupation WHERE Jour = ?", (jour,)).fetchone()
+    return tuple(row) if row else (0, 0)
+
+
+def test_triggers_follow_bookings_moves_and_deletions(db_path, service):
+    premiere = service.create_reservation(1, "2030-05-01", "2030-05-04", [201, 202])
+    seconde = service.create_reservation(2, "2030-05-03", "2030-05-05", [101])
+    service.create_reservation(3, "2030-05-20", "2030-05-21", [307])
+    service.add_client("Nina", "1 rue", "Brest", 29200, "n@b.fr", "06")
+    service.add_evaluation(4, "Bien", 1, 2)
+
+    conn = connect(db_path)
+    assert aggregates.verify(conn) == []
+    # Bornes incluses : le jour du départ compte
+    assert _occupation(conn, "2030-05-04") == (2, 3)
+    assert _occupation(conn, "2030-05-05") == (1, 1)
+
+    # Changement de chambre, nouvelles dates, note modifiée
+    conn.execute("UPDATE Reservation_Chambre SET Numero_chambre = 502 WHERE Id_Reservation = ? "
+                 "AND Numero_chambre = 202", (premiere,))
+    conn.execute("UPDATE Reservation SET Date_arrivee = '2030-05-10', Date_depart = '2030-05-12' "
+                 "WHERE Id_Reservation = ?", (seconde,))
+    conn.execute("UPDATE Evaluation SET Note = 1 WHERE Id_Evaluation = 1")
+    conn.commit()
+    assert aggregates.verify(conn) == []
+    assert _occupation(conn, "2030-05-04") == (1, 2)
+    assert _occupation(conn, "2030-05-11") == (1, 1)
+
+    # Suppression d'une chambre seule, puis de la réservation entière
+    conn.execute("DELETE FROM Reservation_Chambre WHERE Id_Reservation = ? AND Numero_chambre = 502", (premiere,))
+    conn.commit()
+    assert _occupation(conn, "2030-05-02") == (1, 1)
+    conn.execute("DELETE FROM Reservation_Chambre WHERE Id_Reservation = ?", (premiere,))
+    conn.execute("DELETE FROM Reservation WHERE Id_Reservation = ?", (premiere,))
+    conn.execute("DELETE FROM Evaluation WHERE Id_Hotel = 2")
+    conn.commit()
+    assert aggregates.verify(conn) == []
+    assert _occupation(conn, "2030-05-02") == (0, 0)
+    conn.close()
+
+
+def test_reoptimization_keeps_aggregates(db_path, service):
+    for arrivee, depart, chambre in SEJOURS:
+        service.create_reservation(1, arrivee, depart, [chambre])
+    assert service.reoptimize(1, 1, date(2030, 12, 1))["deplacements"]
+    conn = connect(db_path)
+    assert aggregates.verify(conn) == []
+    avant = conn.execute("SELECT * FROM Stat_Occupation ORDER BY Jour").fetchall()
+    aggregates.rebuild(conn)
+    assert conn.execute("SELECT * FROM Stat_Occupation ORDER BY Jour").fetchall() == avant
+    conn.close()
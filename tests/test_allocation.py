@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+from service import RoomUnavailable
+
+# Hôtel 1, type 1 : chambres 101, 201 et 202. Deux jours orphelins (le 4 dans
+# la 101, le 9 dans la 201) ; le dernier séjour réservé reste en place
+SEJOURS = [("2031-01-01", "2031-01-03", 101), ("2031-01-06", "2031-01-08", 201),
+           ("2031-01-05", "2031-01-09", 101), ("2031-01-11", "2031-01-12", 202),
+           ("2031-01-10", "2031-01-12", 201)]
+
+
+@pytest.fixture
+def service(service):
+    for arrivee, depart, chambre in SEJOURS:
+        service.create_reservation(1, arrivee, depart, [chambre])
+    return service
+
+
+def _orphelins(plan, attribution):
+    return next(ligne["Jours_orphelins"] for ligne in plan["rapport"] if ligne["Attribution"] == attribution)
+
+
+def test_reoptimize_reduces_orphan_days(service):
+    plan = service.reoptimize(1, 1, date(2030, 12, 1), apply=False)
+    assert plan["deplacements"] and _orphelins(plan, "best_fit") < _orphelins(plan, "actuelle")
+
+    applique = service.reoptimize(1, 1, date(2030, 12, 1))
+    assert applique["deplacements"] == plan["deplacements"]
+    # Index à jour (Journal_Index) : les chambres libérées sont de nouveau proposées
+    for _, _, nouvelle, arrivee, depart in applique["deplacements"]:
+        libres = [chambre["Numero"] for chambre in service.search_availability(arrivee, depart, 1, 1)]
+        assert nouvelle not in libres
+    apres = service.reoptimize(1, 1, date(2030, 12, 1), apply=False)
+    assert _orphelins(apres, "actuelle") == _orphelins(plan, "best_fit")
+
+
+def test_allocate_rooms_prefers_tight_fit(service):
+    # Accolé aux séjours finissant le 12 (chambres 201 et 202) plutôt que dans la
+    # 101, première dans l'ordre des étages mais libre depuis le 9
+    assert service.allocate_rooms(1, 1, "2031-01-13", "2031-01-14") == [201]
+    with pytest.raises(RoomUnavailable):
+        service.allocate_rooms(1, 1, "2031-01-06", "2031-01-07", nombre=3)
@@ -0,0 +1,84 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from analytics import AnalyticsData, AnalyticsEngine
+from database import connect
+
+# Hôtel 1 : 101, 201, 202 (Simple, 80) et 307, 502 (Double, 120).
+# Hôtel 2 : 305 (Simple), 104 et 410 (Double).
+SEJOURS = [  # (arrivée, départ, chambres, prestations)
+    ("2030-06-01", "2030-06-04", [101], {1: 2}),        # 3 nuits, petit déjeuner 2 × 15
+    ("2030-06-03", "2030-06-05", [307, 502], {3: 1}),   # 2 nuits par chambre, SPA 40
+    ("2030-05-30", "2030-06-02", [104], {4: 1}),        # 1 nuit dans la période, prestation hors période
+]
+DEBUT, FIN = date(2030, 6, 1), date(2030, 6, 4)
+
+
+@pytest.fixture
+def donnees(db_path, service):
+    for i, (arrivee, depart, chambres, prestations) in enumerate(SEJOURS):
+        service.create_reservation(i + 1, arrivee, depart, chambres, prestations)
+    conn = connect(db_path, readonly=True)
+    yield AnalyticsData(conn)
+    conn.close()
+
+
+def test_summary_by_hotel(donnees):
+    resume = donnees.summary(DEBUT, FIN)
+    assert resume["Id_Hotel"].tolist() == [1, 2]
+    assert resume["Chambres"].tolist() == [5, 3]
+    assert resume["Nuits_vendues"].tolist() == [7, 1]
+    assert resume["CA_chambres"].tolist() == [3 * 80 + 4 * 120, 120]
+    assert resume["Occupation"].tolist() == [7 / 20, 1 / 12]
+    assert resume["ADR"].tolist() == [720 / 7, 120]
+    assert resume["RevPAR"].tolist() == [720 / 20, 120 / 12]
+    assert resume["CA_prestations"].tolist() == [2 * 15 + 40, 0]
+    assert resume["CA_total"].tolist() == [790, 120]
+
+
+def test_summary_by_type(donnees):
+    resume = donnees.summary(DEBUT, FIN, par="type")
+    assert resume["Type"] == ["Simple", "Double"]
+    assert resume["Nuits_vendues"].tolist() == [3, 5]
+    assert resume["CA_chambres"].tolist() == [240, 600]
+    assert "CA_prestations" not in resume
+
+
+def test_daily_excludes_departure_day(donnees):
+    journalier = donnees.daily(DEBUT, FIN, id_hotel=1)
+    assert journalier["Jour"] == [date(2030, 6, d) for d in range(1, 5)]
+    # Le 4, la 101 est libérée (jour du départ) : seules 307 et 502 comptent
+    assert journalier["Nuits_vendues"].tolist() == [1, 1, 3, 2]
+    assert journalier["CA_chambres"].tolist() == [80, 80, 320, 240]
+    assert journalier["Occupation"].tolist() == [0.2, 0.2, 0.6, 0.4]
+    # Mêmes nuits que le résumé, jour par jour
+    assert journalier["Nuits_vendues"].sum() == donnees.summary(DEBUT, FIN)["Nuits_vendues"][0]
+    assert donnees.daily(DEBUT, FIN, id_type=2)["Nuits_vendues"].tolist() == [1, 0, 2, 2]
+
+
+def test_range_edges(donnees):
+    # Une seule journée : le 5, jour de départ de 307 et 502, n'a aucune nuit
+    assert donnees.totals("2030-06-05", "2030-06-05")["Occupation"] == 0
+    assert donnees.daily("2030-06-04", "2030-06-03")["Jour"] == []
+    veille = donnees.summary("2030-05-30", "2030-05-30")
+    assert veille["Nuits_vendues"].tolist() == [0, 1] and veille["CA_prestations"].tolist() == [0, 12]
+
+
+def test_totals(donnees):
+    totaux = donnees.totals(DEBUT, FIN)
+    assert totaux == {"Occupation": 8 / 32, "ADR": 840 / 8, "RevPAR": 840 / 32,
+                      "CA_chambres": 840.0, "CA_prestations": 70.0}
+
+
+def test_engine_reloads_after_a_write(db_path, service):
+    moteur = AnalyticsEngine()
+    conn = connect(db_path, readonly=True)
+    avant = moteur.data(conn)
+    assert moteur.data(conn) is avant
+    service.create_reservation(1, "2030-06-01", "2030-06-02", [201])
+    apres = moteur.data(conn)
+    assert apres is not avant
+    assert np.sum(apres.summary(DEBUT, FIN)["Nuits_vendues"]) == 1
+    conn.close()
@@ -0,0 +1,102 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from api import BookingApi, HttpServer
+
+
+@pytest.fixture
+def serveur(service):
+    """Serveur HTTP sur un port libre, dans une boucle asyncio à part ; retourne (api, port)"""
+    api = BookingApi(service)
+    demarre = threading.Event()
+    port = []
+    boucle = asyncio.new_event_loop()
+    tache = boucle.create_task(HttpServer(api, workers=2).serve(
+        "127.0.0.1", 0, lambda p: (port.append(p), demarre.set())))
+
+    def lancer():
+        try:
+            boucle.run_until_complete(tache)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=lancer, daemon=True)
+    thread.start()
+    assert demarre.wait(5)
+    yield api, port[0]
+    boucle.call_soon_threadsafe(tache.cancel)
+    thread.join(5)
+    boucle.close()
+
+
+def _get(port, cible):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", cible)
+    reponse = conn.getresponse()
+    resultat = reponse.status, json.loads(reponse.read())
+    conn.close()
+    return resultat
+
+
+def test_availability(serveur):
+    _, port = serveur
+    statut, contenu = _get(port, "/disponibilites?arrivee=2030-01-01&depart=2030-01-03&hotel=1")
+    assert statut == 200 and {c["Numero"] for c in contenu["chambres"]} == {101, 201, 202, 307, 502}
+
+
+@pytest.mark.parametrize("cible", [
+    "/disponibilites?arrivee=foo&depart=bar",
+    "/disponibilites?arrivee=2030-01-01",
+    "/reservations?curseur=[1]",
+    "/reservations?curseur=%5B%222030-01-01%22%2C%20true%5D",
+    "/reservations?curseur=%7B%7D",
+    "/reservations?limit=abc",
+    "/reservations?limit=0",
+    "/reservations?limit=-1",
+    "/reservations?limit=-2",
+    "/reservations?depuis=hier",
+    "/reservations?jusqu=2030-13-01",
+])
+def test_bad_parameters_are_400(serveur, cible):
+    _, port = serveur
+    statut, contenu = _get(port, cible)
+    assert statut == 400 and "erreur" in contenu
+
+
+def test_cursor_pages(serveur, service):
+    _, port = serveur
+    for jour in (1, 4, 7):
+        service.create_reservation(1, f"2030-01-0{jour}", f"2030-01-0{jour + 1}", [101])
+    statut, page = _get(port, "/reservations?limit=2")
+    assert statut == 200 and len(page["reservations"]) == 2
+    statut, suite = _get(port, "/reservations?limit=2&curseur=" + json.dumps(page["curseur"]).replace(" ", ""))
+    assert statut == 200 and len(suite["reservations"]) == 1 and suite["curseur"] is None
+    # Au-delà du maximum, la page est ramenée à 500 lignes plutôt que refusée
+    statut, tout = _get(port, "/reservations?limit=100000")
+    assert statut == 200 and len(tout["reservations"]) == 3
+    statut, filtre = _get(port, "/reservations?depuis=2030-01-03&jusqu=2030-01-05")
+    assert statut == 200 and [r["Date_arrivee"] for r in filtre["reservations"]] == ["2030-01-04"]
+
+
+def test_bad_content_length_is_400(serveur):
+    _, port = serveur
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+        client.sendall(b"POST /reservations HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+        assert client.recv(100).startswith(b"HTTP/1.1 400 ")
+
+
+def test_unexpected_error_is_generic_500(serveur, monkeypatch, capsys):
+    api, port = serveur
+
+    def panne(*args):
+        raise RuntimeError("détail interne")
+
+    monkeypatch.setattr(api.service, "search_availability", panne)
+    statut, contenu = _get(port, "/disponibilites?arrivee=2030-01-01&depart=2030-01-03")
+    assert statut == 500 and "détail interne" not in json.dumps(contenu, ensure_ascii=False)
+    assert "détail interne" in capsys.readouterr().err
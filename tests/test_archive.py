@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+import aggregates
+import analytics
+from archive import _copy, archive_path, archive_reservations, purge_journal
+from database import connect
+
+SEJOURS = [  # (arrivée, départ, chambres, prestations)
+    ("2020-01-01", "2020-01-03", [101], {1: 2}),
+    ("2020-02-01", "2020-02-05", [201, 202], {}),
+    ("2021-05-01", "2021-05-02", [101], {2: 1}),
+    ("2030-01-01", "2030-01-03", [101], {}),
+    ("2030-02-01", "2030-02-02", [202], {3: 1}),
+]
+
+
+@pytest.fixture
+def conn(db_path, service):
+    for i, (arrivee, depart, chambres, prestations) in enumerate(SEJOURS):
+        service.create_reservation(i % 5 + 1, arrivee, depart, chambres, prestations)
+    conn = connect(db_path)
+    yield conn
+    conn.close()
+
+
+def _compte(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def _historique(conn):
+    return {table: sorted(tuple(row) for row in conn.execute(f"SELECT * FROM Historique_{table}"))
+            for table in ("Reservation", "Reservation_Chambre", "Reservation_Prestation")}
+
+
+def test_archive_moves_old_stays(db_path, conn):
+    avant = _historique(conn)
+    assert archive_reservations(conn, "2025-01-01", chunk=2, pause=0) == 3
+    assert os.path.exists(archive_path(db_path))
+    assert _compte(conn, "main.Reservation") == 2 and _compte(conn, "archive.Reservation") == 3
+    assert _compte(conn, "archive.Reservation_Chambre") == 4
+    # Les vues réunissent les deux bases sans perte ni doublon
+    assert _historique(conn) == avant
+    assert aggregates.verify(conn) == []
+    # Rien de plus à archiver
+    assert archive_reservations(conn, "2025-01-01", pause=0) == 0
+
+
+def test_archive_does_not_rebuild_the_index(db_path, conn, service, monkeypatch):
+    appels = []
+    relire = service.index._rebuild
+    monkeypatch.setattr(service.index, "_rebuild", lambda c: appels.append(1) or relire(c))
+    # Un paquet par réservation : trois transactions de suppression
+    assert archive_reservations(conn, "2025-01-01", chunk=1, pause=0) == 3
+    assert _compte(conn, "Journal_Index") == 4
+    libres = {chambre["Numero"] for chambre in service.search_availability("2020-01-02", "2020-02-03")}
+    assert {101, 201, 202} <= libres
+    assert appels == []
+    # Journal purgé après lecture : rien à reconstruire
+    conn.execute("UPDATE Journal_Index SET Date_ecriture = datetime('now', '-2 days')")
+    conn.commit()
+    assert purge_journal(conn) == 4
+    service.search_availability("2030-01-01", "2030-01-01")
+    assert appels == []
+    # Suppression purgée avant d'être lue : l'index est reconstruit
+    conn.execute("DELETE FROM Reservation_Chambre WHERE Numero_chambre = 202")
+    conn.execute("UPDATE Journal_Index SET Date_ecriture = datetime('now', '-2 days')")
+    conn.commit()
+    assert purge_journal(conn) == 1
+    assert 202 in {chambre["Numero"] for chambre in service.search_availability("2030-02-01", "2030-02-01")}
+    assert appels == [1]
+
+
+def test_interrupted_archive_is_not_counted_twice(conn):
+    avant = _historique(conn)
+    # Copie faite, suppression des tables chaudes jamais arrivée
+    ids = [row[0] for row in conn.execute("SELECT Id_Reservation FROM Reservation WHERE Date_depart < '2025-01-01'")]
+    _copy(conn, ids)
+    conn.commit()
+    assert _compte(conn, "archive.Reservation") == 3
+    assert _historique(conn) == avant
+    # Séjours par chambre des rapports (analytics.py), lus à travers les vues
+    assert len(analytics.AnalyticsData(conn).sejour_chambre) == sum(len(s[2]) for s in SEJOURS)
+
+    # Une reprise termine le déplacement
+    assert archive_reservations(conn, "2025-01-01", pause=0) == 3
+    assert _historique(conn) == avant
+
+
+def test_readonly_connection_sees_archive(db_path, conn):
+    archive_reservations(conn, "2025-01-01", pause=0)
+    lecture = connect(db_path, readonly=True)
+    assert _historique(lecture) == _historique(conn)
+    lecture.close()
+
+
+def test_readonly_connection_without_archive(db_path, conn):
+    # Aucune archive créée en lecture seule : les vues ne portent que sur les tables chaudes
+    conn.execute("DETACH DATABASE archive")
+    os.remove(archive_path(db_path))
+    lecture = connect(db_path, readonly=True)
+    assert not os.path.exists(archive_path(db_path))
+    assert _compte(lecture, "Historique_Reservation") == len(SEJOURS)
+    lecture.close()
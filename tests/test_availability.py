@@ -0,0 +1,78 @@
+from datetime import date
+
+from availability import AvailabilityIndex
+from database import connect
+
+
+def test_index_follows_other_connections(db_path, service):
+    id_reservation = service.create_reservation(1, "2030-01-01", "2030-01-05", [101])
+    assert not service.index.is_free(101, date(2030, 1, 3), date(2030, 1, 4))
+
+    # Autre processus : changement de chambre puis suppression
+    conn = connect(db_path)
+    conn.execute("UPDATE Reservation_Chambre SET Numero_chambre = 104 WHERE Id_Reservation = ?",
+                 (id_reservation,))
+    conn.commit()
+    libres = [chambre["Numero"] for chambre in service.search_availability("2030-01-03", "2030-01-04")]
+    assert 101 in libres and 104 not in libres
+
+    conn.execute("DELETE FROM Reservation_Chambre WHERE Id_Reservation = ?", (id_reservation,))
+    conn.execute("DELETE FROM Reservation WHERE Id_Reservation = ?", (id_reservation,))
+    conn.commit()
+    conn.close()
+    libres = [chambre["Numero"] for chambre in service.search_availability("2030-01-03", "2030-01-04")]
+    assert 101 in libres and 104 in libres
+
+
+def test_index_matches_rebuild(db_path, service):
+    for debut, fin, chambre in [("2030-02-01", "2030-02-04", 201), ("2030-02-06", "2030-02-09", 201),
+                                ("2030-02-02", "2030-02-03", 202)]:
+        service.create_reservation(2, debut, fin, [chambre])
+    conn = connect(db_path, readonly=True)
+    neuf = AvailabilityIndex.build(conn)
+    conn.close()
+    for jour in range(1, 11):
+        debut = date(2030, 2, jour)
+        assert service.index.free_rooms(debut, debut) == neuf.free_rooms(debut, debut)
+
+
+def _reconstructions(monkeypatch, index):
+    appels = []
+    relire = index._rebuild
+    monkeypatch.setattr(index, "_rebuild", lambda conn: appels.append(1) or relire(conn))
+    return appels
+
+
+def test_journal_is_applied_without_rebuild(db_path, service, monkeypatch):
+    appels = _reconstructions(monkeypatch, service.index)
+    premiere = service.create_reservation(1, "2030-03-01", "2030-03-04", [101])
+    seconde = service.create_reservation(2, "2030-03-01", "2030-03-04", [201])
+
+    conn = connect(db_path)
+    # Échange des deux chambres, puis nouvelles dates pour la première réservation
+    conn.execute("UPDATE Reservation_Chambre SET Numero_chambre = 202 WHERE Id_Reservation = ?", (premiere,))
+    conn.execute("UPDATE Reservation_Chambre SET Numero_chambre = 101 WHERE Id_Reservation = ?", (seconde,))
+    conn.execute("UPDATE Reservation_Chambre SET Numero_chambre = 201 WHERE Id_Reservation = ?", (premiere,))
+    conn.execute("UPDATE Reservation SET Date_arrivee = '2030-03-10', Date_depart = '2030-03-12' "
+                 "WHERE Id_Reservation = ?", (premiere,))
+    conn.commit()
+    conn.close()
+
+    libres = [chambre["Numero"] for chambre in service.search_availability("2030-03-02", "2030-03-02")]
+    assert 101 not in libres and 201 in libres
+    libres = [chambre["Numero"] for chambre in service.search_availability("2030-03-11", "2030-03-11")]
+    assert 101 in libres and 201 not in libres
+    assert appels == []
+
+
+def test_purged_journal_forces_rebuild(db_path, service, monkeypatch):
+    appels = _reconstructions(monkeypatch, service.index)
+    id_reservation = service.create_reservation(1, "2030-04-01", "2030-04-04", [101])
+    conn = connect(db_path)
+    conn.execute("DELETE FROM Reservation_Chambre WHERE Id_Reservation = ?", (id_reservation,))
+    conn.execute("DELETE FROM Reservation WHERE Id_Reservation = ?", (id_reservation,))
+    conn.execute("DELETE FROM Journal_Index")
+    conn.commit()
+    conn.close()
+    assert 101 in [chambre["Numero"] for chambre in service.search_availability("2030-04-02", "2030-04-02")]
+    assert appels == [1]
@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+
+import pytest
+
+from database import ConnectionPool, Database, connect
+from migrations import migrate
+
+
+def test_readers_cannot_write(database):
+    with database.connection(readonly=True) as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM Client")
+    with database.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM Client").fetchone()[0] == 5
+
+
+def test_pool_reuses_connections(db_path):
+    pool = ConnectionPool(db_path, size=2, readonly=True)
+    with pool.connection() as premiere:
+        pass
+    with pool.connection() as seconde:
+        assert seconde is premiere
+    # Transaction laissée ouverte par une page interrompue : annulée au retour
+    ecrivains = ConnectionPool(db_path, size=1)
+    with ecrivains.connection() as conn:
+        conn.execute("UPDATE Client SET Nom = 'effacé'")
+    with ecrivains.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM Client WHERE Nom = 'effacé'").fetchone()[0] == 0
+    ecrivains.close()
+    pool.close()
+
+
+def test_full_pool_waits_for_a_release(db_path):
+    pool = ConnectionPool(db_path, size=1, readonly=True, timeout=5)
+    conn = pool.acquire()
+    rendue = threading.Timer(0.05, pool.release, (conn,))
+    rendue.start()
+    assert pool.acquire() is conn
+    rendue.join()
+    pool.close()
+
+
+def test_reader_sees_committed_writes(database):
+    with database.connection(readonly=True) as lecteur:
+        avant = lecteur.execute("SELECT COUNT(*) FROM Client").fetchone()[0]
+    with database.connection() as conn:
+        conn.execute("INSERT INTO Client (Nom, Adresse, Ville, Code_postal, Email, Telephone) "
+                     "VALUES ('Nina', '1 rue', 'Brest', 29200, 'n@b.fr', '06')")
+        with database.connection(readonly=True) as lecteur:
+            # Pas encore validée : invisible pour les autres connexions
+            assert lecteur.execute("SELECT COUNT(*) FROM Client").fetchone()[0] == avant
+        conn.commit()
+    with database.connection(readonly=True) as lecteur:
+        assert lecteur.execute("SELECT COUNT(*) FROM Client").fetchone()[0] == avant + 1
+
+
+def test_close_closes_idle_connections(db_path):
+    base = Database(db_path, writers=1, readers=1)
+    with base.connection(readonly=True) as conn:
+        pass
+    base.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+
+def test_path_is_escaped_in_readonly_uri(tmp_path):
+    dossier = tmp_path / "réservations #2 ?100%"
+    dossier.mkdir()
+    chemin = str(dossier / "hotel.db")
+    conn = connect(chemin)
+    migrate(conn)
+    conn.close()
+    lecteur = connect(chemin, readonly=True)
+    assert lecteur.execute("SELECT COUNT(*) FROM Hotel").fetchone()[0] == 2
+    assert lecteur.execute("SELECT COUNT(*) FROM archive.Reservation").fetchone()[0] == 0
+    lecteur.close()
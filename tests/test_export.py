@@ -0,0 +1,82 @@
+import csv
+import io
+
+import pytest
+
+from archive import _copy, archive_reservations
+from database import connect
+from export import COLUMNS, export_chunks, reservation_chunks, write_export
+
+SEJOURS = [  # (arrivée, départ, chambres, prestations)
+    ("2020-01-01", "2020-01-03", [101], {1: 2}),           # 2 × 80 + 2 × 15
+    ("2020-02-01", "2020-02-05", [201, 307], {}),          # 4 × (80 + 120)
+    ("2021-05-01", "2021-05-02", [305], {4: 1, 5: 2}),     # 80 + 12 + 2 × 25
+    ("2030-01-01", "2030-01-03", [101], {}),               # 2 × 80
+    ("2030-02-01", "2030-02-02", [502], {3: 1}),           # 120 + 40
+]
+
+# Montants des nuits et des prestations, calculés à travers les vues Historique_*
+SQL_HISTORIQUE = '''
+    SELECT r.Id_Reservation,
+           (SELECT SUM(t.Tarif) FROM Historique_Reservation_Chambre rc
+            JOIN Chambre c ON c.Numero = rc.Numero_chambre JOIN Type_Chambre t ON t.Id_Type = c.Id_Type
+            WHERE rc.Id_Reservation = r.Id_Reservation)
+           * (julianday(r.Date_depart) - julianday(r.Date_arrivee)),
+           COALESCE((SELECT SUM(p.Prix * rp.Quantite) FROM Historique_Reservation_Prestation rp
+                     JOIN Prestation p ON p.Id_Prestation = rp.Id_Prestation
+                     WHERE rp.Id_Reservation = r.Id_Reservation), 0)
+    FROM Historique_Reservation r
+'''
+
+
+@pytest.fixture
+def conn(db_path, service):
+    for i, (arrivee, depart, chambres, prestations) in enumerate(SEJOURS):
+        service.create_reservation(i + 1, arrivee, depart, chambres, prestations)
+    conn = connect(db_path)
+    # Trois réservations archivées ; la 4 copiée dans l'archive sans avoir quitté
+    # les tables chaudes (archivage interrompu)
+    assert archive_reservations(conn, "2025-01-01", pause=0) == 3
+    _copy(conn, [4])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_reservations_include_archive_once(conn):
+    assert conn.execute("SELECT COUNT(*) FROM archive.Reservation").fetchone()[0] == 4
+    rows = [row for paquet in reservation_chunks(conn, chunk=2) for row in paquet]
+    assert sorted(row[0] for row in rows) == [1, 2, 3, 4, 5]
+    attendus = {row[0]: (row[1], row[2]) for row in conn.execute(SQL_HISTORIQUE)}
+    assert {row[0]: (row[9], row[10]) for row in rows} == attendus
+
+    par_id = {row[0]: dict(zip((nom for nom, _ in COLUMNS["reservations"]), row)) for row in rows}
+    assert par_id[1]["Montant_chambres"] == 160 and par_id[1]["Montant_prestations"] == 30
+    assert par_id[2]["Chambres"] == "201 307" and par_id[2]["Nuits"] == 4 and par_id[2]["Total"] == 800
+    assert par_id[3]["Ville"] == "Lyon" and par_id[3]["Total"] == 80 + 12 + 50
+    assert par_id[4]["Total"] == 160
+
+
+def test_chunk_sizes(conn):
+    for taille in (1, 2, 5, 10):
+        paquets = list(reservation_chunks(conn, chunk=taille))
+        assert all(len(paquet) == taille for paquet in paquets[:-1])
+        assert sum(map(len, paquets)) == 5
+    assert sum(map(len, export_chunks(conn, "clients", 2))) == 5
+
+
+def test_csv_export(conn):
+    sortie = io.BytesIO()
+    assert write_export(conn, "reservations", "csv", sortie, chunk=2) == 5
+    lignes = list(csv.DictReader(io.StringIO(sortie.getvalue().decode("utf-8"))))
+    assert len(lignes) == 5
+    assert sum(float(ligne["Total"]) for ligne in lignes) == sum(
+        chambres + prestations for _, chambres, prestations in conn.execute(SQL_HISTORIQUE))
+
+
+def test_parquet_export(conn):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    sortie = io.BytesIO()
+    assert write_export(conn, "reservations", "parquet", sortie, chunk=2) == 5
+    table = parquet.read_table(io.BytesIO(sortie.getvalue()))
+    assert table.num_rows == 5 and sorted(table.column("Id_Reservation").to_pylist()) == [1, 2, 3, 4, 5]
@@ -0,0 +1,92 @@
+import io
+import json
+
+import aggregates
+import repository
+from database import connect
+from import_data import import_file
+
+
+def _import(db_path, tmp_path, kind, lignes, defer_aggregates=False):
+    chemin = tmp_path / f"{kind}.jsonl"
+    chemin.write_text("".join(json.dumps(ligne) + "\n" for ligne in lignes), encoding="utf-8")
+    conn = connect(db_path)
+    conn.isolation_level = None  # transactions par paquet, comme la commande
+    rejets = io.StringIO()
+    inseres, rejetes, _ = import_file(conn, kind, str(chemin), rejects=rejets, defer_aggregates=defer_aggregates)
+    conn.close()
+    return inseres, [json.loads(ligne)["raison"] for ligne in rejets.getvalue().splitlines()]
+
+
+CLIENT = {"Adresse": "1 rue Haute", "Ville": "Brest", "Code_postal": 29200,
+          "Email": "a@b.fr", "Telephone": "0600000000", "Nom": "Anne"}
+
+
+def test_rejected_client_id_is_not_a_reference(db_path, tmp_path):
+    inseres, raisons = _import(db_path, tmp_path, "clients", [
+        {**CLIENT, "Id_Client": 50, "Code_postal": "pas un code"},
+        {**CLIENT, "Id_Client": 51},
+    ])
+    assert inseres == 1 and len(raisons) == 1 and "Code_postal" in raisons[0]
+
+    inseres, raisons = _import(db_path, tmp_path, "reservations", [
+        {"Id_Client": 50, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-02", "Numero_chambre": [101]},
+        {"Id_Client": 51, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-02", "Numero_chambre": [101]},
+    ])
+    assert inseres == 1 and raisons == ["client 50 inconnu"]
+
+
+def test_reservations_follow_booking_rules(db_path, tmp_path):
+    inseres, raisons = _import(db_path, tmp_path, "reservations", [
+        {"Id_Client": 1, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-01", "Numero_chambre": [101]},
+        {"Id_Client": 1, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03", "Numero_chambre": []},
+        {"Id_Client": 1, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03", "Numero_chambre": " ; "},
+        {"Id_Client": 1, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03", "Numero_chambre": "101;201"},
+    ])
+    assert inseres == 1
+    assert raisons == ["Date_depart doit être après Date_arrivee"] + ["Numero_chambre manquant"] * 2
+    conn = connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM Reservation_Chambre").fetchone()[0] == 2
+    conn.close()
+
+
+def test_rejected_reservation_id_is_not_a_reference(db_path, tmp_path):
+    sejour = {"Id_Client": 1, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03"}
+    inseres, raisons = _import(db_path, tmp_path, "reservations", [
+        {**sejour, "Id_Reservation": 900, "Numero_chambre": [101]},
+        # Refusées par le trigger anti-chevauchement, avec leurs liaisons
+        {**sejour, "Id_Reservation": 901, "Numero_chambre": [101]},
+        {**sejour, "Id_Reservation": 902, "Numero_chambre": [201, 101]},
+        # Même identifiant qu'une ligne refusée : la réservation corrigée passe
+        {**sejour, "Id_Reservation": 901, "Numero_chambre": [202]},
+        {**sejour, "Numero_chambre": [307]},
+    ])
+    assert inseres == 3 and len(raisons) == 2
+
+    conn = connect(db_path)
+    assert [tuple(row) for row in conn.execute("SELECT Id_Reservation, Numero_chambre FROM Reservation_Chambre "
+                                               "ORDER BY Id_Reservation")] == [(900, 101), (901, 202), (903, 307)]
+    conn.close()
+
+    inseres, raisons = _import(db_path, tmp_path, "reservation_prestations", [
+        {"Id_Reservation": 901, "Id_Prestation": 1},
+        {"Id_Reservation": 902, "Id_Prestation": 1},
+    ])
+    assert inseres == 1 and raisons == ["réservation 902 inconnue"]
+
+
+def test_deferred_import_is_searchable(db_path, tmp_path):
+    inseres, raisons = _import(db_path, tmp_path, "clients", [
+        {**CLIENT, "Nom": "Hélène Importée"},
+        {**CLIENT, "Nom": "Octave Importé", "Ville": "Quimper"},
+    ], defer_aggregates=True)
+    assert inseres == 2 and raisons == []
+    conn = connect(db_path)
+    assert [row["Nom"] for row in repository.search_clients(conn, "helene")] == ["Hélène Importée"]
+    assert [row["Nom"] for row in repository.search_clients(conn, "quimp")] == ["Octave Importé"]
+    assert aggregates.verify(conn) == []
+    # Triggers recréés : les écritures suivantes restent indexées
+    repository.insert_client(conn, "Léon Après", "2 rue", "Brest", 29200, "l@b.fr", "06")
+    conn.commit()
+    assert [row["Nom"] for row in repository.search_clients(conn, "leon")] == ["Léon Après"]
+    conn.close()
@@ -0,0 +1,48 @@
+import hashlib
+import os
+
+from database import SAMPLE_PATH, connect, ensure_database
+from migrations import MIGRATIONS, check_query_plans, full_scans, migrate, schema_version
+
+
+def test_migrate_is_idempotent(db_path):
+    conn = connect(db_path)
+    assert schema_version(conn) == len(MIGRATIONS)
+    assert migrate(conn) == len(MIGRATIONS)
+    assert conn.execute("SELECT COUNT(*) FROM Hotel").fetchone()[0] == 2
+    conn.close()
+
+
+def test_page_queries_use_indexes(db_path):
+    # Connexion de l'application : archive attachée et vues Historique_*
+    conn = connect(db_path)
+    assert check_query_plans(conn) == {}
+    conn.close()
+
+
+def test_full_scan_is_reported(db_path):
+    conn = connect(db_path)
+    assert full_scans(conn, "SELECT * FROM Client WHERE Adresse = ?", ("x",)) == ["Client"]
+    assert full_scans(conn, "SELECT * FROM Client c WHERE c.Id_Client = ?", (1,)) == []
+    conn.close()
+
+
+def test_missing_index_is_caught(db_path):
+    conn = connect(db_path)
+    conn.execute("DROP INDEX idx_reservation_chambre_numero")
+    assert "Reservation_Chambre" in check_query_plans(conn)["stays_by_hotel"]
+    conn.close()
+
+
+def test_sample_is_migrated_on_a_copy(tmp_path):
+    racine = os.path.join(os.path.dirname(__file__), "..")
+    exemple = os.path.join(racine, SAMPLE_PATH)
+    empreinte = hashlib.sha256(open(exemple, "rb").read()).hexdigest()
+    chemin = str(tmp_path / "data" / "hotel.db")
+    assert ensure_database(chemin, exemple)
+    assert not ensure_database(chemin, exemple)
+    conn = connect(chemin)
+    assert migrate(conn) == len(MIGRATIONS)
+    assert conn.execute("SELECT COUNT(*) FROM Client").fetchone()[0] > 0
+    conn.close()
+    assert hashlib.sha256(open(exemple, "rb").read()).hexdigest() == empreinte
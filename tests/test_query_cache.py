@@ -0,0 +1,57 @@
+import repository
+from database import connect
+from migrations import GENERATION_TRIGGERS, VERSIONED_TABLES
+from query_cache import DEPENDENCIES, QueryCache
+
+
+def _noms(rows):
+    return [row["Nom"] for row in rows[0]]
+
+
+def test_write_from_another_connection_invalidates(db_path):
+    cache = QueryCache()
+    lecture, ecriture = connect(db_path, readonly=True), connect(db_path)
+    avant = _noms(cache.call(lecture, repository.page_clients, None, 50))
+    assert _noms(cache.call(lecture, repository.page_clients, None, 50)) == avant
+    assert cache.stats()["hits"] == 1
+
+    repository.insert_client(ecriture, "Aaron Abel", "1 rue", "Caen", 14000, "a@a.fr", "0600000000")
+    ecriture.commit()
+    assert _noms(cache.call(lecture, repository.page_clients, None, 50)) == ["Aaron Abel"] + avant
+    assert cache.stats()["misses"] == 2
+
+    # Écriture dans une table que la fonction ne lit pas : entrée toujours valable
+    ecriture.execute("UPDATE Prestation SET Prix = Prix + 1")
+    ecriture.commit()
+    cache.call(lecture, repository.page_clients, None, 50)
+    assert cache.stats()["hits"] == 2
+    lecture.close()
+    ecriture.close()
+
+
+def test_every_dependency_is_versioned(db_path):
+    conn = connect(db_path)
+    triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert set(GENERATION_TRIGGERS) <= triggers
+    for tables, _ in DEPENDENCIES.values():
+        assert set(tables) <= set(VERSIONED_TABLES)
+    conn.close()
+
+
+def test_size_bound_evicts_least_recent(db_path):
+    conn = connect(db_path, readonly=True)
+    fonctions = (repository.hotels, repository.room_types, repository.count_clients)
+    sonde = QueryCache()
+    for fonction in fonctions:
+        sonde.call(conn, fonction)
+    total = sonde.stats()["bytes"]
+    # Place pour toutes les entrées sauf une
+    cache = QueryCache(max_bytes=total - 1)
+    for fonction in fonctions:
+        cache.call(conn, fonction)
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] <= total - 1
+    cache.call(conn, repository.count_clients)
+    assert cache.stats()["hits"] == 1
+    cache.call(conn, repository.hotels)  # le moins récemment lu, évincé
+    assert cache.stats()["misses"] == 4
+    conn.close()
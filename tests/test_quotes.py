@@ -0,0 +1,78 @@
+import pytest
+
+from quotes import QuoteEngine
+from service import BookingError
+
+# Tarifs : Simple 80, Double 120. Paris (1) : 101, 201, 202 en Simple, 307 et
+# 502 en Double ; Lyon (2) : 305 en Simple, 104 et 410 en Double.
+# Prestations : Petit déjeuner 15 et Parking 10 (Paris), SPA 40 (Paris),
+# Petit déjeuner 12 et Service en chambre 25 (Lyon).
+
+
+@pytest.fixture
+def devis(service):
+    return QuoteEngine(service)
+
+
+def _resume(options):
+    return [(o["Id_Hotel"], o["Type"], o["Chambres"], o["Total"]) for o in options]
+
+
+def test_prices_by_city_and_extras(devis):
+    options = devis.quote({"Ville": "lyon", "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-04",
+                           "Prestations": {"petit dejeuner": 2}})
+    # 3 nuits : 3 × 80 + 2 × 12 et 3 × 120 + 2 × 12
+    assert _resume(options) == [(2, "Simple", [305], 264), (2, "Double", [104], 384)]
+    assert options[0]["Montant_chambres"] == 240 and options[0]["Montant_prestations"] == 24
+    assert options[1]["Disponibles"] == 2
+
+
+def test_chain_wide_quote_needs_all_extras(devis):
+    # SPA et Parking (Id 2) : seul Paris les propose
+    options = devis.quote({"Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03", "Chambres": 2,
+                           "Prestations": {"Spa": 1, 2: 3}})
+    assert _resume(options) == [(1, "Simple", [101, 201], 2 * 2 * 80 + 40 + 30),
+                                (1, "Double", [307, 502], 2 * 2 * 120 + 40 + 30)]
+    assert devis.quote({"Ville": "Lyon", "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03",
+                        "Prestations": {"SPA": 1}}) == []
+
+
+def test_booked_rooms_are_not_quoted(devis, service):
+    service.create_reservation(1, "2030-01-03", "2030-01-06", [101, 201])
+    demande = {"Id_Hotel": 1, "Id_Type": 1, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03"}
+    # Départ le 3, jour d'arrivée de la réservation : chambres prises, comme à la réservation
+    assert _resume(devis.quote(demande)) == [(1, "Simple", [202], 160)]
+    assert devis.quote({**demande, "Chambres": 2}) == []
+    assert _resume(devis.quote({**demande, "Date_arrivee": "2030-01-07", "Date_depart": "2030-01-08",
+                                "Chambres": 3})) == [(1, "Simple", [101, 201, 202], 240)]
+
+
+def test_invalid_requests(devis):
+    with pytest.raises(BookingError):
+        devis.quote({"Date_arrivee": "2030-01-03", "Date_depart": "2030-01-03"})
+    with pytest.raises(BookingError):
+        devis.quote({"Id_Type": 9, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03"})
+    with pytest.raises(BookingError):
+        devis.quote({"Id_Hotel": 9, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03"})
+    lot = devis.quote_batch([{"Ville": "Lyon", "Id_Type": 1, "Date_arrivee": "2030-01-01",
+                              "Date_depart": "2030-01-02"}, {"Ville": "Lyon"}])
+    assert _resume(lot[0]) == [(2, "Simple", [305], 80)]
+    assert "erreur" in lot[1]
+
+
+def test_tariffs_reload_after_changes(devis, service):
+    demande = {"Id_Hotel": 2, "Id_Type": 1, "Date_arrivee": "2030-01-01", "Date_depart": "2030-01-03"}
+    with service.database.connection(readonly=True) as conn:
+        tarifs = devis.tariffs(conn)
+        assert devis.tariffs(conn) is tarifs
+    assert _resume(devis.quote(demande)) == [(2, "Simple", [305], 160)]
+
+    with service.database.connection() as conn:
+        conn.execute("UPDATE Type_Chambre SET Tarif = 95 WHERE Id_Type = 1")
+        conn.execute("INSERT INTO Chambre (Numero, Etage, Fumeur, Id_Hotel, Id_Type) VALUES (106, 1, 0, 2, 1)")
+        conn.commit()
+    # Nouveau tarif, et nouvelle chambre connue de l'index
+    options = devis.quote(demande)
+    assert _resume(options) == [(2, "Simple", [106], 190)] and options[0]["Disponibles"] == 2
+    with service.database.connection(readonly=True) as conn:
+        assert devis.tariffs(conn) is not tarifs
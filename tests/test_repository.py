@@ -0,0 +1,36 @@
+import repository
+from database import connect
+
+
+def _all_pages(fonction, conn, limit, *args):
+    lignes, curseur = [], None
+    while True:
+        page, curseur = fonction(conn, curseur, limit, *args)
+        lignes.extend(page)
+        if curseur is None:
+            return lignes
+
+
+def test_evaluation_pages_keep_rows_without_date(db_path):
+    conn = connect(db_path)
+    conn.executemany("INSERT INTO Evaluation (Note, Commentaire, Date_evaluation, Id_Client, Id_Hotel) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     [(4, "sans date", None, 1, 1), (2, "sans date", None, 2, 2), (5, "datée", "2024-05-01", 3, 1)])
+    conn.commit()
+    attendus = {row[0] for row in conn.execute("SELECT Id_Evaluation FROM Evaluation")}
+    for limit in (1, 2, 50):
+        ids = [row["Id_Evaluation"] for row in _all_pages(repository.page_evaluations, conn, limit)]
+        assert len(ids) == len(attendus) and set(ids) == attendus
+        # Les plus récentes d'abord, les évaluations sans date à la fin
+        dates = [row["Date_evaluation"] for row in _all_pages(repository.page_evaluations, conn, limit)]
+        assert dates[0] == "2024-05-01" and dates[-2:] == [None, None]
+    conn.close()
+
+
+def test_reservation_pages_cover_all_rows(db_path, service):
+    for jour in range(1, 8):
+        service.create_reservation(jour % 5 + 1, f"2030-03-0{jour}", f"2030-03-0{jour + 1}", [101 if jour % 2 else 201])
+    conn = connect(db_path)
+    ids = [row["Id_Reservation"] for row in _all_pages(repository.page_reservations, conn, 3)]
+    assert sorted(ids) == [row[0] for row in conn.execute("SELECT Id_Reservation FROM Reservation ORDER BY 1")]
+    conn.close()
@@ -0,0 +1,46 @@
+from datetime import date
+
+import repository
+from database import connect
+from room_calendar import occupancy_grid, runs
+
+DEBUT = date(2030, 6, 1)
+
+
+def test_grid_marks_days_inclusively():
+    sejours = [
+        (101, "2030-06-01", "2030-06-04"),  # jour du départ inclus : toute la période
+        (307, "2030-05-25", "2030-06-01"),  # commencé avant la période
+        (307, "2030-06-03", "2030-06-09"),  # fini après la période
+        (201, "2030-06-04", "2030-06-10"),  # arrivée le dernier jour
+        (201, "2030-05-01", "2030-05-02"),  # entièrement avant
+        (999, "2030-06-01", "2030-06-04"),  # chambre absente de la liste
+    ]
+    grille = occupancy_grid([307, 101, 201, 202], sejours, DEBUT, 4)
+    assert grille.tolist() == [
+        [True, False, True, True],
+        [True, True, True, True],
+        [False, False, False, True],
+        [False, False, False, False],
+    ]
+    lignes, premiers, lendemains, occupees = runs(grille)
+    assert list(zip(lignes.tolist(), premiers.tolist(), lendemains.tolist(), occupees.tolist()))[:3] == [
+        (0, 0, 1, True), (0, 1, 2, False), (0, 2, 4, True)]
+
+
+def test_empty_grid():
+    assert occupancy_grid([101, 201], [], DEBUT, 3).tolist() == [[False] * 3] * 2
+    assert occupancy_grid([], [(101, "2030-06-01", "2030-06-02")], DEBUT, 3).shape == (0, 3)
+
+
+def test_grid_from_database_counts_departure_day(db_path, service):
+    # Les rapports comptent 3 nuits ; le calendrier montre 4 jours occupés
+    service.create_reservation(1, "2030-06-01", "2030-06-04", [101])
+    service.create_reservation(2, "2030-06-04", "2030-06-06", [201])
+    conn = connect(db_path, readonly=True)
+    chambres = [c["Numero"] for c in repository.rooms_by_hotel(conn, 1)]
+    grille = occupancy_grid(chambres, repository.stays_by_hotel(conn, 1, DEBUT, date(2030, 6, 5)), DEBUT, 5)
+    conn.close()
+    assert grille[chambres.index(101)].tolist() == [True, True, True, True, False]
+    assert grille[chambres.index(201)].tolist() == [False, False, False, True, True]
+    assert grille.sum() == 6
@@ -0,0 +1,57 @@
+import pytest
+
+import repository
+from database import connect
+from migrations import SEARCH_INDEXES
+
+
+def _noms(conn, texte):
+    return [row["Nom"] for row in repository.search_clients(conn, texte)]
+
+
+def _integres(conn):
+    # Contenu externe : l'index FTS5 doit correspondre exactement à la table
+    for table in SEARCH_INDEXES:
+        conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('integrity-check')")
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = connect(db_path)
+    yield conn
+    conn.close()
+
+
+def test_client_index_follows_writes(conn):
+    repository.insert_client(conn, "Hélène Dubois", "2 quai Est", "Rennes", 35000, "helene@ex.fr", "0611111111")
+    assert _noms(conn, "helene") == ["Hélène Dubois"]
+    assert _noms(conn, "ren dub") == ["Hélène Dubois"]
+
+    conn.execute("UPDATE Client SET Nom = 'Hélène Martin' WHERE Nom = 'Hélène Dubois'")
+    assert _noms(conn, "dubois") == []
+    assert _noms(conn, "mart") == ["Hélène Martin", "Lucie Martin"]
+
+    conn.execute("DELETE FROM Client WHERE Nom = 'Hélène Martin'")
+    assert _noms(conn, "helene") == []
+    _integres(conn)
+
+
+def test_evaluation_comments_follow_writes(conn):
+    repository.insert_evaluation(conn, 5, "Petit déjeuner remarquable", 4, 2)
+    page, _ = repository.page_evaluations(conn, recherche="dejeuner")
+    assert [row["Commentaire"] for row in page] == ["Petit déjeuner remarquable"]
+
+    conn.execute("UPDATE Evaluation SET Commentaire = 'Literie fatiguée' WHERE Id_Client = 4")
+    assert repository.page_evaluations(conn, recherche="dejeuner")[0] == []
+    assert len(repository.page_evaluations(conn, recherche="literie")[0]) == 1
+    _integres(conn)
+
+
+@pytest.mark.parametrize("saisie", ['jean OR', '"', 'NOT (', 'marie*', "l'", "NEAR(a b)"])
+def test_input_is_never_fts_syntax(conn, saisie):
+    repository.search_clients(conn, saisie)
+    repository.page_clients(conn, recherche=saisie)
+
+
+def test_empty_search_lists_first_clients(conn):
+    assert _noms(conn, "  ") == sorted(_noms(conn, ""))[:20]
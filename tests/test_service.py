@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+
+import pytest
+
+from database import Database, connect
+from migrations import OVERLAP_MESSAGE
+from service import BookingError, BookingService, RoomUnavailable
+
+CONCURRENTS = 8
+
+
+def _race(services, chambres):
+    """Chaque guichet tente la même réservation au même instant ; retourne les résultats"""
+    depart = threading.Barrier(len(services))
+    resultats = [None] * len(services)
+
+    def reserver(i):
+        depart.wait()
+        try:
+            resultats[i] = services[i].create_reservation(i % 5 + 1, "2030-06-10", "2030-06-12", chambres)
+        except BookingError as exc:
+            resultats[i] = exc
+
+    threads = [threading.Thread(target=reserver, args=(i,)) for i in range(len(services))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    return resultats
+
+
+def _check_single_booking(db_path, resultats):
+    succes = [r for r in resultats if isinstance(r, int)]
+    assert len(succes) == 1
+    assert all(isinstance(r, RoomUnavailable) for r in resultats if not isinstance(r, int))
+    conn = connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM Reservation").fetchone()[0] == 1
+    conn.close()
+
+
+def test_concurrent_bookings_same_service(db_path, service):
+    _check_single_booking(db_path, _race([service] * CONCURRENTS, [201, 202]))
+
+
+def test_concurrent_bookings_separate_indexes(db_path):
+    # Un index des disponibilités par guichet, comme des processus distincts
+    bases = [Database(db_path, writers=1, readers=1) for _ in range(CONCURRENTS)]
+    try:
+        _check_single_booking(db_path, _race([BookingService(base) for base in bases], [202, 201]))
+    finally:
+        for base in bases:
+            base.close()
+
+
+def test_overlap_trigger_rejects_direct_insert(db_path, service):
+    service.create_reservation(1, "2030-06-10", "2030-06-12", [101])
+    conn = connect(db_path)
+    id_reservation = conn.execute("INSERT INTO Reservation (Date_arrivee, Date_depart, Id_Client) "
+                                  "VALUES ('2030-06-12', '2030-06-14', 2)").lastrowid
+    with pytest.raises(sqlite3.IntegrityError, match=OVERLAP_MESSAGE):
+        conn.execute("INSERT INTO Reservation_Chambre (Id_Reservation, Numero_chambre) VALUES (?, 101)",
+                     (id_reservation,))
+    # Chambre libre le lendemain du départ
+    conn.execute("UPDATE Reservation SET Date_arrivee = '2030-06-13' WHERE Id_Reservation = ?", (id_reservation,))
+    conn.execute("INSERT INTO Reservation_Chambre (Id_Reservation, Numero_chambre) VALUES (?, 101)",
+                 (id_reservation,))
+    with pytest.raises(sqlite3.IntegrityError, match=OVERLAP_MESSAGE):
+        conn.execute("UPDATE Reservation SET Date_arrivee = '2030-06-11' WHERE Id_Reservation = ?",
+                     (id_reservation,))
+    conn.rollback()
+    conn.close()
+
+
+def test_booking_is_atomic(db_path, service):
+    service.create_reservation(1, "2030-06-10", "2030-06-12", [202])
+    with pytest.raises(RoomUnavailable):
+        service.create_reservation(2, "2030-06-11", "2030-06-13", [201, 202])
+    # Aucune chambre de la demande refusée n'est restée réservée
+    service.create_reservation(3, "2030-06-11", "2030-06-13", [201])
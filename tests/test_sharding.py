@@ -0,0 +1,87 @@
+import pytest
+
+from database import connect
+from service import BookingError
+from sharding import ShardRouter, shard_path, split
+
+# Hôtel 1 : 101 et 201 ; hôtel 2 : 305 et 410. Quatre arrivées le même jour,
+# départagées par l'hôtel puis l'identifiant de réservation
+CHAMBRES = [101, 305, 201, 410]
+
+
+@pytest.fixture
+def repartie(db_path, service, tmp_path):
+    for semaine in range(6):
+        jour = f"2030-01-{1 + 4 * semaine:02d}"
+        depart = f"2030-01-{2 + 4 * semaine:02d}"
+        for i, chambre in enumerate(CHAMBRES):
+            service.create_reservation(i + 1, jour, depart, [chambre])
+    dossier = str(tmp_path / "shards")
+    split(db_path, dossier, workers=1)
+    router = ShardRouter(dossier, workers=1)
+    yield router, dossier
+    router.close()
+
+
+def _attendu(db_path):
+    conn = connect(db_path, readonly=True)
+    rows = conn.execute('''
+        SELECT r.Date_arrivee, c.Id_Hotel, r.Id_Reservation FROM Reservation r
+        JOIN Reservation_Chambre rc ON rc.Id_Reservation = r.Id_Reservation
+        JOIN Chambre c ON c.Numero = rc.Numero_chambre
+        ORDER BY r.Date_arrivee DESC, c.Id_Hotel DESC, r.Id_Reservation DESC''').fetchall()
+    conn.close()
+    return [tuple(row) for row in rows]
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 5, 50])
+def test_pages_match_unsharded_order(db_path, repartie, limit):
+    router, _ = repartie
+    lues, curseur = [], None
+    while True:
+        rows, curseur = router.list_reservations(curseur, limit)
+        assert len(rows) <= limit
+        lues.extend((row["Date_arrivee"], row["Id_Hotel"], row["Id_Reservation"]) for row in rows)
+        if curseur is None:
+            break
+    # Ni doublon ni trou, dans l'ordre de la base d'origine
+    assert lues == _attendu(db_path)
+
+
+def test_rooms_are_routed_to_their_hotel(repartie):
+    router, dossier = repartie
+    assert router._hotel_of([101, 201]) == 1
+    assert router._hotel_of([305]) == 2
+    with pytest.raises(BookingError, match="Aucun hôtel"):
+        router._hotel_of([101, 305])
+    # Chambres ajoutées après le démarrage : relues à la première demande
+    conn = connect(shard_path(dossier, 2))
+    conn.execute("INSERT INTO Chambre (Numero, Etage, Fumeur, Id_Hotel, Id_Type) VALUES (909, 9, 0, 2, 1)")
+    conn.execute("INSERT INTO Chambre (Numero, Etage, Fumeur, Id_Hotel, Id_Type) VALUES (101, 1, 0, 2, 1)")
+    conn.commit()
+    conn.close()
+    assert router._hotel_of([909]) == 2
+    with pytest.raises(BookingError, match="plusieurs hôtels"):
+        router._hotel_of([101])
+    assert router.create_reservation(1, "2030-03-01", "2030-03-02", [101], id_hotel=2)
+
+
+def test_client_is_copied_on_first_booking(repartie):
+    router, dossier = repartie
+    router.add_client("Nina", "1 rue", "Brest", 29200, "n@b.fr", "06")
+    nina = router.search_clients("nina")[0]["Id_Client"]
+
+    def copies(id_hotel):
+        conn = connect(shard_path(dossier, id_hotel), readonly=True)
+        nombre = conn.execute("SELECT COUNT(*) FROM Client WHERE Id_Client = ?", (nina,)).fetchone()[0]
+        conn.close()
+        return nombre
+
+    assert copies(1) == copies(2) == 0
+    router.create_reservation(nina, "2030-03-01", "2030-03-03", [410])
+    assert (copies(1), copies(2)) == (0, 1)
+    # Déjà copié : la deuxième réservation le retrouve dans la base de l'hôtel
+    router.create_reservation(nina, "2030-03-05", "2030-03-06", [410])
+    assert copies(2) == 1
+    with pytest.raises(BookingError, match="Client 9999 inconnu"):
+        router.create_reservation(9999, "2030-03-01", "2030-03-03", [101])
@@ -0,0 +1,29 @@
+import os
+
+from archive import archive_path, archive_reservations
+from database import connect
+from snapshot import copy_database, take_snapshot
+
+
+def test_copy_includes_wal_and_archive(db_path, service, tmp_path):
+    service.create_reservation(1, "2020-01-01", "2020-01-03", [101])
+    service.create_reservation(2, "2030-01-01", "2030-01-03", [201])
+    conn = connect(db_path)
+    assert archive_reservations(conn, "2025-01-01", pause=0) == 1
+    # Écritures encore dans le fichier -wal, non reportées dans la base
+    assert os.path.getsize(db_path + "-wal") > 0
+
+    cible = copy_database(db_path, str(tmp_path / "copie.db"))
+    assert not os.path.exists(cible + "-wal")
+    copie = connect(cible, readonly=True)
+    assert copie.execute("SELECT COUNT(*) FROM main.Reservation").fetchone()[0] == 1
+    assert copie.execute("SELECT COUNT(*) FROM archive.Reservation").fetchone()[0] == 1
+    assert copie.execute("SELECT COUNT(*) FROM Historique_Reservation_Chambre").fetchone()[0] == 2
+    copie.close()
+    conn.close()
+
+
+def test_snapshot_is_named_after_the_base(db_path, tmp_path):
+    chemin = take_snapshot(db_path, str(tmp_path / "instantanes"))
+    assert os.path.basename(chemin).startswith(os.path.splitext(os.path.basename(db_path))[0] + "-")
+    assert os.path.exists(archive_path(chemin))